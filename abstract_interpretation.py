@@ -0,0 +1,278 @@
+from collections.abc import Sequence
+from fractions import Fraction
+
+from compiled_module import AffineMap, CompiledModule, CompiledPolyhedron, NumVector
+
+# Bounds of an interval, None when unbounded
+Interval = tuple[Fraction | None, Fraction | None]
+# Cartesian product of intervals, one for each variable
+Box = tuple[Interval, ...]
+# Box of the states reached in each DPA state, None if none is reached
+AbstractState = dict[int, Box | None]
+
+
+def _min_term(a: Fraction, interval: Interval) -> Fraction | None:
+    """
+    Lower bound of `a * x` for x in `interval`, None if unbounded
+    """
+    if a == 0:
+        return Fraction(0)
+    bound = interval[0] if a > 0 else interval[1]
+    return None if bound is None else a * bound
+
+
+def _max_term(a: Fraction, interval: Interval) -> Fraction | None:
+    """
+    Upper bound of `a * x` for x in `interval`, None if unbounded
+    """
+    bound = _min_term(-a, interval)
+    return None if bound is None else -bound
+
+
+def _sum(terms: Sequence[Fraction | None], start: Fraction) -> Fraction | None:
+    return None if None in terms else sum(terms, start)
+
+
+def _contains(interval: Interval, x: Fraction) -> bool:
+    lower, upper = interval
+    return (lower is None or lower <= x) and (upper is None or x <= upper)
+
+
+def _meet(box: Box, polyhedron: CompiledPolyhedron) -> Box | None:
+    """
+    Box containing the intersection of `box` and the closure of `polyhedron`,
+    tightening the bounds of the variables with each row in turn. None if the
+    intersection is found to be empty.
+    """
+    bounds = list(box)
+    for a_i, b_i in zip(polyhedron.a, polyhedron.b):
+        if not any(a_i) and b_i < 0:
+            return None
+        for j, a_ij in enumerate(a_i):
+            if a_ij == 0:
+                continue
+            # a_ij x_j <= b_i - sum(a_ik x_k for k != j)
+            rest = _sum(
+                [_min_term(a_ik, bounds[k]) for k, a_ik in enumerate(a_i) if k != j],
+                Fraction(0),
+            )
+            if rest is None:
+                continue
+            bound = (b_i - rest) / a_ij
+            lower, upper = bounds[j]
+            if a_ij > 0 and (upper is None or bound < upper):
+                upper = bound
+            elif a_ij < 0 and (lower is None or bound > lower):
+                lower = bound
+            if lower is not None and upper is not None and lower > upper:
+                return None
+            bounds[j] = (lower, upper)
+    return tuple(bounds)
+
+
+def _image(box: Box, update: AffineMap) -> Box:
+    return tuple(
+        (
+            _sum([_min_term(a_ij, box[j]) for j, a_ij in a_i], b_i),
+            _sum([_max_term(a_ij, box[j]) for j, a_ij in a_i], b_i),
+        )
+        for a_i, b_i in zip(update.a, update.b)
+    )
+
+
+def _join(box: Box | None, other: Box | None) -> Box | None:
+    if box is None or other is None:
+        return other if box is None else box
+    return tuple(
+        (
+            None if None in (lower, other_lower) else min(lower, other_lower),
+            None if None in (upper, other_upper) else max(upper, other_upper),
+        )
+        for (lower, upper), (other_lower, other_upper) in zip(box, other)
+    )
+
+
+def _widen_bound(
+    bound: Fraction | None, other: Fraction | None, thresholds: Sequence[Fraction]
+) -> Fraction | None:
+    """
+    Upper bound `bound` if it is not exceeded by `other`, else the least of the
+    sorted `thresholds` above `other`, None if there is none
+    """
+    if bound is not None and other is not None and other <= bound:
+        return bound
+    if other is None:
+        return None
+    return next((t for t in thresholds if t >= other), None)
+
+
+def _widen(
+    box: Box | None, other: Box | None, thresholds: Sequence[Sequence[Fraction]]
+) -> Box | None:
+    """
+    Relax the bounds of `box` exceeded by `other` to the nearest widening
+    threshold of their variable, dropping them if there is none
+    """
+    if box is None or other is None:
+        return other if box is None else box
+
+    def negate(x: Fraction | None) -> Fraction | None:
+        return None if x is None else -x
+
+    return tuple(
+        (
+            negate(
+                _widen_bound(
+                    negate(lower), negate(other_lower), [-t for t in reversed(values)]
+                )
+            ),
+            _widen_bound(upper, other_upper, values),
+        )
+        for (lower, upper), (other_lower, other_upper), values in zip(
+            box, other, thresholds
+        )
+    )
+
+
+def _thresholds(module: CompiledModule) -> tuple[list[Fraction], ...]:
+    """
+    Widening thresholds of each variable: its bounds in the guard rows over it
+    alone, and their images by the updates of the variable depending on it
+    alone
+    """
+    n = len(module.vars)
+    thresholds: list[set[Fraction]] = [set() for _ in range(n)]
+    for command in module.commands:
+        for conjunct in command.guard:
+            for a_i, b_i in zip(conjunct.a, conjunct.b):
+                support = [j for j, a_ij in enumerate(a_i) if a_ij != 0]
+                if len(support) == 1:
+                    (j,) = support
+                    thresholds[j].add(b_i / a_i[j])
+    images: list[set[Fraction]] = [set() for _ in range(n)]
+    for command in module.commands:
+        for action in command.actions:
+            for _, update in action.distribution:
+                for i, (a_i, b_i) in enumerate(zip(update.a, update.b)):
+                    if len(a_i) == 1 and a_i[0][0] == i:
+                        images[i].update(a_i[0][1] * t + b_i for t in thresholds[i])
+    return tuple(sorted(t | image) for t, image in zip(thresholds, images))
+
+
+def _narrow(box: Box | None, other: Box | None) -> Box | None:
+    """
+    Restore the missing bounds of `box` from `other`
+    """
+    if box is None or other is None:
+        return None
+    return tuple(
+        (
+            other_lower if lower is None else lower,
+            other_upper if upper is None else upper,
+        )
+        for (lower, upper), (other_lower, other_upper) in zip(box, other)
+    )
+
+
+def _post(module: CompiledModule, state: AbstractState, q_index: int) -> AbstractState:
+    """
+    Initial states joined with the successors of the states of `state`
+    """
+
+    def add(box: Box) -> None:
+        # Split the successors by DPA state
+        for q_state in post:
+            if _contains(box[q_index], Fraction(q_state)):
+                successor = box[:q_index] + ((q_state, q_state),) + box[q_index + 1 :]
+                post[q_state] = _join(post[q_state], successor)
+
+    post: AbstractState = {q_state: None for q_state in state}
+    for x in module.init:
+        add(tuple((x_j, x_j) for x_j in x))
+
+    for box in state.values():
+        if box is None:
+            continue
+        for command in module.commands:
+            for conjunct in command.guard:
+                premise = _meet(box, conjunct)
+                if premise is None:
+                    continue
+                for action in command.actions:
+                    for _, update in action.distribution:
+                        add(_image(premise, update))
+    return post
+
+
+def _to_polyhedron(box: Box | None, n: int, q_index: int) -> CompiledPolyhedron:
+    """
+    Bounds of `box` on the variables other than the DPA state as rows
+    `x_j <= upper`, `-x_j <= -lower`. An unreached DPA state gets the
+    infeasible row `0 <= -1`, an unbounded one the valid row `0 <= 1`.
+    """
+    if box is None:
+        return CompiledPolyhedron(((Fraction(0),) * n,), (Fraction(-1),), (False,))
+
+    a: list[NumVector] = []
+    b: list[Fraction] = []
+    for j, (lower, upper) in enumerate(box):
+        unit = tuple(Fraction(int(k == j)) for k in range(n))
+        if j == q_index:
+            continue
+        if upper is not None:
+            a.append(unit)
+            b.append(upper)
+        if lower is not None:
+            a.append(tuple(-u for u in unit))
+            b.append(-lower)
+    if len(a) == 0:
+        return CompiledPolyhedron(((Fraction(0),) * n,), (Fraction(1),), (False,))
+    return CompiledPolyhedron(tuple(a), tuple(b), (False,) * len(a))
+
+
+def interval_invariants(
+    module: CompiledModule,
+    q_states: Sequence[int],
+    widening_delay: int = 2,
+    narrowing: int = 2,
+) -> dict[int, CompiledPolyhedron]:
+    """
+    Inductive invariant of `module` for each DPA state in `q_states`: a box
+    containing the reachable states of the DPA state, computed by abstract
+    interpretation over the intervals. Bounds still growing after
+    `widening_delay` iterations are relaxed to the next threshold among the
+    bounds of the guards and their images by the updates, or dropped, and
+    then recovered where possible by `narrowing` descending iterations.
+    The domain is non-relational: invariants that need relations between
+    variables are out of its reach, and are left to the template invariants.
+    Guards are over-approximated by their closure, and the successors in DPA
+    states not in `q_states` are ignored.
+    """
+    q_index = module.dpa_index
+    thresholds = _thresholds(module)
+    state: AbstractState = {q_state: None for q_state in q_states}
+
+    iteration = 0
+    while True:
+        post = {
+            q_state: _join(state[q_state], box)
+            for q_state, box in _post(module, state, q_index).items()
+        }
+        if iteration >= widening_delay:
+            post = {
+                q_state: _widen(state[q_state], box, thresholds)
+                for q_state, box in post.items()
+            }
+        if post == state:
+            break
+        state = post
+        iteration += 1
+
+    for _ in range(narrowing):
+        state = {
+            q_state: _narrow(state[q_state], box)
+            for q_state, box in _post(module, state, q_index).items()
+        }
+
+    n = len(module.vars)
+    return {q_state: _to_polyhedron(box, n, q_index) for q_state, box in state.items()}
@@ -0,0 +1,246 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from fractions import Fraction
+
+from sympy import Add, And, Eq, LessThan, StrictGreaterThan, Symbol
+from sympy.logic.boolalg import Boolean
+
+from parity_supermartingale import ParityObjective
+from reactive_module import GuardedCommand, ReactiveModule, Update
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    family: str
+    params: tuple[tuple[str, int], ...]
+    system: ReactiveModule
+    q_states: list[int]
+    objectives: list[ParityObjective]
+
+    @property
+    def name(self) -> str:
+        return benchmark_name(self.family, dict(self.params))
+
+
+def benchmark_name(family: str, params: dict[str, int]) -> str:
+    return f"{family}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def _eq(var: Symbol, value: int) -> Boolean:
+    return Eq(Add(var, -value), 0)
+
+
+def _assign(vars: tuple[Symbol, ...], values: dict[int, float]) -> Update:
+    """
+    Update setting the variables of index in `values` and resetting the others
+    """
+    return {var: values.get(i, 0) for i, var in enumerate(vars)}
+
+
+def _shift(
+    vars: tuple[Symbol, ...],
+    deltas: dict[int, float],
+    assign: dict[int, float] | None = None,
+) -> Update:
+    """
+    Update x_i' = x_i + deltas[i], assigning the variables of index in `assign`
+    and leaving the others unchanged
+    """
+    assign = {} if assign is None else assign
+    return {vars[i]: vars[i] + delta for i, delta in deltas.items()} | {
+        vars[i]: value for i, value in assign.items()
+    }
+
+
+def _counter_objectives() -> list[ParityObjective]:
+    q = Symbol("q")
+    return [Eq(q, 0), _eq(q, 1)]
+
+
+def counters(max_counter: int, counters: int) -> Benchmark:
+    """
+    `counter.py` with `counters` counters, counted down one after the other:
+    the system starts ticking with all the counters set to `max_counter` and
+    is reset when all of them reach 0.
+    As required by `invariant_synthesis_and_verification`, all the updates
+    assign the DPA state `q` a constant.
+    """
+    ticking = Symbol("ticking")
+    cs = [Symbol(f"c_{i}") for i in range(counters)]
+    q = Symbol("q")
+    vars = (ticking, *cs, q)
+    n = len(vars)
+    to_proc = _assign(
+        vars, {0: 1, n - 1: 1} | {i + 1: max_counter for i in range(counters)}
+    )
+    reset = _assign(vars, {})
+
+    body: list[GuardedCommand] = [
+        (Eq(ticking, 0), [[(0.5, to_proc), (0.5, reset)]]),
+        (
+            And(_eq(ticking, 1), *(LessThan(c, 0) for c in cs)),
+            [[(1, reset)]],
+        ),
+    ]
+    for i, c in enumerate(cs):
+        guard = And(
+            _eq(ticking, 1),
+            *(LessThan(c_j, 0) for c_j in cs[:i]),
+            StrictGreaterThan(c, 0),
+        )
+        body.append(
+            (
+                guard,
+                [
+                    [(0.8, _shift(vars, {i + 1: -1}, {n - 1: 1})), (0.2, reset)],
+                    [(1, reset)],
+                ],
+            )
+        )
+
+    return Benchmark(
+        "counters",
+        (("max_counter", max_counter), ("counters", counters)),
+        ReactiveModule([(0, *(max_counter for _ in cs), 0)], vars, body),
+        [0, 1],
+        _counter_objectives(),
+    )
+
+
+def random_walk(dims: int, start: int = 10) -> Benchmark:
+    """
+    Random walk over `dims` dimensions biased towards 0, moving along the first
+    positive dimension and restarting from `start` once all of them are
+    non-positive
+    """
+    xs = [Symbol(f"x_{i}") for i in range(dims)]
+    q = Symbol("q")
+    vars = (*xs, q)
+    n = len(vars)
+
+    body: list[GuardedCommand] = [
+        (
+            And(*(LessThan(x, 0) for x in xs)),
+            [[(1, _assign(vars, {i: start for i in range(dims)}))]],
+        )
+    ]
+    for i, x in enumerate(xs):
+        guard = And(*(LessThan(x_j, 0) for x_j in xs[:i]), StrictGreaterThan(x, 0))
+        body.append(
+            (
+                guard,
+                [
+                    [
+                        (0.75, _shift(vars, {i: -1}, {n - 1: 1})),
+                        (0.25, _shift(vars, {i: 1}, {n - 1: 1})),
+                    ]
+                ],
+            )
+        )
+
+    return Benchmark(
+        "random_walk",
+        (("dims", dims),),
+        ReactiveModule([(*(start for _ in xs), 0)], vars, body),
+        [0, 1],
+        _counter_objectives(),
+    )
+
+
+def non_det_counter(actions: int, max_counter: int = 65536) -> Benchmark:
+    """
+    `counter.py` with `actions` stochastic actions of decreasing success
+    probability available while ticking
+    """
+    ticking = Symbol("ticking")
+    c = Symbol("c")
+    q = Symbol("q")
+    vars = (ticking, c, q)
+    to_proc = _assign(vars, {0: 1, 1: max_counter, 2: 1})
+    reset = _assign(vars, {})
+    decr = _shift(vars, {1: -1}, {2: 1})
+
+    def action(k: int):
+        p = float(Fraction(k + 1, actions + 1))
+        return [(p, decr), (1 - p, reset)]
+
+    body: list[GuardedCommand] = [
+        (Eq(ticking, 0), [[(0.5, to_proc), (0.5, reset)]]),
+        (
+            And(_eq(ticking, 1), StrictGreaterThan(c, 0)),
+            [action(k) for k in range(actions)] + [[(1, reset)]],
+        ),
+        (And(_eq(ticking, 1), Eq(c, 0)), [[(1, reset)]]),
+    ]
+
+    return Benchmark(
+        "non_det_counter",
+        (("actions", actions),),
+        ReactiveModule([(0, max_counter, 0)], vars, body),
+        [0, 1],
+        _counter_objectives(),
+    )
+
+
+def dpa_priorities(priorities: int, max_counter: int = 65536) -> Benchmark:
+    """
+    `counter.py` composed with a DPA with `priorities` priorities: each count
+    down is tracked by a DPA state of priority drawn uniformly in
+    [1, priorities - 1], the DPA moving back to priority 0 on reset
+    """
+    ticking = Symbol("ticking")
+    c = Symbol("c")
+    q = Symbol("q")
+    vars = (ticking, c, q)
+    reset = _assign(vars, {})
+    p = 0.5 / (priorities - 1)
+
+    body: list[GuardedCommand] = [
+        (
+            Eq(ticking, 0),
+            [
+                [
+                    (p, _assign(vars, {0: 1, 1: max_counter, 2: j}))
+                    for j in range(1, priorities)
+                ]
+                + [(0.5, reset)]
+            ],
+        ),
+        (And(_eq(ticking, 1), Eq(c, 0)), [[(1, reset)]]),
+    ]
+    # The DPA state is kept explicitly by the count down of each priority
+    for j in range(priorities):
+        body.append(
+            (
+                And(_eq(ticking, 1), StrictGreaterThan(c, 0), _eq(q, j)),
+                [[(0.8, _shift(vars, {1: -1}, {2: j})), (0.2, reset)], [(1, reset)]],
+            )
+        )
+
+    return Benchmark(
+        "dpa_priorities",
+        (("priorities", priorities),),
+        ReactiveModule([(0, max_counter, 0)], vars, body),
+        list(range(priorities)),
+        [_eq(q, j) for j in range(priorities)],
+    )
+
+
+FAMILIES: dict[str, Callable[..., Benchmark]] = {
+    "counters": counters,
+    "random_walk": random_walk,
+    "non_det_counter": non_det_counter,
+    "dpa_priorities": dpa_priorities,
+}
+
+# Default parameter sweeps of the families
+SWEEPS: dict[str, list[dict[str, int]]] = {
+    "counters": [
+        {"max_counter": max_counter, "counters": counters}
+        for counters in (1, 2, 4)
+        for max_counter in (16, 65536)
+    ],
+    "random_walk": [{"dims": dims} for dims in (1, 2, 4, 6)],
+    "non_det_counter": [{"actions": actions} for actions in (1, 4, 8, 16)],
+    "dpa_priorities": [{"priorities": priorities} for priorities in (2, 3, 5, 7)],
+}
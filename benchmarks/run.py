@@ -0,0 +1,250 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+from multiprocessing.connection import Connection
+from time import perf_counter
+from typing import Any, Literal
+
+from benchmarks.families import FAMILIES, SWEEPS, benchmark_name
+from parity_supermartingale import ParitySupermartingale
+
+Engine = Literal["verification", "invariant_synthesis_and_verification"]
+ENGINES: tuple[Engine, ...] = ("verification", "invariant_synthesis_and_verification")
+
+# Encoding sizes compared exactly against the baseline
+_COUNTS = ("farkas_instances", "farkas_constraints", "multipliers", "fresh_vars")
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _peak_rss_kib() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _run(family: str, params: dict[str, int], engine: Engine, conn: Connection) -> None:
+    """
+    Run `engine` on a benchmark, sending its measurements through `conn`.
+    Executed in a dedicated process, so that its peak RSS is the one of the
+    benchmark alone.
+    """
+    benchmark = FAMILIES[family](**params)
+    psm = ParitySupermartingale(benchmark.system)
+    start_time = perf_counter()
+    try:
+        getattr(psm, engine)(benchmark.q_states, benchmark.objectives)
+        status, error = "ok", None
+    except Exception as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+    elapsed = perf_counter() - start_time
+
+    conn.send(
+        {
+            "status": status,
+            "error": error,
+            "wall_time": elapsed,
+            "peak_rss_kib": _peak_rss_kib(),
+        }
+        | psm.encoding_stats
+        | psm.feasibility_stats
+    )
+    conn.close()
+
+
+def _run_once(
+    family: str, params: dict[str, int], engine: Engine, timeout: float
+) -> dict[str, Any]:
+    """
+    Measurements of a single run of `engine` in a fresh process killed after
+    `timeout` seconds
+    """
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_run, args=(family, params, engine, send))
+    process.start()
+    send.close()
+
+    if recv.poll(timeout):
+        try:
+            result = recv.recv()
+        except EOFError:
+            result = {"status": "crashed"}
+    else:
+        result = {"status": "timeout", "wall_time": timeout}
+        process.kill()
+    process.join()
+    if result["status"] == "crashed":
+        result["error"] = f"exit code {process.exitcode}"
+    return result
+
+
+def nondeterministic(runs: list[dict[str, Any]]) -> list[str]:
+    """
+    Measurements expected to be deterministic, the status and the encoding
+    sizes, that differ between `runs`
+    """
+    return [
+        field
+        for field in ("status", *_COUNTS)
+        if len({run.get(field) for run in runs}) > 1
+    ]
+
+
+def run_benchmark(
+    family: str,
+    params: dict[str, int],
+    engine: Engine,
+    timeout: float,
+    repeat: int = 3,
+) -> dict[str, Any]:
+    """
+    Measurements of `engine` on the benchmark of `family` with `params`,
+    each run in a fresh process killed after `timeout` seconds. The run is
+    repeated `repeat` times, at least twice, stopping after the second run if
+    it fails. The wall time and peak RSS are the minimum over the
+    repetitions, all the wall times being kept in `wall_times`. The other
+    measurements are deterministic: the ones differing between the runs are
+    listed in `nondeterministic`.
+    """
+    if repeat < 2:
+        raise ValueError("benchmarks are run at least twice to check determinism")
+    runs: list[dict[str, Any]] = []
+    for _ in range(repeat):
+        runs.append(_run_once(family, params, engine, timeout))
+        if len(runs) >= 2 and runs[-1]["status"] != "ok":
+            break
+    result = runs[-1] | {
+        "wall_times": [run["wall_time"] for run in runs if "wall_time" in run],
+        "nondeterministic": nondeterministic(runs),
+    }
+    if result["status"] == "ok":
+        ok_runs = [run for run in runs if run["status"] == "ok"]
+        result["wall_time"] = min(run["wall_time"] for run in ok_runs)
+        result["peak_rss_kib"] = min(run["peak_rss_kib"] for run in ok_runs)
+    return {"family": family, "params": params, "engine": engine} | result
+
+
+def _key(result: dict[str, Any]) -> str:
+    return f"{benchmark_name(result['family'], result['params'])}/{result['engine']}"
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float = 0.25,
+    min_wall_time: float = 0.5,
+) -> list[str]:
+    """
+    Regressions of `results` with respect to `baseline`: benchmarks no longer
+    solved, wall time or peak RSS grown by more than `tolerance` (wall times
+    below `min_wall_time` seconds are considered noise) and larger encodings.
+    Both wall times are the minimum over their repetitions, see
+    `run_benchmark`.
+    """
+    baseline_by_key = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = _key(result)
+        if key not in baseline_by_key:
+            continue
+        old = baseline_by_key[key]
+
+        if old["status"] == "ok" and result["status"] != "ok":
+            regressions.append(f"{key}: status {old['status']} -> {result['status']}")
+            continue
+        if result["status"] != "ok":
+            continue
+
+        if result["wall_time"] > max(old["wall_time"] * (1 + tolerance), min_wall_time):
+            regressions.append(
+                f"{key}: wall time {old['wall_time']:.3f}s -> {result['wall_time']:.3f}s"
+            )
+        if result["peak_rss_kib"] > old["peak_rss_kib"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: peak RSS {old['peak_rss_kib']} KiB -> {result['peak_rss_kib']} KiB"
+            )
+        for count in _COUNTS:
+            if count in old and result[count] > old[count]:
+                regressions.append(f"{key}: {count} {old[count]} -> {result[count]}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Run the parametric benchmark families of the synthesis engines"
+    )
+    parser.add_argument(
+        "--family", choices=FAMILIES, action="append", help="default: all"
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, action="append", help="default: all"
+    )
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument(
+        "--baseline", default=BASELINE, help="results to check for regressions"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs of each benchmark, at least 2, the fastest one being compared",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store the results as the new baseline instead of comparing them",
+    )
+    args = parser.parse_args()
+    if args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    results = []
+    for family in args.family or FAMILIES:
+        for params in SWEEPS[family]:
+            for engine in args.engine or ENGINES:
+                result = run_benchmark(
+                    family, params, engine, args.timeout, args.repeat
+                )
+                print(
+                    f"{_key(result)}: {result['status']}",
+                    f"{result.get('wall_time', 0):.3f}s",
+                    f"{result.get('peak_rss_kib', 0)} KiB",
+                    result.get("farkas_constraints", ""),
+                    flush=True,
+                )
+                if result["nondeterministic"]:
+                    print(
+                        "NONDETERMINISTIC",
+                        _key(result),
+                        ", ".join(result["nondeterministic"]),
+                    )
+                results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if any(result["nondeterministic"] for result in results):
+        return 1
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline found at", args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
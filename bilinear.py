@@ -0,0 +1,137 @@
+from collections.abc import Iterable, Iterator
+from fractions import Fraction
+
+from z3 import (
+    And,
+    ArithRef,
+    BoolRef,
+    Context,
+    ExprRef,
+    Optimize,
+    Real,
+    RealVal,
+    is_mul,
+    is_rational_value,
+    sat,
+    substitute,
+)
+
+from linear_terms import is_variable
+
+# Values of the variables of an assignment, by name
+Assignment = dict[str, Fraction]
+
+
+def _factors(e: ExprRef) -> list[ExprRef]:
+    """
+    Factors of the product `e`, flattening nested products
+    """
+    if not is_mul(e):
+        return [e]
+    return [factor for arg in e.children() for factor in _factors(arg)]
+
+
+def bilinear_partners(constraints: Iterable[BoolRef], left: set[str]) -> list[ArithRef]:
+    """
+    Variables multiplied by some variable of `left` in `constraints`, so that
+    fixing either `left` or the partners makes the constraints linear
+    """
+    partners: dict[str, ArithRef] = {}
+    visited: set[int] = set()
+    stack: list[ExprRef] = list(constraints)
+    while stack:
+        e = stack.pop()
+        if e.get_id() in visited:
+            continue
+        visited.add(e.get_id())
+        if is_mul(e):
+            factors = [factor for factor in _factors(e) if is_variable(factor)]
+            if any(factor.decl().name() in left for factor in factors):
+                partners.update(
+                    (factor.decl().name(), factor)
+                    for factor in factors
+                    if factor.decl().name() not in left
+                )
+        stack.extend(e.children())
+    return [partners[name] for name in sorted(partners)]
+
+
+def minimize_slack(
+    constraints: list[BoolRef], slack: ArithRef, fixed: Assignment, ctx: Context
+) -> tuple[Assignment, Fraction] | None:
+    """
+    Minimize `slack` subject to `constraints` with the variables of `fixed`
+    replaced by their value. Returns the optimal assignment, including
+    `fixed`, together with the optimal slack, None if the constraints are
+    infeasible.
+    """
+    substitution = [
+        (Real(name, ctx), RealVal(str(value), ctx)) for name, value in fixed.items()
+    ]
+    opt = Optimize(ctx=ctx)
+    # A single substitution shares its cache across the constraints
+    opt.add(substitute(And(constraints), *substitution))
+    opt.minimize(slack)
+    if opt.check() != sat:
+        return None
+
+    model = opt.model()
+    values = dict(fixed)
+    for decl in model.decls():
+        value = model[decl]
+        if is_rational_value(value):
+            values[decl.name()] = value.as_fraction()
+    return values, values.get(slack.decl().name(), Fraction(0))
+
+
+def alternating_solve(
+    constraints: list[BoolRef],
+    slack: ArithRef,
+    left: list[ArithRef],
+    seeds: Iterable[Assignment],
+    iterations: int,
+    ctx: Context,
+) -> Iterator[Assignment]:
+    """
+    Solutions with zero `slack` of the bilinear `constraints`, found by
+    alternately fixing the variables of `left` and their bilinear partners,
+    each time minimizing `slack` over the linear constraints left. Every seed
+    gives a starting value of `left` and a restart of at most `iterations`
+    rounds, stopped as soon as the slack does not decrease.
+    """
+    left_names = {var.decl().name() for var in left}
+    right = bilinear_partners(constraints, left_names)
+
+    for seed in seeds:
+        fixed = seed
+        best: Fraction | None = None
+        for _ in range(iterations):
+            result = minimize_slack(constraints, slack, fixed, ctx)
+            if result is None:
+                break
+            values, t = result
+            if t == 0:
+                yield values
+                break
+
+            # Fix the partners of `left` and solve for `left`
+            result = minimize_slack(
+                constraints,
+                slack,
+                {
+                    var.decl().name(): values.get(var.decl().name(), Fraction(0))
+                    for var in right
+                },
+                ctx,
+            )
+            if result is None:
+                break
+            values, t = result
+            if t == 0:
+                yield values
+                break
+
+            if best is not None and t >= best:
+                break
+            best = t
+            fixed = {name: values.get(name, Fraction(0)) for name in left_names}
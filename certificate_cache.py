@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Sequence
+from typing import Any
+
+from compiled_module import CompiledDNF, CompiledModule
+from utils import LinearFunction
+
+Certificate = dict[str, Any]
+
+
+def certificate_key(
+    engine: str,
+    module: CompiledModule,
+    objectives: Sequence[CompiledDNF],
+    q_states: Sequence[int],
+) -> str:
+    """
+    Content hash of a synthesis job: the compiled guards, updates and initial
+    states of `module`, the compiled `objectives`, the `q_states` and the
+    `engine` (name and version) computing the certificate
+    """
+    content = repr((engine, module, tuple(objectives), tuple(q_states)))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class CertificateCache:
+    def __init__(self, directory: str, max_bytes: int = 64 * 2**20) -> None:
+        """
+        Content-addressed cache of certificates stored as JSON files in
+        `directory`, evicting the least recently used ones once they take more
+        than `max_bytes`. Entries are written atomically, so that several
+        processes can share the same directory. Each entry is stored with a
+        digest of its key and certificate, and entries whose digest does not
+        match, e.g. corrupted or copied from another key, are ignored.
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> Certificate | None:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            certificate = entry["certificate"]
+            if entry["digest"] != _digest(key, certificate):
+                return None
+            # The modification time orders the entries for eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return certificate
+
+    def put(self, key: str, certificate: Certificate) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {"digest": _digest(key, certificate), "certificate": certificate},
+                    f,
+                )
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self._max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+
+def _digest(key: str, certificate: Certificate) -> str:
+    content = json.dumps([key, certificate], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _to_json_psm(f: LinearFunction) -> list:
+    return [f[0], f[1]]
+
+
+def to_certificate(lex_psm: list, invariant: dict | None = None) -> Certificate:
+    return {
+        "lex_psm": [
+            {str(q): _to_json_psm(f) for q, f in level.items()} for level in lex_psm
+        ],
+        "invariant": (
+            None
+            if invariant is None
+            else {str(q): _to_json_psm(f) for q, f in invariant.items()}
+        ),
+    }
+
+
+def from_certificate(certificate: Certificate) -> tuple[list, dict | None]:
+    lex_psm = [
+        {int(q): (f[0], f[1]) for q, f in level.items()}
+        for level in certificate["lex_psm"]
+    ]
+    invariant = certificate.get("invariant")
+    if invariant is not None:
+        invariant = {int(q): (f[0], f[1]) for q, f in invariant.items()}
+    return lex_psm, invariant
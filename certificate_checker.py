@@ -0,0 +1,476 @@
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import partial
+from itertools import product
+from typing import Literal
+
+from sympy.logic.boolalg import Boolean
+
+import rational_lp
+from compiled_module import (
+    AffineMap,
+    CompiledAction,
+    CompiledDNF,
+    CompiledModule,
+    CompiledPolyhedron,
+    NumVector,
+    compile_dnf,
+    compile_module,
+)
+from feasibility import FeasibilityCache
+from parallel import process_pool, terminate
+from rational_lp import LinearConstraint
+from reactive_module import ReactiveModule
+from utils import LinearFunction, to_fraction
+
+# Parity objective, see `parity_supermartingale.ParityObjective`
+ParityObjective = Boolean
+
+Condition = Literal["non_negativity", "init", "consecution", "drift", "ranking"]
+Engine = Literal["verification", "invariant_synthesis"]
+
+
+@dataclass(frozen=True)
+class Violation:
+    """
+    Condition of a certificate that does not hold, located by DPA state,
+    guard (index of the command), action, LPSM level and parity objective
+    """
+
+    condition: Condition
+    q_state: int | None = None
+    guard: int | None = None
+    action: int | None = None
+    level: int | None = None
+    objective: int | None = None
+    # Point of the premise violating the condition, if any
+    witness: tuple[Fraction, ...] | None = None
+
+
+# Exact linear function x -> a x + b
+_Linear = tuple[NumVector, Fraction]
+# Independent check, see `_Checker.check`
+_Task = tuple[str, int, int, int]
+
+
+def _to_linear(f: LinearFunction) -> _Linear:
+    (a,), ((b,),) = f
+    return tuple(map(to_fraction, a)), to_fraction(b)
+
+
+def _to_linears(f: LinearFunction) -> tuple[_Linear, ...]:
+    """
+    Rows of the linear function `f`
+    """
+    a, b = f
+    return tuple(_to_linear(([a_i], [b_i])) for a_i, b_i in zip(a, b))
+
+
+def _compose(f: _Linear, update: AffineMap) -> _Linear:
+    """
+    x -> f(update(x))
+    """
+    a, b = f
+    return (
+        tuple(
+            sum((a[k] * u_kj for k, u_kj in column), Fraction(0))
+            for column in update.columns
+        ),
+        sum((a_k * b_k for a_k, b_k in zip(a, update.b)), b),
+    )
+
+
+def _drift(v: _Linear, action: CompiledAction) -> _Linear:
+    """
+    x -> Post V(x) - V(x)
+    """
+    post_a, post_b = _compose(v, action.expected)
+    return tuple(p - a for p, a in zip(post_a, v[0])), post_b - v[1]
+
+
+def _sublevel(f: _Linear) -> LinearConstraint:
+    """
+    f(x) <= 0
+    """
+    return f[0], "<=", -f[1]
+
+
+@dataclass
+class _Checker:
+    module: CompiledModule
+    objectives: list[CompiledDNF]
+    lex_psm: list[dict[int, _Linear]]
+    # Rows of the invariant of each DPA state, I(x, q) iff every row is <= 0
+    invariant: dict[int, tuple[_Linear, ...]] | None
+    q_states: list[int]
+    engine: Engine
+
+    def __post_init__(self) -> None:
+        self._feasibility_cache = FeasibilityCache(float_first=True)
+        self._guards: dict[int, list[tuple[int, CompiledDNF]]] = {}
+
+    def __getstate__(self):
+        return {
+            k: v
+            for k, v in self.__dict__.items()
+            if k not in ("_feasibility_cache", "_guards")
+        }
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    def tasks(self) -> list[_Task]:
+        tasks: list[_Task] = []
+        if self.invariant is not None:
+            tasks.append(("init", 0, 0, 0))
+            tasks.extend(
+                ("consecution", q, g, 0)
+                for q in self.q_states
+                for g in range(len(self.module.commands))
+            )
+        if self.engine == "verification":
+            return tasks + [("dpa_state", q, 0, 0) for q in self.q_states]
+
+        for q in self.q_states:
+            tasks.append(("non_negativity", q, 0, 0))
+            tasks.extend(
+                ("drift", q, j, k)
+                for j in range(len(self.objectives))
+                for k in range(len(self._dpa_state_guards(q)))
+            )
+        return tasks
+
+    def check(self, task: _Task) -> Violation | None:
+        kind, q, x, y = task
+        match kind:
+            case "dpa_state":
+                return self._check_dpa_state(q)
+            case "init":
+                return self._check_init()
+            case "non_negativity":
+                return self._check_non_negativity(q)
+            case "consecution":
+                return self._check_consecution(q, x)
+            case "drift":
+                return self._check_drift(q, x, y)
+        raise ValueError(f"Unknown check {kind}")
+
+    def _feasible(self, premise: CompiledPolyhedron, q: int) -> bool:
+        """
+        Whether the `premise` of DPA state `q` is satisfiable, checked with the
+        DPA state substituted as in the synthesis, see
+        `CompiledModule.at_dpa_state`
+        """
+        return self._feasibility_cache.is_feasible(self.module.at_dpa_state(premise, q))
+
+    def _invariant_rows(self, q: int) -> list[LinearConstraint]:
+        if self.invariant is None:
+            return []
+        return list(map(_sublevel, self.invariant[q]))
+
+    def _invariant_polyhedron(self, q: int) -> CompiledPolyhedron:
+        rows = self._invariant_rows(q)
+        return CompiledPolyhedron(
+            tuple(a for a, _, _ in rows),
+            tuple(b for _, _, b in rows),
+            (False,) * len(rows),
+        )
+
+    def _dpa_state_guards(self, q: int) -> list[tuple[int, CompiledDNF]]:
+        """
+        Guards restricted to DPA state `q` and to its invariant, if any, as in
+        `_add_dpa_state_evaluation`, computed once
+        """
+        if q in self._guards:
+            return self._guards[q]
+        dpa_state = self.module.dpa_state(q)
+        if self.invariant is not None:
+            dpa_state = dpa_state.intersect(self._invariant_polyhedron(q))
+        guards = [
+            (
+                idx,
+                tuple(
+                    filter(
+                        partial(self._feasible, q=q),
+                        (conjunct.intersect(dpa_state) for conjunct in command.guard),
+                    )
+                ),
+            )
+            for idx, command in enumerate(self.module.commands)
+        ]
+        self._guards[q] = [guard for guard in guards if len(guard[1]) > 0]
+        return self._guards[q]
+
+    def _max_drift(
+        self,
+        v: _Linear,
+        actions: tuple[CompiledAction, ...],
+        rows: list[LinearConstraint],
+    ) -> tuple[int, int, NumVector | None]:
+        """
+        Action with the largest sign of the supremum of Post V - V over
+        `rows`, together with the sign and its point, see
+        `rational_lp.supremum_sign`
+        """
+        worst = None
+        for k, action in enumerate(actions):
+            c, d = _drift(v, action)
+            sign, point = rational_lp.supremum_sign(c, d, rows)
+            if worst is None or sign > worst[1]:
+                worst = k, sign, point
+            if sign > 0:
+                break
+        assert worst is not None
+        return worst
+
+    def _check_dpa_state(self, q: int) -> Violation | None:
+        """
+        Conditions of `verification` for DPA state `q`: at level i, every
+        guard not ranked yet does not increase V_i in expectation on its
+        premises with the objectives j >= i, strictly decreasing it if j == i
+        is odd. Guards strictly decreasing V_i on some premise are ranked.
+        The premises are restricted to the invariant of `q`, if any, through
+        the guards.
+        """
+        guards = self._dpa_state_guards(q)
+        # Rows of the satisfiable premises of each guard and objective, shared
+        # by all the levels, skipping the objective conjuncts excluding `q`.
+        # Farkas lemma encodes the conditions over the closure of the premises
+        objectives = [
+            [s_j for s_j in objective if self._feasible(s_j, q)]
+            for objective in self.objectives
+        ]
+        premises = {
+            (g, j): [
+                premise.closure().rows()
+                for premise in (
+                    conjunct.intersect(s_j)
+                    for conjunct, s_j in product(conjuncts, objectives[j])
+                )
+                if self._feasible(premise, q)
+            ]
+            for (g, conjuncts), j in product(guards, range(len(objectives)))
+        }
+        for i, level in enumerate(self.lex_psm):
+            if len(guards) == 0 or q not in level:
+                break
+            v = level[q]
+            if not any(v[0]) and v[1] < 0:
+                # The template of V_i is non-negative somewhere
+                return Violation("non_negativity", q, level=i)
+
+            ranked = set()
+            for (g, _), j in product(guards, range(i, len(self.objectives))):
+                for rows in premises[g, j]:
+                    k, sign, point = self._max_drift(
+                        v, self.module.commands[g].actions, rows
+                    )
+                    strict = j == i and j % 2 == 1
+                    if sign >= 0 if strict else sign > 0:
+                        return Violation("drift", q, g, k, i, j, point)
+                    if sign < 0:
+                        ranked.add(g)
+            guards = [guard for guard in guards if guard[0] not in ranked]
+
+        if len(guards) > 0:
+            return Violation("ranking", q, guards[0][0])
+        return None
+
+    def _check_init(self) -> Violation | None:
+        """
+        Every initial state belongs to the invariant of its own DPA state
+        """
+        assert self.invariant is not None
+        for init in self.module.init:
+            q = int(init[self.module.dpa_index])
+            if q not in self.invariant or not all(
+                sum((a * x for a, x in zip(row[0], init)), row[1]) <= 0
+                for row in self.invariant[q]
+            ):
+                return Violation("init", q, witness=init)
+        return None
+
+    def _check_non_negativity(self, q: int) -> Violation | None:
+        """
+        V_i >= 0 on the invariant of DPA state `q` for every level i
+        """
+        assert self.invariant is not None
+        rows = self._invariant_rows(q) + self.module.dpa_state(q).closure().rows()
+        for i, level in enumerate(self.lex_psm):
+            a, b = level[q]
+            sign, point = rational_lp.supremum_sign([-a_j for a_j in a], -b, rows)
+            if sign > 0:
+                return Violation("non_negativity", q, level=i, witness=point)
+        return None
+
+    def _check_consecution(self, q: int, g: int) -> Violation | None:
+        """
+        I(x, q) & g(x) & q == q => I(u(x), u[q]) for every update u of the
+        command `g`
+        """
+        assert self.invariant is not None
+        dpa_state = self.module.dpa_state(q)
+        q_index = self.module.dpa_index
+        command = self.module.commands[g]
+
+        updates = [
+            (k, update)
+            for k, action in enumerate(command.actions)
+            for _, update in action.distribution
+        ]
+        # Rows of the invariant of the successor of each update
+        posts: list[tuple[int, _Linear]] = []
+        for k, update in updates:
+            next_q = int(update.b[q_index])
+            if next_q not in self.invariant:
+                return Violation("consecution", q, g, k)
+            posts.extend((k, _compose(row, update)) for row in self.invariant[next_q])
+
+        for conjunct in command.guard:
+            premise = conjunct.intersect(dpa_state)
+            if not self._feasible(premise, q):
+                continue
+            rows = self._invariant_rows(q) + premise.closure().rows()
+            for k, (c, d) in posts:
+                sign, point = rational_lp.supremum_sign(c, d, rows)
+                if sign > 0:
+                    return Violation("consecution", q, g, k, witness=point)
+        return None
+
+    def _check_drift(self, q: int, j: int, k: int) -> Violation | None:
+        """
+        Drift conditions of `invariant_synthesis_and_verification` for DPA
+        state `q`, objective `j` and the `k`-th guard of `q`: with epsilon_i
+        the decrease of V_i on I & s_j & g, epsilon_0 >= 0 and, for i > 0,
+        epsilon_i >= 0 (> 0 if i == j is odd) whenever all the previous
+        epsilons are 0
+        """
+        assert self.invariant is not None
+        g, guard = self._dpa_state_guards(q)[k]
+        actions = self.module.commands[g].actions
+        premises = [
+            self._invariant_rows(q) + premise.closure().rows()
+            for premise in (
+                s_j_conjunct.intersect(guard_conjunct)
+                for s_j_conjunct, guard_conjunct in product(self.objectives[j], guard)
+            )
+            if self._feasible(premise, q)
+        ]
+
+        for i, level in enumerate(self.lex_psm):
+            # Sign of the largest epsilon_i allowed by all the premises and
+            # actions, -1 without constraints on epsilon_i
+            worst = (0, -1, None)
+            for rows in premises:
+                result = self._max_drift(level[q], actions, rows)
+                if result[1] > worst[1]:
+                    worst = result
+                if worst[1] > 0:
+                    break
+
+            action, sign, point = worst
+            strict = i == j and i % 2 == 1
+            if sign >= 0 if strict else sign > 0:
+                return Violation("drift", q, g, action, i, j, point)
+            if sign < 0:
+                return None
+        return None
+
+
+# State of a checker worker process
+_worker_checker: _Checker | None = None
+
+
+def _init_worker(checker: _Checker) -> None:
+    global _worker_checker
+    _worker_checker = checker
+
+
+def _check_task(task: _Task) -> Violation | None:
+    assert _worker_checker is not None
+    return _worker_checker.check(task)
+
+
+def check_certificate(
+    module: ReactiveModule,
+    objectives: list[ParityObjective],
+    q_states: list[int],
+    lex_psm: list[dict[int, LinearFunction]],
+    invariant: dict[int, LinearFunction] | None = None,
+    workers: int | None = None,
+    engine: Engine | None = None,
+) -> Violation | None:
+    """
+    Check with exact LPs that `lex_psm` (and the linear `invariant`,
+    if given) satisfies the conditions imposed by `verification` (resp.
+    `invariant_synthesis_and_verification`) on `module` for the parity
+    `objectives` and the DPA states `q_states`. Returns the first violated
+    condition found, None if the certificate is valid. Each LP is first
+    solved in floating point, its result being confirmed in exact rational
+    arithmetic, see `rational_lp.supremum_sign`.
+    The conditions are the ones of `engine`, by default `verification`
+    without an invariant and `invariant_synthesis` with one. An invariant
+    of `verification` has to be inductive and restricts its premises.
+    With `workers` the independent conditions are checked by a pool of as
+    many processes, killed as soon as a violation is found.
+    """
+    return check_compiled_certificate(
+        compile_module(module),
+        [compile_dnf(s_j, module.vars) for s_j in objectives],
+        q_states,
+        lex_psm,
+        invariant,
+        workers,
+        engine,
+    )
+
+
+def check_compiled_certificate(
+    module: CompiledModule,
+    objectives: list[CompiledDNF],
+    q_states: list[int],
+    lex_psm: list[dict[int, LinearFunction]],
+    invariant: dict[int, LinearFunction] | None = None,
+    workers: int | None = None,
+    engine: Engine | None = None,
+) -> Violation | None:
+    """
+    Same as `check_certificate` for an already compiled module and objectives
+    """
+    if engine is None:
+        engine = "verification" if invariant is None else "invariant_synthesis"
+    assert engine == "verification" or invariant is not None
+    checker = _Checker(
+        module,
+        objectives,
+        [{q: _to_linear(f) for q, f in level.items()} for level in lex_psm],
+        (
+            None
+            if invariant is None
+            else {q: _to_linears(f) for q, f in invariant.items()}
+        ),
+        q_states,
+        engine,
+    )
+    tasks = checker.tasks()
+
+    if workers is None or workers <= 1:
+        for task in tasks:
+            violation = checker.check(task)
+            if violation is not None:
+                return violation
+        return None
+
+    pool = process_pool(workers, _init_worker, (checker,))
+    try:
+        futures = [pool.submit(_check_task, task) for task in tasks]
+        for future in as_completed(futures):
+            violation = future.result()
+            if violation is not None:
+                return violation
+        return None
+    finally:
+        # Stop at the first violation, without waiting for the running checks
+        terminate(pool)
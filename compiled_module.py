@@ -0,0 +1,293 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import cached_property
+from itertools import chain
+from random import Random
+
+from sympy import Matrix, S, Symbol, linear_eq_to_matrix
+from sympy.logic.boolalg import Boolean
+
+from rational_lp import LinearConstraint
+from reactive_module import Assignment, ReactiveModule, StochasticUpdate, Update
+from utils import (
+    get_symbol_assignment,
+    parse_DNF,
+    parse_conjunct,
+    parse_constraint,
+    parse_strictness,
+    to_fraction,
+)
+
+NumVector = tuple[Fraction, ...]
+NumMatrix = tuple[NumVector, ...]
+# Non-zero entries (j, v_j) of a vector, by increasing index j
+SparseVector = tuple[tuple[int, Fraction], ...]
+
+
+@dataclass(frozen=True)
+class CompiledPolyhedron:
+    """
+    Polyhedron `a x <= b`, with strict inequalities on the rows flagged in
+    `strict`
+    """
+
+    a: NumMatrix
+    b: NumVector
+    strict: tuple[bool, ...]
+
+    def __len__(self) -> int:
+        return len(self.b)
+
+    def intersect(self, other: "CompiledPolyhedron") -> "CompiledPolyhedron":
+        return CompiledPolyhedron(
+            self.a + other.a, self.b + other.b, self.strict + other.strict
+        )
+
+    def a_matrix(self, n: int) -> Matrix:
+        return Matrix(len(self), n, list(chain.from_iterable(self.a)))
+
+    def b_matrix(self) -> Matrix:
+        return Matrix(len(self), 1, list(self.b))
+
+    def fix(self, j: int, value: Fraction) -> "CompiledPolyhedron":
+        """
+        Polyhedron over the other variables with `x_j == value`, the column
+        `j` left zero and the rows made trivially true dropped
+        """
+        rows = [
+            (a_i[:j] + (Fraction(0),) + a_i[j + 1 :], b_i - a_i[j] * value, strict)
+            for a_i, b_i, strict in zip(self.a, self.b, self.strict)
+        ]
+        rows = [
+            (a_i, b_i, strict)
+            for a_i, b_i, strict in rows
+            if any(a_i) or (b_i < 0 or (strict and b_i == 0))
+        ]
+        return CompiledPolyhedron(
+            tuple(a_i for a_i, _, _ in rows),
+            tuple(b_i for _, b_i, _ in rows),
+            tuple(strict for _, _, strict in rows),
+        )
+
+    def rows(self) -> list[LinearConstraint]:
+        """
+        Rows of the polyhedron as constraints of `rational_lp`
+        """
+        return [
+            (a_i, "<" if strict else "<=", b_i)
+            for a_i, b_i, strict in zip(self.a, self.b, self.strict)
+        ]
+
+    def closure(self) -> "CompiledPolyhedron":
+        return CompiledPolyhedron(self.a, self.b, (False,) * len(self))
+
+    def contains(self, x: NumVector) -> bool:
+        return all(
+            (lhs < b_i if strict else lhs <= b_i)
+            for lhs, b_i, strict in zip(
+                (sum(a_ij * x_j for a_ij, x_j in zip(a_i, x)) for a_i in self.a),
+                self.b,
+                self.strict,
+            )
+        )
+
+
+# Disjunction of polyhedra
+CompiledDNF = tuple[CompiledPolyhedron, ...]
+
+
+@dataclass(frozen=True)
+class AffineMap:
+    """
+    Affine function x -> a x + b, with the rows of `a` given by their non-zero
+    entries
+    """
+
+    a: tuple[SparseVector, ...]
+    b: NumVector
+
+    @cached_property
+    def columns(self) -> tuple[SparseVector, ...]:
+        """
+        Non-zero entries (i, a_ij) of each column j of `a`
+        """
+        columns: list[list[tuple[int, Fraction]]] = [[] for _ in self.b]
+        for i, a_i in enumerate(self.a):
+            for j, a_ij in a_i:
+                columns[j].append((i, a_ij))
+        return tuple(map(tuple, columns))
+
+    def __call__(self, x: NumVector) -> NumVector:
+        return tuple(
+            sum((a_ij * x[j] for j, a_ij in a_i), b_i)
+            for a_i, b_i in zip(self.a, self.b)
+        )
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+    distribution: tuple[tuple[Fraction, AffineMap], ...]
+    # Expected update (sum(p_i * a_i), sum(p_i * b_i)) over the distribution
+    expected: AffineMap
+
+
+@dataclass(frozen=True)
+class CompiledCommand:
+    guard: CompiledDNF
+    actions: tuple[CompiledAction, ...]
+
+
+@dataclass(frozen=True)
+class CompiledModule:
+    """
+    Numeric representation of a `ReactiveModule`, computed once from its
+    symbolic guards and updates
+    """
+
+    vars: tuple[Symbol, ...]
+    init: tuple[NumVector, ...]
+    commands: tuple[CompiledCommand, ...]
+    # Finite-domain variable of the DPA state
+    dpa_var: Symbol = Symbol("q")
+
+    @property
+    def dpa_index(self) -> int:
+        return self.vars.index(self.dpa_var)
+
+    def dpa_state(self, q: int) -> CompiledPolyhedron:
+        """
+        Polyhedron `dpa_var == q`
+        """
+        (polyhedron,) = compile_dnf(get_symbol_assignment(self.dpa_var, q), self.vars)
+        return polyhedron
+
+    def at_dpa_state(
+        self, polyhedron: CompiledPolyhedron, q: int
+    ) -> CompiledPolyhedron:
+        """
+        `polyhedron` & `dpa_var == q` without the DPA state variable, i.e.
+        with `q` substituted for it
+        """
+        return polyhedron.fix(self.dpa_index, Fraction(q))
+
+
+def compile_dnf(dnf: Boolean, vars: tuple[Symbol, ...]) -> CompiledDNF:
+    def compile_conjunct(conjunct: Boolean) -> CompiledPolyhedron:
+        constraints = parse_conjunct(conjunct)
+        a, b = linear_eq_to_matrix(
+            list(chain.from_iterable(map(parse_constraint, constraints))), vars
+        )
+        return CompiledPolyhedron(
+            tuple(
+                tuple(to_fraction(a[i, j]) for j in range(a.shape[1]))
+                for i in range(a.shape[0])
+            ),
+            tuple(to_fraction(b[i, 0]) for i in range(b.shape[0])),
+            tuple(chain.from_iterable(map(parse_strictness, constraints))),
+        )
+
+    return tuple(map(compile_conjunct, parse_DNF(dnf)))
+
+
+def _sparse(v: Mapping[int, Fraction]) -> SparseVector:
+    return tuple(sorted((j, v_j) for j, v_j in v.items() if v_j != 0))
+
+
+def _compile_assignment(assignment: Assignment, vars: tuple[Symbol, ...]) -> AffineMap:
+    index = {var: j for j, var in enumerate(vars)}
+    rows = [{j: Fraction(1)} for j in range(len(vars))]
+    b = [Fraction(0)] * len(vars)
+    for var, e in assignment.items():
+        i = index[var]
+        rows[i] = {}
+        for factor, coeff in S(e).as_coefficients_dict().items():
+            if factor == S.One:
+                b[i] = to_fraction(coeff)
+            elif factor in index:
+                rows[i][index[factor]] = to_fraction(coeff)
+            else:
+                raise ValueError(f"Expected an affine update of {var}: {e}")
+    return AffineMap(tuple(map(_sparse, rows)), tuple(b))
+
+
+def compile_update(update: Update, vars: tuple[Symbol, ...]) -> AffineMap:
+    """
+    Affine map of the matrices `(a, b)` of `x' = a x + b`, or of the
+    assignment of affine expressions to some of the `vars`, leaving the others
+    unchanged
+    """
+    match update:
+        case (a, b):
+            rows: list[dict[int, Fraction]] = [{} for _ in range(a.shape[0])]
+            for (i, j), a_ij in a.todok().items():
+                rows[i][j] = to_fraction(a_ij)
+            return AffineMap(
+                tuple(map(_sparse, rows)),
+                tuple(to_fraction(b[i, 0]) for i in range(b.shape[0])),
+            )
+        case _:
+            return _compile_assignment(update, vars)
+
+
+def compile_action(
+    action: StochasticUpdate, vars: tuple[Symbol, ...]
+) -> CompiledAction:
+    distribution = tuple(
+        (to_fraction(p), compile_update(update, vars)) for p, update in action
+    )
+    # Expected update, accumulated over the non-zero entries only
+    rows: list[dict[int, Fraction]] = [{} for _ in vars]
+    for p, u in distribution:
+        for row, u_i in zip(rows, u.a):
+            for j, a_ij in u_i:
+                row[j] = row.get(j, Fraction(0)) + p * a_ij
+    expected = AffineMap(
+        tuple(map(_sparse, rows)),
+        tuple(
+            sum((p * u.b[i] for p, u in distribution), Fraction(0))
+            for i in range(len(vars))
+        ),
+    )
+    return CompiledAction(distribution, expected)
+
+
+def compile_module(module: ReactiveModule) -> CompiledModule:
+    return CompiledModule(
+        module.vars,
+        tuple(tuple(map(to_fraction, state)) for state in module.init),
+        tuple(
+            CompiledCommand(
+                compile_dnf(guard, module.vars),
+                tuple(compile_action(action, module.vars) for action in actions),
+            )
+            for guard, actions in module.body
+        ),
+        module.dpa_var,
+    )
+
+
+def sample_states(
+    module: CompiledModule, samples: int, rng: Random, run_length: int = 16
+) -> list[NumVector]:
+    """
+    `samples` states visited by random runs of `module` of at most
+    `run_length` states from its initial states
+    """
+    states: list[NumVector] = []
+    while len(states) < samples:
+        x = rng.choice(module.init)
+        for _ in range(min(run_length, samples - len(states))):
+            states.append(x)
+            enabled = [
+                command
+                for command in module.commands
+                if any(conjunct.contains(x) for conjunct in command.guard)
+            ]
+            if len(enabled) == 0:
+                break
+            distribution = rng.choice(rng.choice(enabled).actions).distribution
+            probabilities = [float(p) for p, _ in distribution]
+            ((_, update),) = rng.choices(distribution, probabilities)
+            x = update(x)
+    return states
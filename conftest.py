@@ -0,0 +1 @@
+# Makes the top-level modules importable from the tests
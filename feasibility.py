@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+from fractions import Fraction
+
+from z3 import Context, Real, RealVal, Solver, Sum, sat
+
+import rational_lp
+from rational_lp import Relation
+from compiled_module import CompiledPolyhedron
+
+# Row (a, ~, b) of the constraint a_1 * x_1 + ... + a_n * x_n ~ b
+Row = tuple[tuple[Fraction, ...], Relation, Fraction]
+Polyhedron = frozenset[Row]
+
+
+def canonical_row(a: Sequence[Fraction], rel: Relation, b: Fraction) -> Row | None:
+    """
+    Scale the constraint `a x ~ b` so that its first non-zero coefficient
+    has absolute value 1. Trivially valid constraints are mapped to None,
+    trivially invalid ones to `0 x <= -1`.
+    """
+    pivot = next((abs(coeff) for coeff in a if coeff != 0), None)
+    if pivot is None:
+        valid = {"<=": b >= 0, "<": b > 0, "==": b == 0}[rel]
+        return None if valid else (tuple(a), "<=", Fraction(-1))
+    return (tuple(coeff / pivot for coeff in a), rel, b / pivot)
+
+
+def canonical_polyhedron(polyhedron: CompiledPolyhedron) -> Polyhedron:
+    """
+    Canonical form of `polyhedron`, invariant under positive scaling,
+    permutation and duplication of its rows.
+    """
+    rows = (canonical_row(*row) for row in polyhedron.rows())
+    return frozenset(row for row in rows if row is not None)
+
+
+def reduce_polyhedron(
+    polyhedron: CompiledPolyhedron, lp_max_rows: int = 64
+) -> CompiledPolyhedron:
+    """
+    Polyhedron with the same closure as the satisfiable `polyhedron`, without
+    its trivially valid and duplicate rows and with the parallel rows merged
+    into the tightest one, each row scaled as in `canonical_row`. With at
+    most `lp_max_rows` rows left, the rows implied by the closure of the
+    others are dropped as well, each checked with an exact LP. The rows of an
+    equality, i.e. the opposite rows, are always kept.
+    """
+    rows: dict[tuple[Fraction, ...], tuple[Fraction, bool]] = {}
+    for a, rel, b in polyhedron.rows():
+        row = canonical_row(a, rel, b)
+        if row is None:
+            continue
+        key, rel, b = row
+        previous = rows.get(key)
+        if previous is None or (b, rel != "<") < (previous[0], not previous[1]):
+            rows[key] = (b, rel == "<")
+
+    if len(rows) <= lp_max_rows:
+        for key, (b, _) in list(rows.items()):
+            opposite = rows.get(tuple(-a_j for a_j in key))
+            if opposite is not None and opposite[0] == -b:
+                continue
+            others = [
+                (other, "<=", b_other)
+                for other, (b_other, _) in rows.items()
+                if other != key
+            ]
+            if len(others) == 0:
+                break
+            result = rational_lp.maximize(key, others)
+            if result.status == "optimal" and result.value <= b:
+                del rows[key]
+
+    return CompiledPolyhedron(
+        tuple(rows),
+        tuple(b for b, _ in rows.values()),
+        tuple(strict for _, strict in rows.values()),
+    )
+
+
+class FeasibilityCache:
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        exact_lp_max_rows: int = 64,
+        ctx: Context | None = None,
+        float_first: bool = False,
+    ) -> None:
+        """
+        Bounded LRU cache of feasibility results of polyhedra `A x <= b`.
+        Results are also reused across subsets and supersets of cached
+        polyhedra: subsets of a feasible polyhedron are feasible, supersets of
+        an infeasible one are infeasible.
+        Polyhedra with at most `exact_lp_max_rows` rows are checked with the
+        exact rational simplex of `rational_lp`, larger ones with z3 in the
+        context `ctx`. With `float_first` the rational simplex is preceded by
+        a floating point one, see `rational_lp.feasible_float_first`.
+        The reductions of the polyhedra, see `reduce`, are cached as well.
+        """
+        self.maxsize = maxsize
+        self.exact_lp_max_rows = exact_lp_max_rows
+        self.float_first = float_first
+        self._ctx = ctx
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[Polyhedron, bool] = OrderedDict()
+        self._polyhedra_by_row: dict[Row, set[Polyhedron]] = {}
+        self._reduced: OrderedDict[CompiledPolyhedron, CompiledPolyhedron] = (
+            OrderedDict()
+        )
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._results),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._results.clear()
+        self._polyhedra_by_row.clear()
+        self._reduced.clear()
+
+    def is_feasible(self, polyhedron: CompiledPolyhedron) -> bool:
+        """
+        Whether there exists a point in `polyhedron`
+        """
+        return self.is_feasible_canonical(canonical_polyhedron(polyhedron))
+
+    def reduce(self, polyhedron: CompiledPolyhedron) -> CompiledPolyhedron:
+        """
+        `reduce_polyhedron` of the satisfiable `polyhedron`
+        """
+        reduced = self._reduced.get(polyhedron)
+        if reduced is not None:
+            self._reduced.move_to_end(polyhedron)
+            return reduced
+        reduced = reduce_polyhedron(polyhedron, self.exact_lp_max_rows)
+        self._reduced[polyhedron] = reduced
+        if len(self._reduced) > self.maxsize:
+            self._reduced.popitem(last=False)
+        return reduced
+
+    def is_feasible_canonical(self, polyhedron: Polyhedron) -> bool:
+        result = self._lookup(polyhedron)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = self._solve(polyhedron)
+        self._store(polyhedron, result)
+        return result
+
+    def _lookup(self, polyhedron: Polyhedron) -> bool | None:
+        if len(polyhedron) == 0:
+            return True
+
+        if polyhedron in self._results:
+            self._results.move_to_end(polyhedron)
+            return self._results[polyhedron]
+
+        candidates = [self._polyhedra_by_row.get(row, set()) for row in polyhedron]
+
+        # A feasible superset of the polyhedron contains all of its rows
+        for superset in set.intersection(*candidates):
+            if self._results[superset]:
+                self._results.move_to_end(superset)
+                return True
+
+        # An infeasible subset of the polyhedron shares at least one of its rows
+        for subset in set.union(*candidates):
+            if not self._results[subset] and subset <= polyhedron:
+                self._results.move_to_end(subset)
+                return False
+
+        return None
+
+    def _store(self, polyhedron: Polyhedron, result: bool) -> None:
+        self._results[polyhedron] = result
+        for row in polyhedron:
+            self._polyhedra_by_row.setdefault(row, set()).add(polyhedron)
+
+        while len(self._results) > self.maxsize:
+            evicted, _ = self._results.popitem(last=False)
+            for row in evicted:
+                polyhedra = self._polyhedra_by_row[row]
+                polyhedra.discard(evicted)
+                if len(polyhedra) == 0:
+                    del self._polyhedra_by_row[row]
+
+    def _solve(self, polyhedron: Polyhedron) -> bool:
+        if any(not any(a) for a, _, _ in polyhedron):
+            # Trivially invalid row, see `canonical_row`
+            return False
+        n = len(next(iter(polyhedron))[0])
+        if len(polyhedron) <= self.exact_lp_max_rows:
+            if self.float_first:
+                return rational_lp.feasible_float_first(list(polyhedron), n)
+            return rational_lp.feasible(list(polyhedron), n)
+
+        ctx = self._ctx
+        x = [Real(f"x_{i}", ctx) for i in range(n)]
+        solver = Solver(ctx=ctx)
+        for a, rel, b in polyhedron:
+            ax = Sum(
+                [RealVal(0, ctx)]
+                + [RealVal(coeff, ctx) * x_i for coeff, x_i in zip(a, x) if coeff != 0]
+            )
+            match rel:
+                case "<=":
+                    solver.add(ax <= RealVal(b, ctx))
+                case "<":
+                    solver.add(ax < RealVal(b, ctx))
+                case "==":
+                    solver.add(ax == RealVal(b, ctx))
+        return solver.check() == sat
@@ -0,0 +1,354 @@
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from fractions import Fraction
+
+from sympy import Expr, Matrix, S, Symbol
+from z3 import (
+    ArithRef,
+    BoolRef,
+    Context,
+    ExprRef,
+    RealVal,
+    Sum,
+    is_const,
+    is_false,
+    is_int_value,
+    is_rational_value,
+    is_true,
+)
+
+from rational_lp import Relation
+from utils import SynthesisContext, get_z3_var, to_fraction
+
+
+@dataclass(frozen=True)
+class LinearTerm:
+    """
+    Affine term `sum(c * v for c, v in coeffs) + constant` over z3 variables,
+    e.g. the unknown coefficients of a template, with non-zero coefficients
+    """
+
+    coeffs: tuple[tuple[Fraction, ArithRef], ...] = ()
+    constant: Fraction = Fraction(0)
+
+    def evaluate(self, value: Callable[[ArithRef], Fraction]) -> Fraction:
+        return sum((c * value(v) for c, v in self.coeffs), self.constant)
+
+
+@dataclass(frozen=True)
+class TermConstraint:
+    """
+    Linear constraint `term ~ 0`, given to the solver backends as it is, see
+    `solver_backend.Backend.add`
+    """
+
+    term: LinearTerm
+    rel: Relation
+
+
+# Constraint of a query, linear or not
+Constraint = BoolRef | TermConstraint
+
+
+def constant(value: Fraction) -> LinearTerm:
+    return LinearTerm((), Fraction(value))
+
+
+def variable(var: ArithRef) -> LinearTerm:
+    return LinearTerm(((Fraction(1), var),))
+
+
+def combine(terms: Iterable[tuple[Fraction, LinearTerm]]) -> LinearTerm:
+    """
+    Linear combination of the `terms` with their weights, skipping the zero
+    weights and coefficients
+    """
+    coeffs: dict[int, tuple[Fraction, ArithRef]] = {}
+    total = Fraction(0)
+    for weight, term in terms:
+        if weight == 0:
+            continue
+        total += weight * term.constant
+        for c, v in term.coeffs:
+            previous, _ = coeffs.get(v.get_id(), (Fraction(0), v))
+            coeffs[v.get_id()] = (previous + weight * c, v)
+    return LinearTerm(tuple((c, v) for c, v in coeffs.values() if c != 0), total)
+
+
+def negate(term: LinearTerm) -> LinearTerm:
+    return combine([(Fraction(-1), term)])
+
+
+def fix(
+    c: Sequence[LinearTerm], d: LinearTerm, j: int, value: Fraction
+) -> tuple[list[LinearTerm], LinearTerm]:
+    """
+    Terms of `c^T x <= d` with `value` substituted for `x_j`, the coefficient
+    of `x_j` left zero
+    """
+    c = list(c)
+    c_j, c[j] = c[j], LinearTerm()
+    return c, combine([(Fraction(1), d), (-value, c_j)])
+
+
+# Coefficients by z3 variable id and constant of a `LinearTerm`
+TermKey = tuple[tuple[tuple[int, Fraction], ...], Fraction]
+
+
+def term_key(term: LinearTerm) -> TermKey:
+    """
+    Hashable key of `term`, equal for the terms with the same coefficients
+    of the same variables
+    """
+    return tuple(sorted((v.get_id(), c) for c, v in term.coeffs)), term.constant
+
+
+def farkas_key(
+    a: Sequence[Sequence[LinearTerm]],
+    b: Sequence[LinearTerm],
+    c: Sequence[LinearTerm],
+    d: LinearTerm,
+) -> tuple:
+    """
+    Hashable key of the instance `a x <= b => c^T x <= d`, equal for the
+    instances with the same terms, see `term_key`
+    """
+    return (
+        tuple(tuple(map(term_key, a_i)) for a_i in a),
+        tuple(map(term_key, b)),
+        tuple(map(term_key, c)),
+        term_key(d),
+    )
+
+
+def linear_term(e: Expr, ctx: SynthesisContext) -> LinearTerm:
+    """
+    Term of the affine sympy expression `e` over symbols declared in `ctx`
+    """
+    coeffs: list[tuple[Fraction, ArithRef]] = []
+    value = Fraction(0)
+    for factor, coeff in S(e).as_coefficients_dict().items():
+        if factor == S.One:
+            value += to_fraction(coeff)
+        elif isinstance(factor, Symbol):
+            coeffs.append((to_fraction(coeff), get_z3_var(factor, ctx)))
+        else:
+            raise ValueError(f"Expected an affine expression: {e}")
+    return LinearTerm(tuple((c, v) for c, v in coeffs if c != 0), value)
+
+
+def linear_terms(m: Matrix, ctx: SynthesisContext) -> list[list[LinearTerm]]:
+    """
+    Terms of the entries of the matrix `m` of affine sympy expressions, by row
+    """
+    return [
+        [linear_term(m[i, j], ctx) for j in range(m.shape[1])]
+        for i in range(m.shape[0])
+    ]
+
+
+def farkas_constraints(
+    a: Sequence[Sequence[LinearTerm]],
+    b: Sequence[LinearTerm],
+    c: Sequence[LinearTerm],
+    d: LinearTerm,
+    z: Sequence[ArithRef],
+    ctx: Context,
+) -> list[BoolRef]:
+    """
+    Constraints `a^T z == c` and `b^T z <= d` of the Farkas lemma, each row a
+    single sum over the non-zero coefficients. Entries of `a` and `b` with
+    variables give products with the multipliers `z`.
+    """
+
+    def row(
+        entries: Sequence[LinearTerm], rhs: LinearTerm
+    ) -> tuple[ArithRef, ArithRef]:
+        # entries . z - variables of rhs, and the constant of rhs
+        terms: list[ArithRef] = []
+        for entry, z_i in zip(entries, z):
+            if entry.constant != 0:
+                terms.append(_times(entry.constant, z_i, ctx))
+            terms.extend(_times(coeff, var * z_i, ctx) for coeff, var in entry.coeffs)
+        terms.extend(_times(-coeff, var, ctx) for coeff, var in rhs.coeffs)
+        return _sum(terms, ctx), RealVal(rhs.constant, ctx)
+
+    constraints: list[BoolRef] = []
+    for j, c_j in enumerate(c):
+        lhs, rhs = row([a_i[j] for a_i in a], c_j)
+        constraints.append(lhs == rhs)
+    lhs, rhs = row(b, d)
+    constraints.append(lhs <= rhs)
+    return constraints
+
+
+def linear_farkas_constraints(
+    a: Sequence[Sequence[LinearTerm]],
+    b: Sequence[LinearTerm],
+    c: Sequence[LinearTerm],
+    d: LinearTerm,
+    z: Sequence[ArithRef],
+) -> list[TermConstraint]:
+    """
+    Constraints of `farkas_constraints` for numeric `a` and `b`, linear in the
+    multipliers `z` and the variables of `c` and `d`
+    """
+
+    def row(entries: Sequence[LinearTerm], rhs: LinearTerm) -> LinearTerm:
+        # entries . z - rhs
+        return combine(
+            [(entry.constant, variable(z_i)) for entry, z_i in zip(entries, z)]
+            + [(Fraction(-1), rhs)]
+        )
+
+    constraints = [
+        TermConstraint(row([a_i[j] for a_i in a], c_j), "==") for j, c_j in enumerate(c)
+    ]
+    constraints.append(TermConstraint(row(b, d), "<="))
+    return constraints
+
+
+def is_numeric(term: LinearTerm) -> bool:
+    return len(term.coeffs) == 0
+
+
+def is_variable(e: ExprRef) -> bool:
+    """
+    Whether `e` is a z3 variable, i.e. a constant other than a value
+    """
+    return is_const(e) and not (
+        is_rational_value(e) or is_int_value(e) or is_true(e) or is_false(e)
+    )
+
+
+def to_z3_term(term: LinearTerm, ctx: Context) -> ArithRef:
+    terms = [_times(c, v, ctx) for c, v in term.coeffs]
+    if term.constant != 0:
+        terms.append(RealVal(term.constant, ctx))
+    return _sum(terms, ctx)
+
+
+def to_z3_constraint(constraint: TermConstraint, ctx: Context) -> BoolRef:
+    """
+    `constraint` as the z3 constraint `sum(c * v) ~ -constant`
+    """
+    term = constraint.term
+    lhs = to_z3_term(LinearTerm(term.coeffs), ctx)
+    rhs = RealVal(-term.constant, ctx)
+    match constraint.rel:
+        case "<=":
+            return lhs <= rhs
+        case "<":
+            return lhs < rhs
+        case "==":
+            return lhs == rhs
+
+
+def to_z3_constraints(constraints: Iterable[Constraint], ctx: Context) -> list[BoolRef]:
+    return [
+        to_z3_constraint(c, ctx) if isinstance(c, TermConstraint) else c
+        for c in constraints
+    ]
+
+
+def eliminate_equalities(
+    a: Sequence[Sequence[LinearTerm]],
+    b: Sequence[LinearTerm],
+    c: Sequence[LinearTerm],
+    d: LinearTerm,
+) -> tuple[list[list[LinearTerm]], list[LinearTerm], list[LinearTerm], LinearTerm]:
+    """
+    Instance `a' x' <= b' => c'^T x' <= d'` equivalent to `a x <= b =>
+    c^T x <= d`, without the variables fixed by the equalities of the premise,
+    i.e. the pairs of opposite rows with numeric coefficients. Each equality
+    is solved for one of its variables, which is substituted in the other rows
+    and in the consequence: the same as a single free-sign Farkas multiplier
+    for the equality, with one column less. The columns without coefficients,
+    e.g. of variables already substituted, are dropped as well.
+    """
+    rows = [(list(a_i), b_i) for a_i, b_i in zip(a, b)]
+    unpaired: dict[tuple[tuple[Fraction, ...], Fraction], list[int]] = {}
+    paired: set[int] = set()
+    equalities: list[tuple[list[LinearTerm], LinearTerm]] = []
+    for i, (a_i, b_i) in enumerate(rows):
+        if not all(map(is_numeric, (*a_i, b_i))):
+            continue
+        key = (tuple(a_ij.constant for a_ij in a_i), b_i.constant)
+        opposite = unpaired.get((tuple(-a_ij for a_ij in key[0]), -key[1]), [])
+        if len(opposite) > 0:
+            paired.update((opposite.pop(), i))
+            equalities.append(rows[i])
+        else:
+            unpaired.setdefault(key, []).append(i)
+    inequalities = [row for i, row in enumerate(rows) if i not in paired]
+
+    c = list(c)
+    eliminated: set[int] = set()
+    for k, (e, f) in enumerate(equalities):
+        pivots = [j for j, e_j in enumerate(e) if e_j.constant != 0]
+        if len(pivots) == 0:
+            # 0 == f, kept as it is unless trivial
+            if f.constant != 0:
+                inequalities.append((e, f))
+                inequalities.append(([negate(e_j) for e_j in e], negate(f)))
+            continue
+        p = pivots[0]
+        eliminated.add(p)
+        for i, (a_i, b_i) in enumerate(inequalities):
+            inequalities[i] = (a_i, _substitute(a_i, b_i, p, e, f))
+        d = _substitute(c, d, p, e, f)
+        for i, (e_i, f_i) in enumerate(equalities[k + 1 :], k + 1):
+            equalities[i] = (e_i, _substitute(e_i, f_i, p, e, f))
+    eliminated.update(
+        j
+        for j, c_j in enumerate(c)
+        if _is_zero(c_j) and all(_is_zero(a_i[j]) for a_i, _ in inequalities)
+    )
+
+    return (
+        [
+            [a_ij for j, a_ij in enumerate(a_i) if j not in eliminated]
+            for a_i, _ in inequalities
+        ],
+        [b_i for _, b_i in inequalities],
+        [c_j for j, c_j in enumerate(c) if j not in eliminated],
+        d,
+    )
+
+
+def _is_zero(term: LinearTerm) -> bool:
+    return is_numeric(term) and term.constant == 0
+
+
+def _substitute(
+    t: list[LinearTerm],
+    rhs: LinearTerm,
+    p: int,
+    e: Sequence[LinearTerm],
+    f: LinearTerm,
+) -> LinearTerm:
+    """
+    Substitutes x_p = (f - sum(e_j x_j for j != p)) / e_p in `t^T x <= rhs`,
+    updating the coefficients `t` in place and returning the updated `rhs`
+    """
+    t_p, t[p] = t[p], LinearTerm()
+    if _is_zero(t_p):
+        return rhs
+    e_p = e[p].constant
+    for j, e_j in enumerate(e):
+        if j != p and e_j.constant != 0:
+            t[j] = combine([(Fraction(1), t[j]), (-e_j.constant / e_p, t_p)])
+    return combine([(Fraction(1), rhs), (-f.constant / e_p, t_p)])
+
+
+def _times(coeff: Fraction, e: ArithRef, ctx: Context) -> ArithRef:
+    return e if coeff == 1 else RealVal(coeff, ctx) * e
+
+
+def _sum(terms: list[ArithRef], ctx: Context) -> ArithRef:
+    match terms:
+        case []:
+            return RealVal(0, ctx)
+        case [term]:
+            return term
+    return Sum(terms)
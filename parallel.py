@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import signal
+import sys
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from ctypes import c_byte
+from multiprocessing.connection import Connection
+from multiprocessing.context import BaseContext
+
+
+def _register_worker(
+    pids: Connection,
+    terminated: c_byte,
+    initializer: Callable[..., None] | None,
+    initargs: tuple,
+) -> None:
+    # Small messages are written atomically, so that killing a worker never
+    # leaves a lock held by it. A worker started after `terminate` read the
+    # PIDs kills itself.
+    pids.send(os.getpid())
+    if terminated.value:
+        os.kill(os.getpid(), signal.SIGTERM)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+class ProcessPool(ProcessPoolExecutor):
+    """
+    `ProcessPoolExecutor` recording the PIDs of its workers, so that they can
+    be killed by `terminate`
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        context: BaseContext,
+        initializer: Callable[..., None] | None,
+        initargs: tuple,
+    ) -> None:
+        self._worker_pids, pids = context.Pipe(duplex=False)
+        self._terminated = context.RawValue("b", 0)
+        super().__init__(
+            workers,
+            mp_context=context,
+            initializer=_register_worker,
+            initargs=(pids, self._terminated, initializer, initargs),
+        )
+
+
+def process_pool(
+    workers: int,
+    initializer: Callable[..., None] | None = None,
+    initargs: tuple = (),
+) -> ProcessPool:
+    """
+    Pool of `workers` processes. On Linux the workers are forked, so that
+    scripts defining their models at top level are not executed again in
+    every worker. Elsewhere forking is unavailable or unsafe, and the workers
+    are started by the default method of the platform: scripts using a pool
+    must then guard their entry point with `if __name__ == "__main__"`, and
+    `initargs` must be picklable.
+    """
+    start_method = "fork" if sys.platform.startswith("linux") else None
+    return ProcessPool(
+        workers, multiprocessing.get_context(start_method), initializer, initargs
+    )
+
+
+def terminate(pool: ProcessPool) -> None:
+    """
+    Shut `pool` down without waiting for its tasks: the pending ones are
+    cancelled and the workers running the others are killed
+    """
+    pool._terminated.value = 1
+    while pool._worker_pids.poll():
+        with suppress(ProcessLookupError):
+            os.kill(pool._worker_pids.recv(), signal.SIGTERM)
+    # The pool, broken by the killed workers, joins all of them
+    pool.shutdown(wait=True, cancel_futures=True)
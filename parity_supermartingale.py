@@ -1,51 +1,85 @@
+from collections.abc import Iterable, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from fractions import Fraction
 from functools import partial
+from random import Random
+from typing import Literal, TypeVar
 from sympy.logic.boolalg import Boolean
 from reactive_module import (
-    Guard,
-    GuardedCommand,
-    NonDeterministicStochasticUpdate,
-    ProbabilisticUpdate,
-    ProgramState,
     ReactiveModule,
 )
 
+from collections.abc import Callable, Iterator
 from itertools import chain, product
 
 from z3 import (
     And as z3_And,
+    ArithRef,
+    Bool,
     BoolRef,
-    ExprRef,
     Implies,
-    ModelRef,
     Optimize,
-    Or,
+    parse_smt2_string,
     Solver,
-    sat,
-    unsat,
+    is_algebraic_value,
+    is_true,
 )
-from sympy import Add, And, Eq, Expr, Symbol, Matrix, linear_eq_to_matrix, zeros
-
+from sympy import S, Symbol, Matrix
+
+import rational_lp
+from abstract_interpretation import interval_invariants
+from bilinear import Assignment, alternating_solve
+from certificate_cache import (
+    CertificateCache,
+    certificate_key,
+    from_certificate,
+    to_certificate,
+)
+from certificate_checker import check_compiled_certificate
+from compiled_module import (
+    AffineMap,
+    CompiledAction,
+    CompiledDNF,
+    CompiledPolyhedron,
+    compile_dnf,
+    compile_module,
+    sample_states,
+)
+from feasibility import FeasibilityCache
+from linear_terms import (
+    Constraint,
+    LinearTerm,
+    TermConstraint,
+    combine,
+    constant,
+    eliminate_equalities,
+    farkas_constraints,
+    farkas_key,
+    fix,
+    is_numeric,
+    linear_farkas_constraints,
+    linear_term,
+    linear_terms,
+    negate,
+    to_z3_constraints,
+    variable,
+)
+from parallel import process_pool
+from slicing import Slice, slice_module
+from solver_backend import Backend, BackendName, Model, Z3Backend, new_backend
+from telemetry import Observer, Phase, PhaseRecord, Telemetry
 from utils import (
-    DNF_to_linear_function,
     LinearFunction,
-    Mat,
     SPLinearFunction,
     SPStateBasedLinearFunction,
     StateBasedLinearFunction,
     fst,
-    get_symbol_assignment,
     get_z3_var,
-    get_z3_var_map,
-    parse_DNF,
-    parse_conjunct,
-    parse_constraint,
-    parse_q_assignment,
     snd,
-    to_z3_dnf,
     to_z3_expr,
     parse_matrix,
-    unzip,
-    update_var_map,
+    SynthesisContext,
     z3_real_to_float,
 )
 
@@ -55,27 +89,237 @@ SPLinLexPSM = list[dict[int, SPLinPSM]]
 LinPSM = LinearFunction
 LinLexPSM = list[dict[int, LinPSM]]
 
+# Version of the synthesis engines, part of the key of cached certificates
+ENGINE_VERSION = 2
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class _ConstraintUnit:
+    """
+    Independent group of constraints of `invariant_synthesis_and_verification`
+    """
+
+    kind: Literal["non_negativity", "consecution", "drift"]
+    q_state: int
+    level: int = 0
+    objective: int = 0
+    guard: tuple[int, CompiledDNF] | None = None
+    epsilon: Symbol | None = None
+
+
+# Rows of the terms of a matrix
+TermMatrix = Sequence[Sequence[LinearTerm]]
+
+
+@dataclass(frozen=True)
+class _LazyFarkas:
+    """
+    Farkas lemma instance ∀ x. a x <= b => c^T x <= d, encoded only once a
+    candidate solution violates it, see `ParitySupermartingale._lazy_solve`
+    """
+
+    a: TermMatrix
+    b: Sequence[LinearTerm]
+    c: Sequence[LinearTerm]
+    d: LinearTerm
+
+
+@dataclass(frozen=True)
+class _IncrementalPremise:
+    objective: int
+    guard: int
+    epsilon: Symbol
+    literal: BoolRef
+
+
+@dataclass(frozen=True)
+class _IncrementalAlphaContext:
+    solver: Backend
+    template: SPLinearFunction
+    premises: list[_IncrementalPremise]
+
 
 class ParitySupermartingale:
     def __init__(
         self,
         system: ReactiveModule,
+        feasibility_cache_size: int = 4096,
+        exact_lp_max_rows: int = 64,
+        context: SynthesisContext | None = None,
+        observers: Iterable[Observer] = (),
+        certificate_cache: CertificateCache | None = None,
+        check_cached: bool = True,
     ) -> None:
         """
         Methods for computing a Parity Supermartingale for a
         given reactive module and a given property (passed as boolean indicator
         functions for priority levels).
+        Feasibility checks of the premises are memoized in a LRU cache of
+        `feasibility_cache_size` polyhedra, see `feasibility_stats`, and are
+        solved with an exact rational LP for premises of at most
+        `exact_lp_max_rows` rows, with z3 otherwise.
+        All the variables and z3 terms of the synthesis live in `context`, a
+        new `SynthesisContext` unless one is given.
+        `observers` are notified of the `PhaseRecord` of every phase of the
+        synthesis (parsing, invariants, pruning, encoding, solving and
+        extraction), see `add_observer`.
+        With `certificate_cache` the certificates are looked up in the cache
+        before being synthesized, and stored in it afterwards. The cached
+        certificates are reused only if valid for the system, see
+        `certificate_checker.check_certificate`: without `check_cached` only
+        the digest of their entry is checked.
         """
-        self._counter = 0
         self._system = system
-        update_var_map(system._vars)
-        self._fresh_vars = []
+        self._options = {
+            "feasibility_cache_size": feasibility_cache_size,
+            "exact_lp_max_rows": exact_lp_max_rows,
+        }
+        self._context = SynthesisContext() if context is None else context
+        self._context.declare(system.vars)
+        self._telemetry = Telemetry(observers)
+        self._certificate_cache = certificate_cache
+        self._check_cached = check_cached
+        # Invariant the premises of the last `verification` were restricted to
+        self._verification_invariant: StateBasedLinearFunction | None = None
+        # Relaxation of the Farkas and init constraints, only set while
+        # encoding for the alternating solver of the invariant synthesis
+        self._slack: Symbol | None = None
+        # Farkas lemma instances deferred while encoding lazily
+        self._lazy_instances: list[_LazyFarkas] | None = None
+        # Keys of the Farkas lemma instances encoded for the current query
+        self._shared_instances: set[tuple] | None = None
+        # Farkas lemma instances, constraints and multipliers generated,
+        # instances deferred, unsatisfiable premises skipped and variables
+        # eliminated through the equalities of the premises, redundant rows
+        # removed from the premises and instances shared with an identical one
+        self._encoding_stats = {
+            "farkas_instances": 0,
+            "farkas_constraints": 0,
+            "multipliers": 0,
+            "farkas_deferred": 0,
+            "premises_pruned": 0,
+            "variables_eliminated": 0,
+            "redundant_rows": 0,
+            "farkas_shared": 0,
+        }
+        with self._phase("parsing"):
+            self._module = compile_module(system)
+        self._feasibility_cache = FeasibilityCache(
+            feasibility_cache_size, exact_lp_max_rows, self._context.z3
+        )
+
+    @property
+    def context(self) -> SynthesisContext:
+        return self._context
+
+    @property
+    def verification_invariant(self) -> StateBasedLinearFunction | None:
+        """
+        Invariant of each DPA state on which the LPSM of the last
+        `verification` is valid, None if it is valid on all the states
+        """
+        return self._verification_invariant
+
+    @property
+    def feasibility_stats(self) -> dict[str, int]:
+        return self._feasibility_cache.stats
+
+    @property
+    def encoding_stats(self) -> dict[str, int]:
+        """
+        Size of the encoding generated so far: Farkas lemma instances, their
+        constraints and multipliers, instances deferred by the lazy encoding,
+        premises pruned, redundant premise rows removed, instances shared and
+        the fresh variables of the synthesis context
+        """
+        return self._encoding_stats | {"fresh_vars": len(self._context.fresh_vars)}
+
+    def add_observer(self, observer: Observer) -> None:
+        """
+        Notify `observer` of the `PhaseRecord` of every following phase, e.g. a
+        `telemetry.JSONLinesSink`
+        """
+        self._telemetry.subscribe(observer)
+
+    def _phase(self, phase: Phase, **labels: str | int):
+        return self._telemetry.phase(phase, self._encoding_stats, **labels)
+
+    def _certificate_key(
+        self, engine: str, objectives: list[CompiledDNF], q_states: list[int]
+    ) -> str | None:
+        if self._certificate_cache is None:
+            return None
+        return certificate_key(
+            f"{engine}/v{ENGINE_VERSION}", self._module, objectives, q_states
+        )
+
+    def _load_certificate(
+        self,
+        key: str | None,
+        objectives: list[CompiledDNF],
+        q_states: list[int],
+        engine: Literal["verification", "invariant_synthesis"],
+    ) -> tuple[LinLexPSM, StateBasedLinearFunction | None] | None:
+        """
+        Certificate cached under `key`, if its entry is intact, see
+        `CertificateCache`, and, with `check_cached`, if it is valid for the
+        system, see `certificate_checker.check_certificate`
+        """
+        if self._certificate_cache is None or key is None:
+            return None
+        certificate = self._certificate_cache.get(key)
+        if certificate is None:
+            return None
+        lex_psm, invariant = from_certificate(certificate)
+        if (
+            self._check_cached
+            and check_compiled_certificate(
+                self._module, objectives, q_states, lex_psm, invariant, engine=engine
+            )
+            is not None
+        ):
+            return None
+        return lex_psm, invariant
+
+    def _store_certificate(
+        self,
+        key: str | None,
+        lex_psm: LinLexPSM,
+        invariant: StateBasedLinearFunction | None = None,
+    ) -> None:
+        if self._certificate_cache is not None and key is not None:
+            self._certificate_cache.put(key, to_certificate(lex_psm, invariant))
+
+    def _sliced(
+        self, s: list[ParityObjective]
+    ) -> tuple[Slice, "ParitySupermartingale"] | None:
+        """
+        Projection of the system onto the cone of influence of its guards and
+        of the objectives `s`, see `slicing.slice_module`, with an instance
+        synthesizing on it in the same context, notifying the same observers
+        and sharing the certificate cache. None if no variable is sliced.
+        """
+        projection = slice_module(self._system, s, self._module)
+        if len(projection.kept) == len(self._system.vars):
+            return None
+        psm = ParitySupermartingale(
+            projection.system,
+            **self._options,
+            context=self._context,
+            observers=[self._telemetry.notify],
+            certificate_cache=self._certificate_cache,
+            check_cached=self._check_cached,
+        )
+        return projection, psm
+
+    def _merge_encoding_stats(self, stats: dict[str, int]) -> None:
+        for key, value in stats.items():
+            self._encoding_stats[key] += value
 
     def _fresh_var(self, prefix: str) -> Symbol:
-        self._counter += 1
-        self._fresh_vars.append(Symbol(f"{prefix}_({self._counter})"))
-        update_var_map([self._fresh_vars[-1]])
-        return self._fresh_vars[-1]
+        return self._context.fresh_var(prefix)
 
     def _fresh_var_vec(self, prefix: str, n: int, row=False) -> Matrix:
         row, col = (1, n) if row else (n, 1)
@@ -86,194 +330,407 @@ class ParitySupermartingale:
     def _fresh_var_mat(self, prefix: str, shape: tuple[int, int]) -> Matrix:
         return Matrix(*shape, lambda i, j: self._fresh_var(f"{prefix}_{i},{j}"))
 
-    def _satisfiable(self, query) -> bool:
-        solver = Solver()
-        solver.add(query)
-        return solver.check() == sat
+    def _feasible(self, premise: CompiledPolyhedron) -> bool:
+        """
+        Whether the `premise` over the program variables is satisfiable
+        """
+        if self._feasibility_cache.is_feasible(premise):
+            return True
+        self._encoding_stats["premises_pruned"] += 1
+        return False
+
+    def _slack_term(self) -> LinearTerm:
+        if self._slack is None:
+            return LinearTerm()
+        return variable(get_z3_var(self._slack, self._context))
+
+    def _premise_terms(
+        self, premise: CompiledPolyhedron
+    ) -> tuple[TermMatrix, list[LinearTerm]]:
+        """
+        Rows of the satisfiable `premise` without its redundant rows, which
+        would only add Farkas multipliers, see `FeasibilityCache.reduce`
+        """
+        reduced = self._feasibility_cache.reduce(premise)
+        self._encoding_stats["redundant_rows"] += len(premise) - len(reduced)
+        return [list(map(constant, a_i)) for a_i in reduced.a], list(
+            map(constant, reduced.b)
+        )
 
-    def _farkas_constraint(
-        self, a_t: Matrix, b_t: Matrix, c: Matrix, d: Expr, z: Matrix
-    ) -> list[BoolRef]:
-        z3_at_z = parse_matrix(a_t * z)
-        z3_c = parse_matrix(c)
+    def _template_terms(
+        self, template: SPLinearFunction
+    ) -> tuple[TermMatrix, list[LinearTerm]]:
+        """
+        Rows `a` and constant terms `b` of the rows `a x + b` of `template`
+        """
+        a, b = template
+        return linear_terms(a, self._context), [
+            linear_term(b[i, 0], self._context) for i in range(b.shape[0])
+        ]
 
-        return [z3_at_z[i][0] == z3_c[i][0] for i in range(len(z3_at_z))] + [
-            to_z3_expr(b_t.dot(z)) <= to_z3_expr(d)
+    def _drift_consequence(
+        self,
+        v_a: Sequence[LinearTerm],
+        action: CompiledAction,
+        epsilon: Symbol,
+        q: int,
+    ) -> tuple[list[LinearTerm], LinearTerm]:
+        """
+        Terms `c`, `d` of the drift condition `c^T x <= d` of the template row
+        `v_a` under `action` in DPA state `q`, decreasing by `epsilon`:
+            c = v_a * sum(p_i * a_i) - v_a
+            d = -v_a * sum(p_i * b_i) - epsilon
+        with `q` substituted for the DPA state variable
+        """
+        post_c, post_d = _compose(v_a, action.expected)
+        c = [
+            combine([(Fraction(1), c_j), (Fraction(-1), v_j)])
+            for c_j, v_j in zip(post_c, v_a)
         ]
+        d = combine(
+            [
+                (Fraction(-1), post_d),
+                (Fraction(-1), variable(get_z3_var(epsilon, self._context))),
+            ]
+        )
+        return fix(c, d, self._module.dpa_index, Fraction(q))
 
     def _farkas_lemma(
         self,
-        a: Matrix,
-        b: Matrix,
-        c: Matrix,
-        d: Expr,
+        a: TermMatrix,
+        b: Sequence[LinearTerm],
+        c: Sequence[LinearTerm],
+        d: LinearTerm,
         with_gale_constraint: bool = False,
-    ):
-        z = self._fresh_var_vec("z", a.shape[0])
-        z_non_neg: list[BoolRef] = [to_z3_expr(z[i, 0]) >= 0 for i in range(z.shape[0])]
+    ) -> list[Constraint]:
+        """
+        Constraints of the Farkas lemma for `a x <= b => c^T x <= d`, as terms
+        if they are linear, i.e. if `a` and `b` are numeric
+        """
+        n = len(c)
+        a, b, c, d = eliminate_equalities(a, b, c, d)
+        self._encoding_stats["variables_eliminated"] += n - len(c)
+
+        if self._shared_instances is not None:
+            # An identical instance is already encoded for the same query, or
+            # deferred for it: its multipliers and constraints are shared
+            key = farkas_key(a, b, c, d)
+            if key in self._shared_instances:
+                self._encoding_stats["farkas_shared"] += 1
+                return []
+            self._shared_instances.add(key)
+
+        if self._lazy_instances is not None:
+            self._lazy_instances.append(_LazyFarkas(a, b, c, d))
+            self._encoding_stats["farkas_deferred"] += 1
+            return []
+
+        z = [
+            get_z3_var(self._fresh_var(f"z_{i}"), self._context) for i in range(len(b))
+        ]
 
         if with_gale_constraint:
             # TODO: Implement Gale constraint for Farkas lemma
             pass
 
-        farkas_constraint = self._farkas_constraint(
-            a.transpose(), b.transpose(), c, d, z
+        d = combine([(Fraction(1), d), (Fraction(1), self._slack_term())])
+        z_non_neg: list[Constraint]
+        farkas_constraint: list[Constraint]
+        if all(is_numeric(entry) for entry in chain(b, *a)):
+            z_non_neg = [TermConstraint(negate(variable(z_i)), "<=") for z_i in z]
+            farkas_constraint = list(linear_farkas_constraints(a, b, c, d, z))
+        else:
+            z_non_neg = [z_i >= 0 for z_i in z]
+            farkas_constraint = list(
+                farkas_constraints(a, b, c, d, z, self._context.z3)
+            )
+        self._encoding_stats["farkas_instances"] += 1
+        self._encoding_stats["farkas_constraints"] += len(z_non_neg) + len(
+            farkas_constraint
         )
+        self._encoding_stats["multipliers"] += len(z)
         return z_non_neg + farkas_constraint
 
-    def _v_j_constraint(
-        self,
-        i: int,
-        v_j: tuple[int, ParityObjective],
-        guards: list[tuple[int, Guard]],
-        template: SPLinearFunction,
-    ) -> tuple[list[ExprRef], list[tuple[Symbol, int]]]:
+    @contextmanager
+    def _shared_farkas(self) -> Iterator[None]:
         """
-        Given index `i` of the SPPM component, index `j` of Parity Objective,
-        a set of `guards` of the system, a `template` for the linear constraints
+        Encode each distinct Farkas lemma instance of the enclosed block only
+        once, see `farkas_key`. All the constraints of the block have to end
+        up in the same query, or under the same assumptions.
         """
-        a_template, _ = template
-        constraints: list[ExprRef] = []
-        decrement_vars: list[tuple[Symbol, int]] = []
-        v_j_conjuncts = list(enumerate(parse_DNF(v_j[1])))
+        self._shared_instances = set()
+        try:
+            yield
+        finally:
+            self._shared_instances = None
+
+    @contextmanager
+    def _lazy_farkas(self, lazy: bool) -> Iterator[list[_LazyFarkas]]:
+        """
+        With `lazy`, defer the Farkas lemma instances of the enclosed block to
+        the yielded list instead of encoding them
+        """
+        instances: list[_LazyFarkas] = []
+        self._lazy_instances = instances if lazy else None
+        try:
+            yield instances
+        finally:
+            self._lazy_instances = None
+
+    def _model_value(self, model: Model, var: ArithRef) -> Fraction:
+        value = model.eval(var, model_completion=True)
+        if is_algebraic_value(value):
+            value = value.approx(32)
+        return value.as_fraction()
+
+    def _is_violated(self, instance: _LazyFarkas, model: Model) -> bool:
+        """
+        Whether the candidate solution `model` violates the Farkas lemma
+        `instance`, checked with an exact LP over the closure of its premise
+        """
+        model_value = partial(self._model_value, model)
 
-        for guard in guards:
-            guard_conjuncts = parse_DNF(guard[1])
-
-            for guard_conjunct, v_j_conjunct in product(guard_conjuncts, v_j_conjuncts):
-                premise_constraints = list(
-                    # Convert conjunct of constraints to z3 representation
-                    chain.from_iterable(
-                        map(
-                            parse_constraint,
-                            parse_conjunct(guard_conjunct)
-                            + parse_conjunct(v_j_conjunct[1]),
+        def value(term: LinearTerm) -> Fraction:
+            return term.evaluate(model_value)
+
+        (result,) = rational_lp.maximize_all(
+            [[value(c_j) for c_j in instance.c]],
+            [
+                ([value(a_ij) for a_ij in a_i], "<=", value(b_i))
+                for a_i, b_i in zip(instance.a, instance.b)
+            ],
+            len(instance.c),
+        )
+        match result.status:
+            case "infeasible":
+                return False
+            case "unbounded":
+                return True
+        return result.value > value(instance.d)
+
+    def _lazy_solve(
+        self,
+        solver: Backend,
+        instances: list[_LazyFarkas],
+        labels: dict[str, str | int],
+        assumptions: Sequence[BoolRef] = (),
+        encoded: list[Constraint] | None = None,
+    ) -> Model | None:
+        """
+        Counterexample guided solving of the constraints of `solver`, under
+        `assumptions`, together with the deferred Farkas lemma `instances`:
+        each candidate solution is checked against the instances not encoded
+        yet, and only the violated ones are added to `solver` before solving
+        again. Returns the first candidate satisfying all of them, None if the
+        constraints are unsatisfiable.
+        Encoded instances are removed from `instances` and their constraints
+        also appended to `encoded`, if given.
+        """
+        # Each round encodes at least one more instance, so that there are at
+        # most len(instances) + 1 rounds
+        rounds = 0
+        while True:
+            with self._phase("solving", **labels, round=rounds) as record:
+                satisfiable = solver.check(*assumptions)
+                if self._telemetry.enabled:
+                    record.solver_statistics = solver.statistics()
+            if not satisfiable:
+                return None
+            model = solver.model()
+
+            with self._phase("encoding", **labels, round=rounds):
+                violated = [self._is_violated(i, model) for i in instances]
+                if not any(violated):
+                    return model
+                for instance, is_violated in zip(list(instances), violated):
+                    if is_violated:
+                        constraints = self._farkas_lemma(
+                            instance.a, instance.b, instance.c, instance.d
                         )
-                    )
-                )
-                a, b = linear_eq_to_matrix(premise_constraints, self._system.vars)
-                assert isinstance(a, Matrix) and isinstance(b, Matrix)
+                        solver.add(constraints)
+                        if encoded is not None:
+                            encoded.extend(constraints)
+                        instances.remove(instance)
+            rounds += 1
 
-                ax_z3 = parse_matrix(a * Matrix(self._system.vars))
-                b_z3 = parse_matrix(b)
+    def _lp_ranking(
+        self,
+        lp: Backend,
+        epsilons: list[tuple[Symbol, int]],
+        instances: list[_LazyFarkas],
+        labels: dict[str, str | int],
+        assumptions: Sequence[BoolRef] = (),
+    ) -> Model | None:
+        """
+        Solution of `lp` with as many positive `epsilons` as possible, the
+        same ones made positive by the soft constraints of the MaxSMT ranking,
+        computed by a sequence of LPs instead. Each LP maximizes the sum of
+        the epsilons not positive yet, and the ones it makes positive are then
+        required to stay so: as the solutions form a convex set, this stops
+        with the largest set of epsilons positive together. None if `lp` is
+        unsatisfiable.
+        """
+        remaining = [get_z3_var(eps, self._context) for eps, _ in epsilons]
+        model = None
+        while len(remaining) > 0:
+            encoded: list[Constraint] = []
+            lp.push()
+            try:
+                lp.maximize(combine((Fraction(1), variable(eps)) for eps in remaining))
+                candidate = self._lazy_solve(
+                    lp, instances, labels, assumptions, encoded
+                )
+            finally:
+                lp.pop()
+            # Keep the instances encoded in the scope of the objective
+            lp.add(encoded)
+            if candidate is None:
+                break
+
+            model = candidate
+            ranked = [eps for eps in remaining if is_true(model.eval(eps > 0))]
+            if len(ranked) == 0:
+                break
+            lp.add([TermConstraint(negate(variable(eps)), "<") for eps in ranked])
+            remaining = [eps for eps in remaining if not is_true(model.eval(eps > 0))]
+        return model
+
+    def _v_j_premise_constraints(
+        self,
+        v_j: tuple[int, CompiledDNF],
+        guard: tuple[int, CompiledDNF],
+        template: SPLinearFunction,
+        eps_prefix: str,
+        q: int,
+    ) -> list[tuple[Symbol, int, list[Constraint]]]:
+        """
+        Farkas constraints of the drift condition in DPA state `q` for every
+        satisfiable premise `guard` conjunct & `v_j` conjunct, each one
+        decreasing by its own fresh epsilon. Bounds on the epsilons are left to
+        the caller.
+        """
+        (a_template,), _ = self._template_terms(template)
+        premises: list[tuple[Symbol, int, list[Constraint]]] = []
 
-                # Check if the premise is satisfiable, otherwise skip
-                premise = z3_And([ax_z3[i][0] <= b_z3[i][0] for i in range(len(ax_z3))])
-                if not self._satisfiable(premise):
-                    # print("Premise not satisfiable, skipped:\n", premise)
-                    continue
+        for guard_conjunct, v_j_conjunct in product(guard[1], enumerate(v_j[1])):
+            premise = self._module.at_dpa_state(
+                guard_conjunct.intersect(v_j_conjunct[1]), q
+            )
 
-                actions_transitions = self._system.get_nth_command_updates(guard[0])
+            # Check if the premise is satisfiable, otherwise skip
+            if not self._feasible(premise):
+                continue
 
-                # same epsilon decrease for all non-deterministic actions
-                eps = self._fresh_var(
-                    f"epsilon_v{i},g{guard[0]},s{v_j[0]},{v_j_conjunct[0]}"
-                )
-                decrement_vars.append((eps, guard[0]))
+            a, b = self._premise_terms(premise)
 
-                z3_eps = get_z3_var_map()[eps.name]
+            # same epsilon decrease for all non-deterministic actions
+            eps = self._fresh_var(
+                f"{eps_prefix}g{guard[0]},s{v_j[0]},{v_j_conjunct[0]}"
+            )
+            constraints: list[Constraint] = []
 
-                if v_j[0] % 2 and v_j[0] == i:
-                    # if j odd and j == i epsilon must be strictly positive
-                    constraints.append(0 < z3_eps)
-                else:
-                    constraints.append(0 <= z3_eps)
-
-                constraints.append(z3_eps <= 1)
-
-                for transitions in actions_transitions:
-                    distribution, updates = unzip(transitions)
-                    updates_a, updates_b = unzip(updates)
-
-                    # c_t = a_template * \sum(p_i * a_i) - a_template
-                    c_t: Matrix = (
-                        a_template
-                        * sum(
-                            map(
-                                lambda p_i, a_i: p_i * a_i,
-                                distribution,
-                                updates_a,
-                            ),
-                            zeros(len(self._system.vars)),
-                        )
-                        - a_template
-                    )
+            for action in self._module.commands[guard[0]].actions:
+                c_t, d = self._drift_consequence(a_template, action, eps, q)
+                constraints.extend(self._farkas_lemma(a, b, c_t, d))
+            premises.append((eps, guard[0], constraints))
+        return premises
 
-                    # d = -a_template * \sum(p_i * b_i) (- epsilon_g if j is odd
-                    d = (
-                        -a_template.dot(
-                            sum(
-                                map(
-                                    lambda p_i, b_i: p_i * b_i,
-                                    distribution,
-                                    updates_b,
-                                ),
-                                zeros(len(self._system.vars), 1),
-                            )
-                        )
-                        - eps
-                    )
+    def _v_j_constraint(
+        self,
+        i: int,
+        v_j: tuple[int, ParityObjective],
+        guards: list[tuple[int, CompiledDNF]],
+        template: SPLinearFunction,
+        q: int,
+    ) -> tuple[list[Constraint], list[tuple[Symbol, int]]]:
+        """
+        Given index `i` of the SPPM component, index `j` of Parity Objective,
+        a set of `guards` of the system restricted to DPA state `q`, a
+        `template` for the linear constraints
+        """
+        constraints: list[Constraint] = []
+        decrement_vars: list[tuple[Symbol, int]] = []
 
-                    constraints.extend(self._farkas_lemma(a, b, c_t.transpose(), d))
+        for guard in guards:
+            for eps, guard_idx, premise_constraints in self._v_j_premise_constraints(
+                v_j, guard, template, f"epsilon_v{i},", q
+            ):
+                decrement_vars.append((eps, guard_idx))
+                # if j odd and j == i epsilon must be strictly positive
+                strict = bool(v_j[0] % 2) and v_j[0] == i
+                constraints.extend(self._epsilon_bounds(eps, strict))
+                constraints.extend(premise_constraints)
         return constraints, decrement_vars
 
+    def _epsilon_bounds(self, eps: Symbol, strict: bool) -> list[TermConstraint]:
+        term = variable(get_z3_var(eps, self._context))
+        return [
+            TermConstraint(negate(term), "<" if strict else "<="),
+            TermConstraint(
+                combine([(Fraction(1), term), (Fraction(-1), constant(Fraction(1)))]),
+                "<=",
+            ),
+        ]
+
     def _get_linear_template(self, prefix: str, m: int, n: int) -> SPLinearFunction:
         return (
             self._fresh_var_mat(f"{prefix}_a", (m, n)),
             self._fresh_var_vec(f"{prefix}_b", m),
         )
 
-    def _is_ranked_guard(self, model: ModelRef, eps: tuple[Symbol, int]) -> bool:
-        z3_symb = get_z3_var(eps[0])
+    def _is_ranked_guard(self, model: Model, eps: tuple[Symbol, int]) -> bool:
+        z3_symb = get_z3_var(eps[0], self._context)
         return model.eval(z3_symb > 0)
 
-    def _alpha(
-        self, i: int, guards: list[tuple[int, Guard]], s: list[ParityObjective], q: int
-    ) -> tuple[LinPSM, list[tuple[int, Guard]]]:
-        epsilons: list[tuple[Symbol, int]] = []
-        constraints: list[ExprRef] = []
-        template = self._get_linear_template(
-            f"alpha{i}_q{q}", 1, len(self._system.vars)
-        )
-        lp = Optimize()
+    def _template_non_negativity(
+        self, template: SPLinearFunction, linear: bool = False
+    ) -> Constraint:
+        if linear:
+            # The drift conditions do not depend on the constant term of the
+            # template, which can thus always be made non-negative: this keeps
+            # the same solutions up to the constant term, without the product
+            # of the template and the program variables below
+            return TermConstraint(
+                negate(linear_term(template[1][0, 0], self._context)), "<="
+            )
         # force alpha_i_q to be non-negative
-        non_negativity = (
-            to_z3_expr(template[0].dot(self._system.vars) + template[1][0, 0]) >= 0
-        )
-        lp.add(non_negativity)
-        for s_j in enumerate(s, i):
-            s_j_constraints, s_j_epsilons = self._v_j_constraint(
-                i, s_j, guards, template
+        return (
+            to_z3_expr(
+                template[0].dot(self._system.vars) + template[1][0, 0], self._context
             )
-            constraints.extend(s_j_constraints)
-            epsilons.extend(s_j_epsilons)
-            lp.add(constraints)
-
-        if len(epsilons) == 0:
-            # No premise is satisfiable, thus the synthesis of the current PSM
-            # has finished
-            # return 0 function and the set of guards unranked
-            return ([[0.0] * len(self._system.vars)], [[0.0]]), guards
-
-        # Add soft constraints for epsilon variables positivity
-        for eps in epsilons:
-            lp.add_soft(to_z3_expr(eps[0]) > 0)
-
-        if lp.check() == unsat:
-            # No solution for linear program
-            raise RuntimeError(f"No solution for linear program computing alpha_{i}")
+            >= 0
+        )
 
-        model = lp.model()
+    def _extract_alpha(
+        self,
+        i: int,
+        model: Model,
+        template: SPLinearFunction,
+        epsilons: list[tuple[Symbol, int]],
+        guards: list[tuple[int, CompiledDNF]],
+    ) -> tuple[LinPSM, list[tuple[int, CompiledDNF]]]:
         is_ranked_guard = partial(self._is_ranked_guard, model)
         ranked_guards_idx = list(map(lambda x: x[1], filter(is_ranked_guard, epsilons)))
         updated_guards = list(filter(lambda x: x[0] not in ranked_guards_idx, guards))
         z3_alpha_i_a, z3_alpha_i_b = (
-            parse_matrix(template[0]),
-            parse_matrix(template[1]),
+            parse_matrix(template[0], self._context),
+            parse_matrix(template[1], self._context),
         )
         alpha_i: LinPSM = (
-            [[z3_real_to_float(model[var]) for var in row] for row in z3_alpha_i_a],
-            [[z3_real_to_float(model[var]) for var in row] for row in z3_alpha_i_b],
+            [
+                [
+                    z3_real_to_float(model.eval(var, model_completion=True))
+                    for var in row
+                ]
+                for row in z3_alpha_i_a
+            ],
+            [
+                [
+                    z3_real_to_float(model.eval(var, model_completion=True))
+                    for var in row
+                ]
+                for row in z3_alpha_i_b
+            ],
         )
         if len(updated_guards) == len(guards):
             # No guards has been ranked, thus no solution synthesized
@@ -282,51 +739,199 @@ class ParitySupermartingale:
         # return alpha_i function and not ranked guards
         return alpha_i, updated_guards
 
-    def _add_dpa_state_evaluation(
-        self, dpa_state: int, guards: list[Guard]
-    ) -> list[tuple[int, Guard]]:
-        return list(
-            filter(
-                lambda g: self._satisfiable(to_z3_dnf(g[1])),
-                enumerate(
-                    map(
-                        lambda g: And(
-                            *(
-                                parse_conjunct(g)
-                                + [get_symbol_assignment(Symbol("q"), dpa_state)]
-                            )
-                        ),
-                        guards,
-                    ),
-                ),
+    def _alpha(
+        self,
+        i: int,
+        guards: list[tuple[int, CompiledDNF]],
+        s: list[CompiledDNF],
+        q: int,
+        lazy: bool = False,
+        ranking: Literal["maxsmt", "lp"] = "maxsmt",
+        backend: BackendName = "z3",
+    ) -> tuple[LinPSM, list[tuple[int, CompiledDNF]]]:
+        labels = {"engine": "verification", "q_state": q, "level": i}
+        epsilons: list[tuple[Symbol, int]] = []
+        constraints: list[Constraint] = []
+        with (
+            self._phase("encoding", **labels),
+            self._shared_farkas(),
+            self._lazy_farkas(lazy) as instances,
+        ):
+            template = self._get_linear_template(
+                f"alpha{i}_q{q}", 1, len(self._system.vars)
             )
-        )
+            lp = new_backend(backend, self._context.z3)
+            lp.add(self._template_non_negativity(template, ranking == "lp"))
+            for s_j in enumerate(s[i:], i):
+                s_j_constraints, s_j_epsilons = self._v_j_constraint(
+                    i, s_j, guards, template, q
+                )
+                constraints.extend(s_j_constraints)
+                epsilons.extend(s_j_epsilons)
+            lp.add(constraints)
+
+            if ranking == "maxsmt":
+                # Add soft constraints for epsilon variables positivity
+                for eps in epsilons:
+                    lp.add_soft(to_z3_expr(eps[0], self._context) > 0)
+
+        if len(epsilons) == 0:
+            # No premise is satisfiable, thus the synthesis of the current PSM
+            # has finished
+            # return 0 function and the set of guards unranked
+            return ([[0.0] * len(self._system.vars)], [[0.0]]), guards
+
+        if ranking == "lp":
+            model = self._lp_ranking(lp, epsilons, instances, labels)
+        else:
+            model = self._lazy_solve(lp, instances, labels)
+        if model is None:
+            # No solution for linear program
+            raise RuntimeError(f"No solution for linear program computing alpha_{i}")
+
+        with self._phase("extraction", **labels):
+            return self._extract_alpha(i, model, template, epsilons, guards)
+
+    def _incremental_alpha_context(
+        self,
+        guards: list[tuple[int, CompiledDNF]],
+        s: list[CompiledDNF],
+        q: int,
+        ranking: Literal["maxsmt", "lp"] = "maxsmt",
+    ) -> _IncrementalAlphaContext:
+        """
+        Encode once the drift conditions of every guard of DPA state `q` and
+        every parity objective in `s` against a single template shared by all
+        the levels of the lexicographic PSM. Each premise is guarded by an
+        assumption literal, so that `_incremental_alpha` only has to select
+        the premises of the current level.
+        """
+        template = self._get_linear_template(f"alpha_q{q}", 1, len(self._system.vars))
+        lp = Z3Backend(Optimize(ctx=self._context.z3))
+        lp.add(self._template_non_negativity(template, ranking == "lp"))
+        premises: list[_IncrementalPremise] = []
+
+        # The instances of different premises never coincide, as each one
+        # decreases by its own epsilon
+        with (
+            self._phase("encoding", engine="verification", q_state=q),
+            self._shared_farkas(),
+        ):
+            for s_j, guard in product(enumerate(s), guards):
+                for eps, guard_idx, constraints in self._v_j_premise_constraints(
+                    s_j, guard, template, f"epsilon_q{q},", q
+                ):
+                    literal = Bool(f"premise_{eps.name}", self._context.z3)
+                    lp.add(
+                        Implies(
+                            literal,
+                            z3_And(
+                                to_z3_constraints(
+                                    constraints + self._epsilon_bounds(eps, False),
+                                    self._context.z3,
+                                )
+                            ),
+                        )
+                    )
+                    premises.append(
+                        _IncrementalPremise(s_j[0], guard_idx, eps, literal)
+                    )
+        return _IncrementalAlphaContext(lp, template, premises)
+
+    def _incremental_alpha(
+        self,
+        i: int,
+        guards: list[tuple[int, CompiledDNF]],
+        context: _IncrementalAlphaContext,
+        q: int,
+        ranking: Literal["maxsmt", "lp"] = "maxsmt",
+    ) -> tuple[LinPSM, list[tuple[int, CompiledDNF]]]:
+        """
+        Same as `_alpha`, but reusing the solver of `context`: only the strict
+        decrease and the soft constraints of level `i` are added in a new scope.
+        """
+        guards_idx = set(map(fst, guards))
+        premises = [
+            premise
+            for premise in context.premises
+            if premise.objective >= i and premise.guard in guards_idx
+        ]
+        epsilons = [(premise.epsilon, premise.guard) for premise in premises]
+
+        if len(epsilons) == 0:
+            # No premise is satisfiable, thus the synthesis of the current PSM
+            # has finished
+            # return 0 function and the set of guards unranked
+            return ([[0.0] * len(self._system.vars)], [[0.0]]), guards
+
+        labels = {"engine": "verification", "q_state": q, "level": i}
+        lp = context.solver
+        lp.push()
+        try:
+            with self._phase("encoding", **labels):
+                for premise in premises:
+                    z3_eps = get_z3_var(premise.epsilon, self._context)
+                    if premise.objective == i and i % 2:
+                        # if j odd and j == i epsilon must be strictly positive
+                        lp.add(z3_eps > 0)
+                    if ranking == "maxsmt":
+                        lp.add_soft(z3_eps > 0)
+
+            assumptions = [premise.literal for premise in premises]
+            if ranking == "lp":
+                model = self._lp_ranking(lp, epsilons, [], labels, assumptions)
+            else:
+                model = self._lazy_solve(lp, [], labels, assumptions)
+            if model is None:
+                # No solution for linear program
+                raise RuntimeError(
+                    f"No solution for linear program computing alpha_{i}"
+                )
+        finally:
+            lp.pop()
+
+        with self._phase("extraction", **labels):
+            return self._extract_alpha(i, model, context.template, epsilons, guards)
+
+    def _add_dpa_state_evaluation(
+        self, dpa_state: int, invariant: CompiledPolyhedron | None = None
+    ) -> list[tuple[int, CompiledDNF]]:
+        """
+        Guards of the system restricted to DPA state `dpa_state`, and to its
+        `invariant` if given, keeping only their satisfiable conjuncts. The DPA
+        state is substituted in the conjuncts, see `CompiledModule.at_dpa_state`
+        """
+
+        def restrict(conjunct: CompiledPolyhedron) -> CompiledPolyhedron:
+            if invariant is not None:
+                conjunct = conjunct.intersect(invariant)
+            return self._module.at_dpa_state(conjunct, dpa_state)
+
+        guards = [
+            (idx, tuple(filter(self._feasible, map(restrict, command.guard))))
+            for idx, command in enumerate(self._module.commands)
+        ]
+        return list(filter(lambda g: len(g[1]) > 0, guards))
 
     def _get_non_negativity_constraints(
         self, invariant: SPStateBasedLinearFunction, lex_psm: SPLinLexPSM
     ):
         """
-        ∀ x. (∀ q. ∀ PSM ∈ LexPSM). I(x,q) (& q == q) => PSM(x, q) >= 0
+        ∀ x. (∀ q. ∀ PSM ∈ LexPSM). I(x,q) & q == q => PSM(x, q) >= 0
         """
 
-        # TODO: Add q == q constraint
-
         def forall_psm(q_inv: tuple[int, SPLinearFunction]):
-            q, (inv_a, inv_b) = q_inv
-            q_a, q_b = DNF_to_linear_function(
-                get_symbol_assignment(Symbol("q"), q), self._system.vars
-            )
-            return chain.from_iterable(
-                map(
-                    lambda psm: self._farkas_lemma(
-                        inv_a.col_join(q_a),
-                        -inv_b.col_join(q_b),
-                        -psm[q][0].transpose(),
-                        psm[q][1][0, 0],
-                    ),
-                    lex_psm,
+            q, inv = q_inv
+            a, b = self._invariant_premise_terms(inv, q)
+
+            def farkas_lemma(psm: dict[int, SPLinPSM]) -> list[Constraint]:
+                (v_a,), (v_b,) = self._template_terms(psm[q])
+                c, d = fix(
+                    [negate(t) for t in v_a], v_b, self._module.dpa_index, Fraction(q)
                 )
-            )
+                return self._farkas_lemma(a, b, c, d)
+
+            return chain.from_iterable(map(farkas_lemma, lex_psm))
 
         return list(
             chain.from_iterable(
@@ -337,173 +942,170 @@ class ParitySupermartingale:
             )
         )
 
+    def _invariant_premise_terms(
+        self,
+        invariant: SPLinearFunction,
+        q: int,
+        premise: CompiledPolyhedron | None = None,
+    ) -> tuple[TermMatrix, list[LinearTerm]]:
+        """
+        Rows of the premise `invariant(x) <= 0` & `premise` in DPA state `q`,
+        with `q` substituted for the DPA state variable in the invariant
+        """
+        inv_a, inv_b = self._template_terms(invariant)
+        rows = [
+            fix(a_i, negate(b_i), self._module.dpa_index, Fraction(q))
+            for a_i, b_i in zip(inv_a, inv_b)
+        ]
+        a, b = ([], []) if premise is None else self._premise_terms(premise)
+        return [a_i for a_i, _ in rows] + list(a), [b_i for _, b_i in rows] + b
+
     def _get_invariant_init_contraints(self, invariant: SPStateBasedLinearFunction):
         """
-        (∀ init ∈ Init.)
-            ⋁{q ∈ Q} (I(init, q) (∧ q==q))
+        (∀ init ∈ Init.) I(init, init[q])
+        i.e. every initial state belongs to the invariant of its own DPA state
         """
 
-        def get_constraint(init: ProgramState, q_inv: tuple[int, SPLinearFunction]):
-            q, (inv_a, inv_b) = q_inv
-            return z3_And(
-                to_z3_expr(inv_a.dot(init) + inv_b[0, 0]) <= 0,
-                *parse_q_assignment(get_symbol_assignment(Symbol("q"), q)),
-            )
+        slack = S.Zero if self._slack is None else self._slack
 
-        return list(
-            map(
-                lambda init: Or(
-                    list(map(partial(get_constraint, init), invariant.items()))
-                ),
-                self._system.init,
+        constraints = []
+        for init in self._module.init:
+            q = int(init[self._module.dpa_index])
+            if q not in invariant:
+                raise ValueError(f"initial DPA state {q} is not in q_states")
+            inv_a, inv_b = invariant[q]
+            constraints.append(
+                to_z3_expr(inv_a.dot(init) + inv_b[0, 0] - slack, self._context) <= 0
             )
-        )
+        return constraints
 
-    def _get_invariant_consec_contraints(self, invariant: SPStateBasedLinearFunction):
+    def _get_invariant_consec_contraints(
+        self,
+        invariant: SPStateBasedLinearFunction,
+        q_states: list[int] | None = None,
+    ):
         """
         ∀ x. (∀ (g,U) ∈ (G,F). ∀ (_,u) ∈ U. ∀ q).
-            I(x, q) & g(x) (& q==q) => I(u(x), u[q](x))
+            I(x, q) & g(x) & q==q => I(u(x), u[q](x))
+        restricted to the DPA states `q_states` if given
         """
+        source_invariant = (
+            invariant
+            if q_states is None
+            else {q_state: invariant[q_state] for q_state in q_states}
+        )
+        q_index = self._module.dpa_index
+        constraints: list[Constraint] = []
 
-        q_index = self._system.vars.index(Symbol("q"))
-
-        def forall_guarded_commands(guarded_command: GuardedCommand):
-            g_a, g_b = DNF_to_linear_function(guarded_command[0], self._system.vars)
-            return chain.from_iterable(
-                map(
-                    lambda stoc_update: chain.from_iterable(
-                        map(partial(forall_updates, g_a, g_b), stoc_update)
-                    ),
-                    guarded_command[1],
-                )
-            )
-
-        def forall_updates(g_a: Matrix, g_b: Matrix, prob_update: ProbabilisticUpdate):
-            return chain.from_iterable(
-                map(
-                    partial(
-                        get_constraint,
-                        g_a,
-                        g_b,
-                        prob_update[1],
-                    ),
-                    invariant.items(),
-                )
-            )
-
-        def get_constraint(
-            g_a: Matrix,
-            g_b: Matrix,
-            update: SPLinearFunction,
-            q_inv: tuple[int, SPLinearFunction],
+        for command, action in chain.from_iterable(
+            map(lambda c: product([c], c.actions), self._module.commands)
         ):
-            # FIXME:
-            # Need to assume that the state variable q is directly assigned by a constant and not
-            # by a linear function otherwise we can't compute I(x',q')
-            u_a, u_b = update
-
-            assert u_a.row(q_index) == zeros(1, u_a.shape[1])
-
-            next_q: int = u_b[0, 0]
-
-            q, inv = q_inv
-            inv_a, inv_b = inv
-            next_inv_a, next_inv_b = invariant[next_q]
-
-            q_a, q_b = DNF_to_linear_function(
-                get_symbol_assignment(Symbol("q"), q), self._system.vars
-            )
-
-            return self._farkas_lemma(
-                inv_a.col_join(g_a).col_join(q_a),
-                -inv_b.col_join(g_b).col_join(q_b),
-                Matrix.transpose(next_inv_a * u_a),
-                -next_inv_a.dot(u_b) - next_inv_b[0, 0],
-            )
-
-        return list(
-            chain.from_iterable(map(forall_guarded_commands, self._system.body))
-        )
+            for _, update in action.distribution:
+                # FIXME:
+                # Need to assume that the state variable q is directly assigned by a
+                # constant and not by a linear function otherwise we can't compute
+                # I(x',q')
+                assert not update.a[q_index]
+
+                next_q = int(update.b[q_index])
+                (next_inv_a,), (next_inv_b,) = self._template_terms(invariant[next_q])
+                # c = (next_inv_a * u_a)^T, d = -next_inv_a * u_b - next_inv_b
+                c, post_b = _compose(next_inv_a, update)
+                d = combine([(Fraction(-1), post_b), (Fraction(-1), next_inv_b)])
+
+                for (q, inv), guard_conjunct in product(
+                    source_invariant.items(), command.guard
+                ):
+                    premise = self._module.at_dpa_state(guard_conjunct, q)
+                    if not self._feasible(premise):
+                        continue
+
+                    a, b = self._invariant_premise_terms(inv, q, premise)
+                    constraints.extend(
+                        self._farkas_lemma(a, b, *fix(c, d, q_index, Fraction(q)))
+                    )
+        return constraints
 
     def _get_drift_constraints(
         self,
-        s_j: ParityObjective,
-        guard: Guard,
-        actions: NonDeterministicStochasticUpdate,
+        s_j: CompiledDNF,
+        guard: CompiledDNF,
+        actions: tuple[CompiledAction, ...],
         epsilon: Symbol,
         psm_template: SPLinPSM,
         inv_template: SPLinearFunction,
+        q: int,
     ):
         """
-        ∀ x. (∀ s ∈ S. ∀ (g,U) ∈ (G,F). ∀ (p,u) ∈ U. ∀ q).
-            I(x, q) & s_j(x) & g(x) (& q==q) => Post V_i(x) <= V_i(x) - epsilon
+        ∀ x. (∀ s ∈ S. ∀ (g,U) ∈ (G,F). ∀ (p,u) ∈ U).
+            I(x, q) & s_j(x) & g(x) & q==q => Post V_i(x) <= V_i(x) - epsilon
         """
-        v_a, _ = psm_template
+        (v_a,), _ = self._template_terms(psm_template)
         inv_a, inv_b = inv_template
         constraints = []
+        consequences = [
+            self._drift_consequence(v_a, action, epsilon, q) for action in actions
+        ]
 
-        s_j_conjuncts = parse_DNF(s_j)
+        for s_j_conjunct, guard_conjunct in product(s_j, guard):
+            premise = self._module.at_dpa_state(
+                s_j_conjunct.intersect(guard_conjunct), q
+            )
 
-        for s_j_conjunct in s_j_conjuncts:
-            s_a, s_b = DNF_to_linear_function(s_j_conjunct, self._system.vars)
-            g_a, g_b = DNF_to_linear_function(guard, self._system.vars)
+            # Check if the premise is satisfiable, otherwise skip. The rows of
+            # the invariant template can always be satisfied by choosing its
+            # coefficients, hence only the objective and the guard are checked
+            if not self._feasible(premise):
+                continue
 
-            a = inv_a.col_join(s_a).col_join(g_a)
-            b = -inv_b.col_join(s_b).col_join(g_b)
+            if inv_a.free_symbols or inv_b.free_symbols:
+                a, b = self._invariant_premise_terms(inv_template, q, premise)
+            else:
+                # Fixed invariants are already part of the guards, see
+                # `_add_dpa_state_evaluation`
+                a, b = self._premise_terms(premise)
 
-            # Check if the premise is satisfiable, otherwise skip
-            z3_ax = parse_matrix(a * Matrix(self._system.vars))
-            z3_b = parse_matrix(b)
-            if not self._satisfiable(
-                z3_And([z3_ax[i][0] <= z3_b[i][0] for i in range(len(z3_ax))])
-            ):
-                # print("Premise not satisfiable, skipped")
-                continue
+            for c_t, d in consequences:
+                constraints.extend(self._farkas_lemma(a, b, c_t, d))
+        return constraints
 
-            for action in actions:
-                distribution, updates = unzip(action)
-                updates_a, updates_b = unzip(updates)
-
-                # c_t = V_Theta * \sum(p_i * a_i) - V_Theta
-                c_t: Matrix = (
-                    v_a
-                    * sum(
-                        map(
-                            lambda p_i, a_i: p_i * a_i,
-                            distribution,
-                            updates_a,
-                        ),
-                        zeros(len(self._system.vars)),
-                    )
-                    - v_a
+    def _get_unit_constraints(
+        self,
+        unit: _ConstraintUnit,
+        lex_psm_template: SPLinLexPSM,
+        inv_template: SPStateBasedLinearFunction,
+        objectives: list[CompiledDNF],
+    ) -> list[Constraint]:
+        match unit.kind:
+            case "non_negativity":
+                return self._get_non_negativity_constraints(
+                    {unit.q_state: inv_template[unit.q_state]}, lex_psm_template
                 )
-
-                # d = -V_Theta * \sum(p_i * b_i) - epsilon_ijk
-                d = (
-                    -v_a.dot(
-                        sum(
-                            map(
-                                lambda p_i, b_i: p_i * b_i,
-                                distribution,
-                                updates_b,
-                            ),
-                            zeros(len(self._system.vars), 1),
-                        )
-                    )
-                    - epsilon
+            case "consecution":
+                return self._get_invariant_consec_contraints(
+                    inv_template, [unit.q_state]
+                )
+            case "drift":
+                assert unit.guard is not None and unit.epsilon is not None
+                return self._get_drift_constraints(
+                    objectives[unit.objective],
+                    unit.guard[1],
+                    self._module.commands[unit.guard[0]].actions,
+                    unit.epsilon,
+                    lex_psm_template[unit.level][unit.q_state],
+                    inv_template[unit.q_state],
+                    unit.q_state,
                 )
-                constraints.extend(self._farkas_lemma(a, b, c_t.transpose(), d))
-        return constraints
 
     def _get_epsilon_constraint(
         self, i: int, j: int, k: int, epsilons: list[list[list[Symbol]]]
     ) -> BoolRef:
         if i == 0:
-            return get_z3_var(epsilons[i][j][k]) >= 0
+            return get_z3_var(epsilons[i][j][k], self._context) >= 0
 
         premise = z3_And(
             [
-                get_z3_var(epsilon) == 0
+                get_z3_var(epsilon, self._context) == 0
                 for epsilon in list(map(lambda x: x[j][k], epsilons))[:i]
             ]
         )
@@ -511,77 +1113,322 @@ class ParitySupermartingale:
         if i == j and i % 2:
             # Enforce strict decrease in expectation for the last possible
             # case of a Parity Objective with odd priority
-            return Implies(premise, get_z3_var(epsilons[i][j][k]) > 0)
+            return Implies(premise, get_z3_var(epsilons[i][j][k], self._context) > 0)
+
+        return Implies(premise, get_z3_var(epsilons[i][j][k], self._context) >= 0)
+
+    def _dpa_state_verification(
+        self,
+        q_state: int,
+        objectives: list[CompiledDNF],
+        incremental: bool,
+        invariant: CompiledPolyhedron | None = None,
+        lazy: bool = False,
+        ranking: Literal["maxsmt", "lp"] = "maxsmt",
+        backend: BackendName = "z3",
+    ) -> tuple[list[LinPSM], bool]:
+        """
+        Synthesize the components of the LPSM for DPA state `q_state`, returning
+        them together with whether all the guards have been ranked. With an
+        `invariant` the premises are restricted to its states.
+        """
+        with self._phase("pruning", engine="verification", q_state=q_state):
+            dpa_state_guards = self._add_dpa_state_evaluation(q_state, invariant)
+        psms: list[LinPSM] = []
+
+        if incremental:
+            alpha = partial(
+                self._incremental_alpha,
+                context=self._incremental_alpha_context(
+                    dpa_state_guards, objectives, q_state, ranking
+                ),
+                q=q_state,
+                ranking=ranking,
+            )
+        else:
+            alpha = partial(
+                self._alpha,
+                s=objectives,
+                q=q_state,
+                lazy=lazy,
+                ranking=ranking,
+                backend=backend,
+            )
+
+        for i in range(len(objectives)):
+            psm_i, dpa_state_guards = alpha(i, dpa_state_guards)
+            psms.append(psm_i)
+
+            if dpa_state_guards == []:
+                # Short circuiting iterative synthesis algorithm if no guards are left
+                break
 
-        return Implies(premise, get_z3_var(epsilons[i][j][k]) >= 0)
+        return psms, len(dpa_state_guards) == 0
 
-    def verification(self, q_states: list[int], s: list[ParityObjective]) -> LinLexPSM:
+    def verification(
+        self,
+        q_states: list[int],
+        s: list[ParityObjective],
+        incremental: bool = False,
+        workers: int | None = None,
+        invariants: bool = False,
+        lazy: bool = False,
+        ranking: Literal["maxsmt", "lp"] = "maxsmt",
+        backend: BackendName = "z3",
+        slicing: bool = False,
+    ) -> LinLexPSM:
         """
         Synthesize a LPSM for the given reactive module certifying the
-        reactive property encoded as a list of parity objectives `v`
+        reactive property encoded as a list of parity objectives `v`.
+        With `incremental` a single solver is kept for each DPA state and
+        reused across all the levels of the LPSM.
+        With `workers` the DPA states are distributed over a pool of as many
+        processes, each one with its own variables and z3 context.
+        With `invariants` the premises are restricted to the reachable states,
+        over-approximated by `abstract_interpretation.interval_invariants`, so
+        that the LPSM is only valid on them, see `verification_invariant`.
+        With `lazy` the Farkas constraints of a premise are only encoded once a
+        candidate LPSM violates it, see `_lazy_solve`. Not supported together
+        with `incremental`.
+        The guards ranked at each level are the ones with a positive epsilon
+        in a solution with as many positive epsilons as possible, found by
+        MaxSMT with `maxsmt` ranking and by a sequence of LPs with `lp`
+        ranking, see `_lp_ranking`.
+        Each LP is solved by the `backend` solver: z3, the exact rational
+        simplex of `solver_backend.RationalBackend`, or with `float` the float
+        simplex, whose solution is rounded and checked exactly before falling
+        back to the exact one, see `solver_backend.FloatFirstBackend`. The last
+        two only support the `lp` ranking and not `incremental`.
+        With `slicing` the LPSM is synthesized on the cone of influence of the
+        guards and of `s`, see `_sliced`.
         """
-        guards = self._system.guards
+        if lazy and incremental:
+            raise ValueError("lazy encoding is not supported with incremental")
+        if backend != "z3" and (incremental or ranking != "lp"):
+            raise ValueError(
+                f"{backend} backend requires lp ranking and is not supported with "
+                "incremental"
+            )
+        if slicing:
+            with self._phase("pruning", engine="verification"):
+                sliced = self._sliced(s)
+            if sliced is not None:
+                projection, psm = sliced
+                try:
+                    sliced_lex_psm = psm.verification(
+                        q_states,
+                        s,
+                        incremental,
+                        workers,
+                        invariants,
+                        lazy,
+                        ranking,
+                        backend,
+                    )
+                finally:
+                    self._merge_encoding_stats(psm._encoding_stats)
+                self._verification_invariant = (
+                    None
+                    if psm.verification_invariant is None
+                    else projection.lift_invariant(psm.verification_invariant)
+                )
+                return projection.lift_lex_psm(sliced_lex_psm)
         lex_psm: LinLexPSM = [{} for _ in range(len(s))]
 
-        # Fix q and then synthesize an SPPM for q
-        for q_state in q_states:
-            dpa_state_guards = self._add_dpa_state_evaluation(q_state, guards)
+        with self._phase("parsing", engine="verification"):
+            objectives = [compile_dnf(s_j, self._system.vars) for s_j in s]
+        engine = "verification+intervals" if invariants else "verification"
+        key = self._certificate_key(engine, objectives, q_states)
+        cached = self._load_certificate(key, objectives, q_states, "verification")
+        if cached is not None:
+            self._verification_invariant = cached[1]
+            return cached[0]
+
+        fixed_invariants: dict[int, CompiledPolyhedron] = {}
+        if invariants:
+            with self._phase("invariants", engine="verification"):
+                fixed_invariants = interval_invariants(self._module, q_states)
+        self._verification_invariant = (
+            {
+                q_state: _invariant_function(invariant)
+                for q_state, invariant in fixed_invariants.items()
+            }
+            if invariants
+            else None
+        )
 
-            for i in range(len(s)):
-                # print(f"Synthesizing psm_{i}_q{q_state}")
-                psm_i, dpa_state_guards = self._alpha(i, dpa_state_guards, s, q_state)
-                # print(f"Done synthesizing psm_{i}_q{q_state}")
-                lex_psm[i].update({q_state: psm_i})
+        if workers is None or workers <= 1:
+            results = [
+                self._dpa_state_verification(
+                    q_state,
+                    objectives,
+                    incremental,
+                    fixed_invariants.get(q_state),
+                    lazy,
+                    ranking,
+                    backend,
+                )
+                for q_state in q_states
+            ]
+        else:
+            results = []
+            with process_pool(
+                workers,
+                _init_verification_worker,
+                (self._system, self._options, s, fixed_invariants),
+            ) as pool:
+                # The phases of the workers are replayed in the order of
+                # `q_states`
+                for result, records, stats in pool.map(
+                    partial(
+                        _verification_worker,
+                        incremental=incremental,
+                        lazy=lazy,
+                        ranking=ranking,
+                        backend=backend,
+                    ),
+                    q_states,
+                ):
+                    results.append(result)
+                    self._merge_encoding_stats(stats)
+                    for record in records:
+                        self._telemetry.notify(record)
 
-                if dpa_state_guards == []:
-                    # Short circuiting iterative synthesis algorithm if no guards are left
-                    break
+        # Fix q and then synthesize an SPPM for q
+        for q_state, (psms, all_ranked) in zip(q_states, results):
+            for i, psm_i in enumerate(psms):
+                lex_psm[i].update({q_state: psm_i})
 
-            if len(dpa_state_guards) > 0:
+            if not all_ranked:
                 print("WARNING: Not all guards have been ranked")
+
+        if all(all_ranked for _, all_ranked in results):
+            self._store_certificate(key, lex_psm, self._verification_invariant)
         return lex_psm
 
     def invariant_synthesis_and_verification(
-        self, q_states: list[int], s: list[ParityObjective]
+        self,
+        q_states: list[int],
+        s: list[ParityObjective],
+        workers: int | None = None,
+        strategy: Literal["monolithic", "alternating"] = "monolithic",
+        restarts: int = 8,
+        iterations: int = 16,
+        seed: int = 0,
+        invariants: Literal["template", "intervals"] = "template",
+        lazy: bool = False,
+        slicing: bool = False,
     ):
+        """
+        Synthesize a LPSM together with a linear invariant for each DPA state.
+        With `workers` the Farkas constraints are generated by a pool of as many
+        processes and merged in a deterministic order in the main solver.
+        With `template` invariants the constraints are bilinear in the
+        invariant and the Farkas multipliers. The `monolithic` strategy solves
+        them with a single nonlinear query, the `alternating` one first tries
+        `_alternating_invariant_synthesis` with at most `restarts` starting
+        invariants of `iterations` rounds each (randomized by `seed`), falling
+        back to the monolithic query if no certificate is found.
+        With `intervals` invariants the invariant of each DPA state is fixed to
+        the one computed by `abstract_interpretation.interval_invariants`,
+        inductive by construction, and the constraints are linear.
+        With `lazy` the Farkas constraints of a premise are only encoded once a
+        candidate solution violates it, see `_lazy_solve`. Only supported
+        with `intervals` invariants and without `workers`: with `template`
+        invariants each round is a nonlinear query, and the rounds are not
+        bounded.
+        With `slicing` the certificate is synthesized on the cone of influence
+        of the guards and of `s`, see `_sliced`.
+        """
+        if lazy and invariants == "template":
+            raise ValueError("lazy encoding is not supported with template invariants")
+        if lazy and (workers or 0) > 1:
+            raise ValueError("lazy encoding is not supported with workers")
+        if slicing:
+            with self._phase("pruning", engine="invariant_synthesis"):
+                sliced = self._sliced(s)
+            if sliced is not None:
+                projection, psm = sliced
+                try:
+                    lex_psm, invariant = psm.invariant_synthesis_and_verification(
+                        q_states,
+                        s,
+                        workers,
+                        strategy,
+                        restarts,
+                        iterations,
+                        seed,
+                        invariants,
+                        lazy,
+                    )
+                finally:
+                    self._merge_encoding_stats(psm._encoding_stats)
+                return projection.lift_lex_psm(lex_psm), projection.lift_invariant(
+                    invariant
+                )
+        labels = {"engine": "invariant_synthesis"}
+        with self._phase("parsing", **labels):
+            objectives = [compile_dnf(s_j, self._system.vars) for s_j in s]
+        engine = (
+            "invariant_synthesis+intervals"
+            if invariants == "intervals"
+            else "invariant_synthesis"
+        )
+        key = self._certificate_key(engine, objectives, q_states)
+        cached = self._load_certificate(
+            key, objectives, q_states, "invariant_synthesis"
+        )
+        if cached is not None:
+            return cached
+
         # Create a functional template for the LinLexPSM
         lin_lex_psm_template: SPLinLexPSM = [
             {
                 q_state: self._get_linear_template(
                     f"V_{i}_q{q_state}", 1, len(self._system.vars)
                 )
-                for q_state in range(len(q_states))
+                for q_state in q_states
             }
             for i in range(len(s))
         ]
 
-        # Create a template for the linear invariant to synthesize
-        lin_invariant_template: SPStateBasedLinearFunction = {
-            q_state: self._get_linear_template("inv", 1, len(self._system.vars))
-            for q_state in q_states
-        }
-
+        n = len(self._system.vars)
+        fixed_invariants: dict[int, CompiledPolyhedron] = {}
+        if invariants == "intervals":
+            with self._phase("invariants", **labels):
+                fixed_invariants = interval_invariants(self._module, q_states)
+            lin_invariant_template: SPStateBasedLinearFunction = {
+                q_state: (invariant.a_matrix(n), -invariant.b_matrix())
+                for q_state, invariant in fixed_invariants.items()
+            }
+        else:
+            # Create a template for the linear invariant to synthesize
+            lin_invariant_template = {
+                q_state: self._get_linear_template("inv", 1, n) for q_state in q_states
+            }
         epsilons: dict[int, list[list[list[Symbol]]]] = {
             q_state: [] for q_state in q_states
         }
 
-        solver = Solver()
+        constraints: list[Constraint] = []
+        if strategy == "alternating" and invariants == "template":
+            self._slack = Symbol("slack")
+            self._context.declare([self._slack])
 
         # Add non-negativity constraints for each LinPSM of the LexPSM
-        solver.add(
-            self._get_non_negativity_constraints(
-                lin_invariant_template, lin_lex_psm_template
-            )
-        )
+        units = [_ConstraintUnit("non_negativity", q_state) for q_state in q_states]
 
-        solver.add(self._get_invariant_init_contraints(lin_invariant_template))
-
-        solver.add(self._get_invariant_consec_contraints(lin_invariant_template))
+        if invariants == "template":
+            units.extend(
+                _ConstraintUnit("consecution", q_state) for q_state in q_states
+            )
 
+        epsilon_constraints: list[BoolRef] = []
         for q_state in q_states:
-            dpa_state_guards = self._add_dpa_state_evaluation(
-                q_state, self._system.guards
-            )
+            with self._phase("pruning", **labels, q_state=q_state):
+                dpa_state_guards = self._add_dpa_state_evaluation(
+                    q_state, fixed_invariants.get(q_state)
+                )
             for i in range(len(s)):
                 epsilons[q_state].append([])
                 for j in range(len(s)):
@@ -594,58 +1441,358 @@ class ParitySupermartingale:
                         )
 
                         # For each combination of i, j, k, we need to compute the
-                        # Add the post expectation constraints to the solver
-                        solver.add(
-                            *self._get_drift_constraints(
-                                s[j],
-                                dpa_state_guards[k][1],
-                                self._system.get_nth_command_updates(
-                                    dpa_state_guards[k][0]
-                                ),
+                        # post expectation constraints
+                        units.append(
+                            _ConstraintUnit(
+                                "drift",
+                                q_state,
+                                i,
+                                j,
+                                dpa_state_guards[k],
                                 epsilons[q_state][i][j][k],
-                                lin_lex_psm_template[i][q_state],
-                                lin_invariant_template[q_state],
                             )
                         )
 
                         # Add the epsilon constraint to the solver
-                        solver.add(
+                        epsilon_constraints.append(
                             self._get_epsilon_constraint(i, j, k, epsilons[q_state])
                         )
 
-        if solver.check() == unsat:
+        templates = (lin_lex_psm_template, lin_invariant_template, objectives)
+        relaxation = self._slack
+        try:
+            with (
+                self._phase("encoding", **labels),
+                self._shared_farkas(),
+                self._lazy_farkas(lazy) as instances,
+            ):
+                if invariants == "template":
+                    constraints.extend(
+                        self._get_invariant_init_contraints(lin_invariant_template)
+                    )
+                if workers is None or workers <= 1:
+                    for unit in units:
+                        constraints.extend(self._get_unit_constraints(unit, *templates))
+                else:
+                    # Constraints are generated by the workers, each unit with its
+                    # own namespace for fresh variables, and sent back as SMT-LIB2
+                    # scripts parsed in the order of `units`
+                    with process_pool(
+                        workers,
+                        _init_invariant_synthesis_worker,
+                        (self._system, self._options, templates, self._slack),
+                    ) as pool:
+                        for smt2, stats in pool.map(
+                            _invariant_synthesis_worker,
+                            enumerate(units),
+                            chunksize=max(1, len(units) // (4 * workers)),
+                        ):
+                            constraints.extend(
+                                parse_smt2_string(smt2, ctx=self._context.z3)
+                            )
+                            self._merge_encoding_stats(stats)
+
+                constraints.extend(epsilon_constraints)
+        finally:
+            self._slack = None
+
+        if relaxation is not None:
+            slack = get_z3_var(relaxation, self._context)
+            constraints.append(slack >= 0)
+            with self._phase("solving", **labels, strategy="alternating"):
+                certificate = self._alternating_invariant_synthesis(
+                    to_z3_constraints(constraints, self._context.z3),
+                    slack,
+                    q_states,
+                    objectives,
+                    lin_lex_psm_template,
+                    lin_invariant_template,
+                    restarts,
+                    iterations,
+                    seed,
+                )
+            if certificate is not None:
+                self._store_certificate(key, *certificate)
+                return certificate
+            # Fall back to the monolithic query of the unrelaxed constraints
+            constraints.append(slack == 0)
+
+        solver = Z3Backend(Solver(ctx=self._context.z3))
+        solver.add(constraints)
+        model = self._lazy_solve(solver, instances, labels)
+        if model is None:
             # No solution for linear program
             raise RuntimeError("No solution for invariant and LinLexPSM synthesis")
 
-        model = solver.model()
+        with self._phase("extraction", **labels):
+            lin_lex_psm, lin_invariant = self._extract_invariant_synthesis(
+                lambda var: z3_real_to_float(model.eval(var, model_completion=True)),
+                q_states,
+                lin_lex_psm_template,
+                lin_invariant_template,
+            )
+        self._store_certificate(key, lin_lex_psm, lin_invariant)
+        return lin_lex_psm, lin_invariant
+
+    def _invariant_seeds(
+        self, inv_template: SPStateBasedLinearFunction, restarts: int, seed: int
+    ) -> Iterator[Assignment]:
+        """
+        Starting invariants of the alternating solver: the trivial invariant
+        first, then random half-spaces containing the states sampled along
+        random runs of the system in each DPA state
+        """
+        rng = Random(seed)
+        states = sample_states(self._module, 256, rng)
+        n = len(self._system.vars)
+        q_index = self._module.dpa_index
+
+        for restart in range(restarts):
+            assignment: Assignment = {}
+            for q_state, (inv_a, inv_b) in inv_template.items():
+                a = [
+                    Fraction(0 if restart == 0 or j == q_index else rng.randint(-1, 1))
+                    for j in range(n)
+                ]
+                reached = [
+                    sum((a_j * x_j for a_j, x_j in zip(a, x)), Fraction(0))
+                    for x in states
+                    if x[q_index] == q_state
+                ]
+                b = -max(reached) if restart > 0 and reached else Fraction(-1)
+                assignment.update(zip((var.name for var in inv_a), a))
+                assignment[inv_b[0, 0].name] = b
+            yield assignment
+
+    def _alternating_invariant_synthesis(
+        self,
+        constraints: list[BoolRef],
+        slack: ArithRef,
+        q_states: list[int],
+        objectives: list[CompiledDNF],
+        lin_lex_psm_template: SPLinLexPSM,
+        lin_invariant_template: SPStateBasedLinearFunction,
+        restarts: int,
+        iterations: int,
+        seed: int,
+    ) -> tuple[LinLexPSM, StateBasedLinearFunction] | None:
+        """
+        Solve the invariant synthesis constraints, relaxed by `slack`, by
+        alternately fixing the invariant and the Farkas multipliers of its
+        rows, see `bilinear.alternating_solve`. Every solution is checked
+        exactly, after rounding to floating point, before being returned.
+        """
+        inv_vars = [
+            get_z3_var(var, self._context)
+            for inv_a, inv_b in lin_invariant_template.values()
+            for var in chain(inv_a, inv_b)
+        ]
+        for values in alternating_solve(
+            constraints,
+            slack,
+            inv_vars,
+            self._invariant_seeds(lin_invariant_template, restarts, seed),
+            iterations,
+            self._context.z3,
+        ):
+
+            def value(var: ArithRef) -> Fraction:
+                return values.get(var.decl().name(), Fraction(0))
+
+            # Check the returned floating point certificate, as rounding may
+            # break a tight exact one
+            certificate = self._extract_invariant_synthesis(
+                lambda var: float(value(var)),
+                q_states,
+                lin_lex_psm_template,
+                lin_invariant_template,
+            )
+            if (
+                check_compiled_certificate(
+                    self._module, objectives, q_states, *certificate
+                )
+                is None
+            ):
+                return certificate
+        return None
+
+    def _extract_invariant_synthesis(
+        self,
+        value: Callable[[ArithRef], T],
+        q_states: list[int],
+        lin_lex_psm_template: SPLinLexPSM,
+        lin_invariant_template: SPStateBasedLinearFunction,
+    ) -> tuple[list[dict[int, tuple[list[list[T]], list[list[T]]]]], dict]:
+        """
+        LPSM and invariant with the coefficients of the templates given by
+        `value`
+        """
         lin_lex_psm: LinLexPSM = [
             {
                 q_state: (
                     [
-                        [z3_real_to_float(model[var]) for var in row]
-                        for row in parse_matrix(fst(lin_lex_psm_template[i][q_state]))
+                        [value(var) for var in row]
+                        for row in parse_matrix(
+                            fst(lin_lex_psm_template[i][q_state]), self._context
+                        )
                     ],
                     [
-                        [z3_real_to_float(model[var]) for var in row]
-                        for row in parse_matrix(snd(lin_lex_psm_template[i][q_state]))
+                        [value(var) for var in row]
+                        for row in parse_matrix(
+                            snd(lin_lex_psm_template[i][q_state]), self._context
+                        )
                     ],
                 )
                 for q_state in q_states
             }
-            for i in range(len(s))
+            for i in range(len(lin_lex_psm_template))
         ]
 
         lin_invariant: StateBasedLinearFunction = {
             q_state: (
                 [
-                    [z3_real_to_float(model[var]) for var in row]
-                    for row in parse_matrix(fst(lin_invariant_template[q_state]))
+                    [value(var) for var in row]
+                    for row in parse_matrix(
+                        fst(lin_invariant_template[q_state]), self._context
+                    )
                 ],
                 [
-                    [z3_real_to_float(model[var]) for var in row]
-                    for row in parse_matrix(snd(lin_invariant_template[q_state]))
+                    [value(var) for var in row]
+                    for row in parse_matrix(
+                        snd(lin_invariant_template[q_state]), self._context
+                    )
                 ],
             )
             for q_state in q_states
         }
         return lin_lex_psm, lin_invariant
+
+
+def _compose(
+    v_a: Sequence[LinearTerm], update: AffineMap
+) -> tuple[list[LinearTerm], LinearTerm]:
+    """
+    Terms of the coefficients and of the constant of x -> v_a (a x + b), over
+    the non-zero entries of `update` only
+    """
+    return [
+        combine([(u_kj, v_a[k]) for k, u_kj in column]) for column in update.columns
+    ], combine([(b_k, v_a[k]) for k, b_k in enumerate(update.b)])
+
+
+def _invariant_function(invariant: CompiledPolyhedron) -> LinearFunction:
+    """
+    Linear function whose rows are all non-positive exactly on `invariant`
+    """
+    return (
+        [list(map(float, a_i)) for a_i in invariant.a],
+        [[float(-b_i)] for b_i in invariant.b],
+    )
+
+
+# State of a verification worker process, see `ParitySupermartingale.verification`
+_worker_psm: ParitySupermartingale | None = None
+_worker_objectives: list[CompiledDNF] = []
+_worker_invariants: dict[int, CompiledPolyhedron] = {}
+# Phases of the current job of the worker
+_worker_records: list[PhaseRecord] = []
+
+
+def _init_verification_worker(
+    system: ReactiveModule,
+    options: dict,
+    s: list[ParityObjective],
+    invariants: dict[int, CompiledPolyhedron],
+) -> None:
+    global _worker_psm, _worker_objectives, _worker_invariants
+
+    _worker_psm = ParitySupermartingale(
+        system, **options, observers=[_worker_records.append]
+    )
+    _worker_objectives = [compile_dnf(s_j, system.vars) for s_j in s]
+    _worker_invariants = invariants
+
+
+def _worker_encoding_stats_delta(start: dict[str, int]) -> dict[str, int]:
+    assert _worker_psm is not None
+    return {
+        key: _worker_psm._encoding_stats[key] - value for key, value in start.items()
+    }
+
+
+def _verification_worker(
+    q_state: int,
+    incremental: bool,
+    lazy: bool,
+    ranking: Literal["maxsmt", "lp"],
+    backend: BackendName,
+) -> tuple[tuple[list[LinPSM], bool], list[PhaseRecord], dict[str, int]]:
+    """
+    LPSM components of `q_state` with the phases and encoding statistics of
+    their synthesis
+    """
+    assert _worker_psm is not None
+    _worker_records.clear()
+    start = dict(_worker_psm._encoding_stats)
+    result = _worker_psm._dpa_state_verification(
+        q_state,
+        _worker_objectives,
+        incremental,
+        _worker_invariants.get(q_state),
+        lazy,
+        ranking,
+        backend,
+    )
+    return result, list(_worker_records), _worker_encoding_stats_delta(start)
+
+
+# State of an invariant synthesis worker process, see
+# `ParitySupermartingale.invariant_synthesis_and_verification`
+_worker_templates: (
+    tuple[SPLinLexPSM, SPStateBasedLinearFunction, list[CompiledDNF]] | None
+) = None
+
+
+def _init_invariant_synthesis_worker(
+    system: ReactiveModule,
+    options: dict,
+    templates: tuple[SPLinLexPSM, SPStateBasedLinearFunction, list[CompiledDNF]],
+    slack: Symbol | None,
+) -> None:
+    global _worker_psm, _worker_templates
+
+    _worker_psm = ParitySupermartingale(system, **options)
+    _worker_templates = templates
+    if slack is not None:
+        _worker_psm._slack = slack
+        _worker_psm.context.declare([slack])
+    lex_psm_template, inv_template, _ = templates
+    for a, b in chain(
+        inv_template.values(),
+        chain.from_iterable(map(dict.values, lex_psm_template)),
+    ):
+        _worker_psm.context.declare(a.free_symbols | b.free_symbols)
+
+
+def _invariant_synthesis_worker(
+    indexed_unit: tuple[int, _ConstraintUnit],
+) -> tuple[str, dict[str, int]]:
+    """
+    SMT-LIB2 script of the constraints of a unit with the encoding statistics
+    of their generation
+    """
+    assert _worker_psm is not None and _worker_templates is not None
+    index, unit = indexed_unit
+    _worker_psm.context.namespace = f"u{index}:"
+    if unit.epsilon is not None:
+        _worker_psm.context.declare([unit.epsilon])
+
+    start = dict(_worker_psm._encoding_stats)
+    solver = Solver(ctx=_worker_psm.context.z3)
+    solver.add(
+        to_z3_constraints(
+            _worker_psm._get_unit_constraints(unit, *_worker_templates),
+            _worker_psm.context.z3,
+        )
+    )
+    return solver.to_smt2(), _worker_encoding_stats_delta(start)
@@ -147,7 +147,7 @@ objectives: list[ParityObjective] = [q_0, q_1, q_2]
 
 print("Starting synthesising")
 start_time = time()
-lex_psm = psm.invariant_synthesis_and_verification([0, 1, 2], objectives)
+lex_psm = psm.verification([0, 1, 2], objectives)
 elapsed = time() - start_time
 print("Elapsed time:", elapsed)
 print("PSM:", lex_psm)
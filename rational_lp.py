@@ -0,0 +1,400 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from fractions import Fraction
+from math import floor
+from typing import Literal
+
+Relation = Literal["<=", "<", "=="]
+# Constraint a_1 * x_1 + ... + a_n * x_n ~ b over free variables x
+LinearConstraint = tuple[Sequence[Fraction], Relation, Fraction]
+
+Status = Literal["optimal", "infeasible", "unbounded"]
+
+
+@dataclass(frozen=True)
+class LPResult:
+    status: Status
+    # Supremum of the objective, only meaningful if status == "optimal"
+    value: Fraction | None = None
+    # Point of the closure of the feasible region attaining `value`
+    point: tuple[Fraction, ...] | None = None
+
+
+_Tableau = list[list[Fraction]]
+
+
+def _pivot(
+    tableau: _Tableau, basis: list[int], row: int, col: int, tolerance: float = 0
+) -> None:
+    pivot_row = tableau[row]
+    pivot = pivot_row[col]
+    pivot_row = [x / pivot if x != 0 else x for x in pivot_row]
+    tableau[row] = pivot_row
+
+    # The tableau is mostly zero, only update the columns of the pivot row
+    nonzero = [(j, y) for j, y in enumerate(pivot_row) if y != 0]
+    for i, other in enumerate(tableau):
+        factor = other[col]
+        if i != row and factor != 0:
+            other = other[:]
+            for j, y in nonzero:
+                other[j] -= factor * y
+                if tolerance and abs(other[j]) <= tolerance:
+                    # Flush the rounding errors of floating point tableaux
+                    other[j] = 0.0
+            tableau[i] = other
+
+    basis[row] = col
+
+
+def _optimize(
+    tableau: _Tableau, basis: list[int], columns: int, tolerance: float = 0
+) -> bool:
+    """
+    Run the simplex method with Bland's rule on `tableau`, whose last row is
+    the objective row (reduced costs negated) and whose last column holds the
+    right-hand side. Only the first `columns` columns may enter the basis.
+    Entries within `tolerance` of zero are treated as zero.
+    Returns False if the objective is unbounded.
+    """
+    objective = tableau[-1]
+    while True:
+        entering = next((j for j in range(columns) if objective[j] < -tolerance), None)
+        if entering is None:
+            return True
+
+        leaving = None
+        for i, row in enumerate(tableau[:-1]):
+            if row[entering] > tolerance:
+                ratio = row[-1] / row[entering]
+                if (
+                    leaving is None
+                    or ratio < leaving[0]
+                    or (ratio == leaving[0] and basis[i] < basis[leaving[1]])
+                ):
+                    leaving = (ratio, i)
+
+        if leaving is None:
+            return False
+
+        _pivot(tableau, basis, leaving[1], entering, tolerance)
+        objective = tableau[-1]
+
+
+def _standard_form(
+    constraints: Sequence[LinearConstraint], n: int, number: type = Fraction
+) -> tuple[_Tableau, int]:
+    """
+    Rows of `A y = b, y >= 0` with `b >= 0` equivalent to `constraints`, where
+    y = (x+, x-, slacks) and x = x+ - x-, with entries of type `number`.
+    Strict inequalities are relaxed to non-strict ones.
+    """
+    slacks = sum(1 for _, rel, _ in constraints if rel != "==")
+    rows: _Tableau = []
+    slack = 0
+    for a, rel, b in constraints:
+        row = [number(0)] * (2 * n + slacks + 1)
+        for j, coeff in enumerate(a):
+            row[j] = number(coeff)
+            row[n + j] = -number(coeff)
+        if rel != "==":
+            row[2 * n + slack] = number(1)
+            slack += 1
+        row[-1] = number(b)
+        if row[-1] < 0:
+            row = [-x for x in row]
+        rows.append(row)
+    return rows, 2 * n + slacks
+
+
+def maximize(
+    objective: Sequence[Fraction], constraints: Sequence[LinearConstraint]
+) -> LPResult:
+    """
+    Maximize `objective . x` over the closure of the polyhedron defined by
+    `constraints` with exact rational arithmetic (two-phase simplex method).
+    The result is the supremum over the polyhedron whenever its strict
+    inequalities can be satisfied, see `feasible`.
+    """
+    (result,) = maximize_all([objective], constraints, len(objective))
+    return result
+
+
+def maximize_float(
+    objective: Sequence[Fraction],
+    constraints: Sequence[LinearConstraint],
+    tolerance: float = 1e-9,
+) -> LPResult:
+    """
+    Same as `maximize`, but in floating point arithmetic, treating values
+    within `tolerance` of zero as zero: much faster, but the result is only
+    approximate and has float entries
+    """
+    (result,) = maximize_all([objective], constraints, len(objective), tolerance)
+    return result
+
+
+def maximize_all(
+    objectives: Sequence[Sequence[Fraction]],
+    constraints: Sequence[LinearConstraint],
+    n: int,
+    tolerance: float | None = None,
+) -> list[LPResult]:
+    """
+    `maximize` each of the `objectives` over x in R^n, computing a feasible
+    basis of the `constraints` only once. With a `tolerance` the simplex runs
+    in floating point, see `maximize_float`.
+    """
+    number = Fraction if tolerance is None else float
+    tolerance = 0 if tolerance is None else tolerance
+    rows, columns = _standard_form(constraints, n, number)
+    m = len(rows)
+
+    # Phase 1: minimize the sum of the artificial variables
+    tableau: _Tableau = [
+        row[:-1] + [number(int(i == k)) for k in range(m)] + row[-1:]
+        for i, row in enumerate(rows)
+    ]
+    tableau.append([number(0)] * (columns + m + 1))
+    for i in range(m):
+        tableau[-1] = [x - y for x, y in zip(tableau[-1], tableau[i])]
+        tableau[-1][columns + i] = number(0)
+    basis = list(range(columns, columns + m))
+    _optimize(tableau, basis, columns + m, tolerance)
+
+    if abs(tableau[-1][-1]) > tolerance:
+        return [LPResult("infeasible") for _ in objectives]
+
+    # Drive the artificial variables out of the basis, dropping redundant rows
+    for i in reversed(range(m)):
+        if basis[i] < columns:
+            continue
+        entering = next(
+            (j for j in range(columns) if abs(tableau[i][j]) > tolerance), None
+        )
+        if entering is None:
+            del tableau[i]
+            del basis[i]
+        else:
+            _pivot(tableau, basis, i, entering, tolerance)
+    tableau = [row[:columns] + row[-1:] for row in tableau]
+
+    return [
+        _phase_2(
+            objective,
+            n,
+            [row[:] for row in tableau],
+            basis[:],
+            columns,
+            number,
+            tolerance,
+        )
+        for objective in objectives
+    ]
+
+
+def _phase_2(
+    objective: Sequence[Fraction],
+    n: int,
+    tableau: _Tableau,
+    basis: list[int],
+    columns: int,
+    number: type = Fraction,
+    tolerance: float = 0,
+) -> LPResult:
+    """
+    Maximize `objective` from the feasible basis of `tableau`
+    """
+    costs = [number(c) for c in objective]
+    costs = costs + [-c for c in costs] + [number(0)] * (columns - 2 * n)
+    tableau[-1] = [-c for c in costs] + [number(0)]
+    for i, var in enumerate(basis):
+        if costs[var] != 0:
+            tableau[-1] = [x + costs[var] * y for x, y in zip(tableau[-1], tableau[i])]
+
+    if not _optimize(tableau, basis, columns, tolerance):
+        return LPResult("unbounded")
+
+    values = [number(0)] * columns
+    for i, var in enumerate(basis):
+        values[var] = tableau[i][-1]
+    point = tuple(values[j] - values[n + j] for j in range(n))
+    return LPResult("optimal", tableau[-1][-1], point)
+
+
+def feasible(constraints: Sequence[LinearConstraint], n: int) -> bool:
+    """
+    Whether there exists x in R^n satisfying all the `constraints`.
+    Strict inequalities `a x < b` are checked by maximizing a slack t <= 1
+    in `a x + t <= b`, which is positive if and only if they can be satisfied.
+    """
+    if all(rel != "<" for _, rel, _ in constraints):
+        return maximize([Fraction(0)] * n, constraints).status != "infeasible"
+
+    slack_constraints: list[LinearConstraint] = [
+        ([*a, Fraction(int(rel == "<"))], "<=" if rel == "<" else rel, b)
+        for a, rel, b in constraints
+    ]
+    slack_constraints.append(([Fraction(0)] * n + [Fraction(1)], "<=", Fraction(1)))
+    result = maximize([Fraction(0)] * n + [Fraction(1)], slack_constraints)
+    return result.status == "optimal" and result.value > 0
+
+
+def _simplest_between(lower: Fraction, upper: Fraction) -> Fraction:
+    """
+    Rational with the smallest denominator in [`lower`, `upper`], computed by
+    their continued fractions
+    """
+    integer = floor(lower)
+    if integer == lower or integer + 1 <= upper:
+        return Fraction(integer if integer == lower else integer + 1)
+    return integer + 1 / _simplest_between(1 / (upper - integer), 1 / (lower - integer))
+
+
+def _solve_linear(
+    a: Sequence[Sequence[Fraction]], b: Sequence[Fraction]
+) -> list[Fraction] | None:
+    """
+    Solution of `a y == b` by Gauss-Jordan elimination, with the free
+    variables set to 0, None if there is none
+    """
+    rows = [[*a_i, b_i] for a_i, b_i in zip(a, b)]
+    k = len(rows[0]) - 1 if rows else 0
+    pivots: list[int] = []
+    for col in range(k):
+        r = len(pivots)
+        pivot = next((i for i in range(r, len(rows)) if rows[i][col] != 0), None)
+        if pivot is None:
+            continue
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        rows[r] = [x / rows[r][col] for x in rows[r]]
+        for i, row in enumerate(rows):
+            if i != r and row[col] != 0:
+                factor = row[col]
+                rows[i] = [x - factor * y for x, y in zip(row, rows[r])]
+        pivots.append(col)
+    if any(row[-1] != 0 for row in rows[len(pivots) :]):
+        return None
+    y = [Fraction(0)] * k
+    for r, col in enumerate(pivots):
+        y[col] = rows[r][-1]
+    return y
+
+
+def rationalize(x: float, tolerance: float = 1e-11) -> Fraction:
+    """
+    Simplest rational within `tolerance` of `x`, relative to its magnitude
+    """
+    error = Fraction(tolerance) * abs(Fraction(x))
+    return _simplest_between(Fraction(x) - error, Fraction(x) + error)
+
+
+def satisfies(constraint: LinearConstraint, point: Sequence[Fraction]) -> bool:
+    a, rel, b = constraint
+    ax = sum((a_j * x_j for a_j, x_j in zip(a, point) if a_j != 0), Fraction(0))
+    match rel:
+        case "<=":
+            return ax <= b
+        case "<":
+            return ax < b
+        case "==":
+            return ax == b
+
+
+def feasible_float_first(
+    constraints: Sequence[LinearConstraint], n: int, tolerance: float = 1e-11
+) -> bool:
+    """
+    Same as `feasible`, but first solved in floating point: a float solution
+    rounded by `rationalize` and satisfying the `constraints` exactly proves
+    them feasible. Only otherwise they are solved again exactly.
+    """
+    if all(rel != "<" for _, rel, _ in constraints):
+        (result,) = maximize_all([[Fraction(0)] * n], constraints, n, 1e-9)
+    else:
+        # Largest slack t <= 1 of the strict inequalities, as in `feasible`
+        slack_constraints: list[LinearConstraint] = [
+            ([*a, Fraction(int(rel == "<"))], "<=" if rel == "<" else rel, b)
+            for a, rel, b in constraints
+        ]
+        slack_constraints.append(([Fraction(0)] * n + [Fraction(1)], "<=", Fraction(1)))
+        (result,) = maximize_all(
+            [[Fraction(0)] * n + [Fraction(1)]], slack_constraints, n + 1, 1e-9
+        )
+    if result.status == "optimal":
+        point = [rationalize(x, tolerance) for x in result.point[:n]]
+        if all(satisfies(constraint, point) for constraint in constraints):
+            return True
+    return feasible(constraints, n)
+
+
+def supremum_sign(
+    objective: Sequence[Fraction],
+    constant: Fraction,
+    constraints: Sequence[LinearConstraint],
+    tolerance: float = 1e-11,
+) -> tuple[int, tuple[Fraction, ...] | None]:
+    """
+    Sign (-1, 0 or 1) of the supremum of `objective . x + constant` over the
+    closure of the polyhedron defined by `constraints`, -1 if it is empty,
+    with a point of the closure where the objective is >= 0 (resp. > 0) when
+    the sign is 0 (resp. 1), if any.
+    The primal and dual LPs are first solved in floating point: a rounded
+    primal point with a positive objective proves the sign 1, and a rounded
+    feasible dual solution bounds the supremum, by weak duality, proving the
+    sign -1 if negative, or 0 if zero and attained by the primal point. Only
+    otherwise the LP is solved again exactly, see `maximize`.
+    """
+    n = len(objective)
+    closure = [(a, "==" if rel == "==" else "<=", b) for a, rel, b in constraints]
+
+    def value(point: Sequence[Fraction]) -> Fraction:
+        return sum((c * x for c, x in zip(objective, point) if c != 0), constant)
+
+    (primal,) = maximize_all([objective], closure, n, 1e-9)
+    if primal.status == "optimal" and len(closure) > 0:
+        point = tuple(rationalize(x, tolerance) for x in primal.point)
+        if not all(satisfies(constraint, point) for constraint in closure):
+            point = None
+        elif value(point) > 0:
+            return 1, point
+
+        # Dual: minimize b . y subject to a^T y == objective, y >= 0 on the
+        # inequalities
+        m = len(closure)
+        dual_constraints: list[LinearConstraint] = [
+            ([a[j] for a, _, _ in closure], "==", objective[j]) for j in range(n)
+        ]
+        dual_constraints.extend(
+            ([Fraction(-int(k == i)) for k in range(m)], "<=", Fraction(0))
+            for i, (_, rel, _) in enumerate(closure)
+            if rel != "=="
+        )
+        (dual,) = maximize_all([[-b for _, _, b in closure]], dual_constraints, m, 1e-9)
+        if dual.status == "optimal":
+            # Exact solution of the equalities on the support of the float
+            # dual solution
+            support = [i for i, y_i in enumerate(dual.point) if y_i != 0]
+            y_support = _solve_linear(
+                [[closure[i][0][j] for i in support] for j in range(n)], objective
+            )
+            y = [Fraction(0)] * m
+            for i, y_i in zip(support, y_support or ()):
+                y[i] = y_i
+            if y_support is not None and all(
+                satisfies(constraint, y) for constraint in dual_constraints
+            ):
+                bound = sum((y_i * b for y_i, (_, _, b) in zip(y, closure)), constant)
+                if bound < 0:
+                    return -1, None
+                if bound == 0 and point is not None and value(point) == 0:
+                    return 0, point
+
+    result = maximize(objective, closure)
+    match result.status:
+        case "infeasible":
+            return -1, None
+        case "unbounded":
+            return 1, None
+    sup = result.value + constant
+    return (sup > 0) - (sup < 0), None if sup < 0 else result.point
@@ -1,17 +1,21 @@
+from collections.abc import Mapping
 from itertools import chain
 
-from sympy import Matrix, Symbol
+from sympy import Expr, Matrix, Symbol
 from sympy.logic.boolalg import Boolean
 
 from z3 import BoolRef, Solver
 
 from utils import SPLinearFunction, snd
 
-
 ProgramVariables = tuple[Symbol, ...]
 ProgramState = tuple[float, ...]
 Guard = Boolean
-Update = SPLinearFunction
+# Sparse update: affine expressions of the new values of some of the
+# variables, e.g. `{q: 1, x: x + 1}`, leaving the others unchanged
+Assignment = Mapping[Symbol, Expr | float]
+# Dense update `(a, b)` such that X' = a*X + b, or sparse update
+Update = SPLinearFunction | Assignment
 ProbabilisticUpdate = tuple[float, Update]
 StochasticUpdate = list[ProbabilisticUpdate]
 NonDeterministicStochasticUpdate = list[StochasticUpdate]
@@ -24,11 +28,15 @@ class ReactiveModule:
         init: list[ProgramState],
         vars: ProgramVariables,
         body: list[GuardedCommand],
+        dpa_var: Symbol = Symbol("q"),
     ):
         """
         Assume guards mutually exclusive and given as conjunction of inequalities/equalities
         guard = A*X ~ b
-        update = A,b such that X' = A*X + b
+        update = A,b such that X' = A*X + b, or the assignment of the updated
+        variables
+        dpa_var = variable of the finite-domain DPA state, one of `vars`
+        assigned a constant by every update
         """
         # FIXME: Guards not in DNF form
         # assert len(init) == len(vars)
@@ -36,6 +44,7 @@ class ReactiveModule:
         self._init = init
         self._vars = vars
         self._body = body
+        self._dpa_var = dpa_var
 
     @property
     def init(self) -> list[ProgramState]:
@@ -45,6 +54,10 @@ class ReactiveModule:
     def vars(self) -> ProgramVariables:
         return self._vars
 
+    @property
+    def dpa_var(self) -> Symbol:
+        return self._dpa_var
+
     @property
     def body(self):
         return self._body
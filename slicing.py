@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from itertools import chain
+
+from sympy import Expr, Rational
+from sympy.logic.boolalg import Boolean
+
+from compiled_module import AffineMap, CompiledModule, compile_module
+from reactive_module import Assignment, GuardedCommand, ReactiveModule
+from utils import LinearFunction
+
+# Parity objective, see `parity_supermartingale.ParityObjective`
+ParityObjective = Boolean
+
+
+@dataclass(frozen=True)
+class Slice:
+    """
+    Projection `system` of a reactive module of `n` variables onto the
+    variables of index in `kept`, in increasing order
+    """
+
+    system: ReactiveModule
+    kept: tuple[int, ...]
+    n: int
+
+    def lift(self, f: LinearFunction) -> LinearFunction:
+        """
+        Linear function `f` over the variables of `system` as a function over
+        all the variables, with zero coefficients for the sliced ones
+        """
+        a, b = f
+        lifted = []
+        for a_i in a:
+            row = [0.0] * self.n
+            for j, a_ij in zip(self.kept, a_i):
+                row[j] = a_ij
+            lifted.append(row)
+        return lifted, b
+
+    def lift_lex_psm(
+        self, lex_psm: list[dict[int, LinearFunction]]
+    ) -> list[dict[int, LinearFunction]]:
+        return [{q: self.lift(psm) for q, psm in level.items()} for level in lex_psm]
+
+    def lift_invariant(
+        self, invariant: dict[int, LinearFunction]
+    ) -> dict[int, LinearFunction]:
+        return {q: self.lift(inv) for q, inv in invariant.items()}
+
+
+def cone_of_influence(
+    system: ReactiveModule,
+    objectives: list[ParityObjective],
+    module: CompiledModule,
+) -> tuple[int, ...]:
+    """
+    Indices of the variables of `system` occurring in a guard or an objective,
+    of its DPA state and of the variables their updates depend on, recursively.
+    `module` is the compiled `system`.
+    """
+    index = {var: j for j, var in enumerate(system.vars)}
+    relevant = {module.dpa_index}
+    for guard in chain(system.guards, objectives):
+        relevant.update(index[var] for var in guard.free_symbols if var in index)
+
+    updates = [
+        update
+        for command in module.commands
+        for action in command.actions
+        for _, update in action.distribution
+    ]
+    pending = list(relevant)
+    while len(pending) > 0:
+        i = pending.pop()
+        for update in updates:
+            for j, _ in update.a[i]:
+                if j not in relevant:
+                    relevant.add(j)
+                    pending.append(j)
+    return tuple(sorted(relevant))
+
+
+def slice_module(
+    system: ReactiveModule,
+    objectives: list[ParityObjective],
+    module: CompiledModule | None = None,
+) -> Slice:
+    """
+    Projection of `system` onto the cone of influence of its guards and of
+    the `objectives`, see `cone_of_influence`. The other variables affect
+    neither the enabled commands nor the objectives, hence a certificate of
+    the projection lifted by `Slice.lift` is a certificate of `system`.
+    """
+    module = compile_module(system) if module is None else module
+    kept = cone_of_influence(system, objectives, module)
+
+    def project(update: AffineMap) -> Assignment:
+        return {
+            system.vars[i]: sum(
+                (_rational(a_ij) * system.vars[j] for j, a_ij in update.a[i]),
+                _rational(update.b[i]),
+            )
+            for i in kept
+        }
+
+    body: list[GuardedCommand] = [
+        (
+            guard,
+            [
+                [
+                    (p, project(update))
+                    for (p, _), (_, update) in zip(action, compiled.distribution)
+                ]
+                for action, compiled in zip(actions, command.actions)
+            ],
+        )
+        for (guard, actions), command in zip(system.body, module.commands)
+    ]
+    return Slice(
+        ReactiveModule(
+            [tuple(x[j] for j in kept) for x in system.init],
+            tuple(system.vars[j] for j in kept),
+            body,
+            system.dpa_var,
+        ),
+        kept,
+        len(system.vars),
+    )
+
+
+def _rational(x: Fraction) -> Expr:
+    return Rational(x.numerator, x.denominator)
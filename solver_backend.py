@@ -0,0 +1,337 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from fractions import Fraction
+from typing import Literal
+
+from z3 import (
+    BoolRef,
+    Context,
+    ExprRef,
+    ModelRef,
+    Optimize,
+    RealVal,
+    Solver,
+    simplify,
+    substitute,
+    unsat,
+)
+
+import rational_lp
+from linear_terms import (
+    Constraint,
+    LinearTerm,
+    TermConstraint,
+    is_variable,
+    to_z3_constraints,
+    to_z3_term,
+)
+from rational_lp import LinearConstraint, LPResult, Relation, rationalize, satisfies
+from telemetry import solver_statistics
+
+BackendName = Literal["z3", "rational", "float"]
+
+# Constraint `a x ~ b` with the coefficients `a` by variable name
+_Row = tuple[dict[str, Fraction], Relation, Fraction]
+
+
+class RationalModel:
+    def __init__(self, values: dict[str, Fraction], ctx: Context) -> None:
+        """
+        Assignment of the variables found by `RationalBackend`, evaluating
+        terms to z3 values like a `z3.ModelRef`. Variables not assigned are 0.
+        """
+        self.values = values
+        self._ctx = ctx
+
+    def eval(self, e: ExprRef, model_completion: bool = False) -> ExprRef:
+        substitution = [
+            (var, RealVal(str(self.values.get(var.decl().name(), 0)), self._ctx))
+            for var in _consts(e)
+        ]
+        return simplify(substitute(e, *substitution))
+
+
+Model = ModelRef | RationalModel
+
+
+class Backend(ABC):
+    """
+    Solver of a conjunction of constraints, optionally maximizing an objective.
+    Constraints are z3 terms or linear `TermConstraint`s and objectives linear
+    terms, scoped by `push` and `pop`.
+    """
+
+    @abstractmethod
+    def add(self, constraints: Constraint | Iterable[Constraint]) -> None: ...
+
+    @abstractmethod
+    def add_soft(self, constraint: BoolRef) -> None:
+        """
+        Constraint to satisfy in as many as possible, MaxSMT style
+        """
+
+    @abstractmethod
+    def maximize(self, objective: LinearTerm) -> None: ...
+
+    @abstractmethod
+    def push(self) -> None: ...
+
+    @abstractmethod
+    def pop(self) -> None: ...
+
+    @abstractmethod
+    def check(self, *assumptions: BoolRef) -> bool:
+        """
+        Whether the constraints are satisfiable under `assumptions`
+        """
+
+    @abstractmethod
+    def model(self) -> Model:
+        """
+        Solution of the last successful `check`, optimal w.r.t. the objective
+        """
+
+    @abstractmethod
+    def statistics(self) -> dict[str, int | float]: ...
+
+
+class Z3Backend(Backend):
+    def __init__(self, solver: Solver | Optimize) -> None:
+        """
+        Backend of a z3 `solver`: soft constraints and objectives need a
+        `z3.Optimize`
+        """
+        self.solver = solver
+
+    def add(self, constraints: Constraint | Iterable[Constraint]) -> None:
+        if isinstance(constraints, (BoolRef, TermConstraint)):
+            constraints = [constraints]
+        self.solver.add(to_z3_constraints(constraints, self.solver.ctx))
+
+    def add_soft(self, constraint: BoolRef) -> None:
+        self.solver.add_soft(constraint)
+
+    def maximize(self, objective: LinearTerm) -> None:
+        self.solver.maximize(to_z3_term(objective, self.solver.ctx))
+
+    def push(self) -> None:
+        self.solver.push()
+
+    def pop(self) -> None:
+        self.solver.pop()
+
+    def check(self, *assumptions: BoolRef) -> bool:
+        return self.solver.check(*assumptions) != unsat
+
+    def model(self) -> ModelRef:
+        return self.solver.model()
+
+    def statistics(self) -> dict[str, int | float]:
+        return solver_statistics(self.solver)
+
+
+class RationalBackend(Backend):
+    def __init__(self, ctx: Context) -> None:
+        """
+        Backend of linear constraints over the reals solved by the exact
+        rational simplex of `rational_lp`, without z3. The constraints must be
+        `TermConstraint`s over variables of the z3 context `ctx`: z3
+        constraints, soft constraints and assumptions are not supported.
+        """
+        self._ctx = ctx
+        self._rows: list[_Row] = []
+        self._objective: dict[str, Fraction] = {}
+        self._scopes: list[tuple[int, dict[str, Fraction]]] = []
+        self._model: RationalModel | None = None
+        self._lps = 0
+
+    def add(self, constraints: Constraint | Iterable[Constraint]) -> None:
+        if isinstance(constraints, (BoolRef, TermConstraint)):
+            constraints = [constraints]
+        for constraint in constraints:
+            if not isinstance(constraint, TermConstraint):
+                raise ValueError(
+                    f"non-linear constraint {constraint} for the rational backend"
+                )
+            term = constraint.term
+            self._rows.append(
+                (_coefficients(term), constraint.rel, -term.constant),
+            )
+
+    def add_soft(self, constraint: BoolRef) -> None:
+        raise ValueError("soft constraints are not supported by the rational backend")
+
+    def maximize(self, objective: LinearTerm) -> None:
+        self._objective = _coefficients(objective)
+
+    def push(self) -> None:
+        self._scopes.append((len(self._rows), self._objective))
+
+    def pop(self) -> None:
+        size, self._objective = self._scopes.pop()
+        del self._rows[size:]
+
+    def check(self, *assumptions: BoolRef) -> bool:
+        if len(assumptions) > 0:
+            raise ValueError("assumptions are not supported by the rational backend")
+
+        names = sorted(
+            set(self._objective).union(*(a for a, _, _ in self._rows)),
+        )
+        index = {name: j for j, name in enumerate(names)}
+        n = len(names)
+
+        def dense(a: dict[str, Fraction]) -> list[Fraction]:
+            row = [Fraction(0)] * n
+            for name, coeff in a.items():
+                row[index[name]] = coeff
+            return row
+
+        objective = dense(self._objective)
+        rows: list[LinearConstraint] = [(dense(a), rel, b) for a, rel, b in self._rows]
+        point = self._solve(objective, rows, n)
+        if point is None:
+            self._model = None
+            return False
+        self._model = RationalModel(dict(zip(names, point)), self._ctx)
+        return True
+
+    def _solve(
+        self,
+        objective: list[Fraction],
+        rows: list[LinearConstraint],
+        n: int,
+        maximize: Callable[
+            [Sequence[Fraction], Sequence[LinearConstraint]], LPResult
+        ] = rational_lp.maximize,
+    ) -> tuple[Fraction, ...] | None:
+        """
+        Point satisfying `rows` maximizing `objective`, None if there is none.
+        If the maximum is only a supremum because of strict inequalities, the
+        point is as close to it as the strict inequalities allow.
+        Each LP is solved by `maximize`.
+        """
+        self._lps += 1
+        result = maximize(objective, rows)
+        if result.status == "infeasible":
+            return None
+        if result.status == "unbounded":
+            # There is no optimum, any point will do
+            objective = [Fraction(0)] * n
+            result = maximize(objective, rows)
+        if all(rel != "<" for _, rel, _ in rows):
+            return result.point
+
+        # Maximize the slack t <= 1 of the strict inequalities over the points
+        # whose objective is at least half its supremum if positive, at least
+        # its supremum minus 1 otherwise: t > 0 if and only if the strict
+        # inequalities can be satisfied, as the supremum over them is the one
+        # over the closure. The margin of the objective does not depend on t,
+        # which may have to shrink faster than the objective.
+        self._lps += 1
+        t = [Fraction(0)] * n + [Fraction(1)]
+        slack_rows: list[LinearConstraint] = [
+            ([*a, Fraction(int(rel == "<"))], "<=" if rel == "<" else rel, b)
+            for a, rel, b in rows
+        ]
+        slack_rows.append((t, "<=", Fraction(1)))
+        lower = result.value / 2 if result.value > 0 else result.value - 1
+        slack_rows.append(([-c for c in objective] + [Fraction(0)], "<=", -lower))
+        slack_result = maximize(t, slack_rows)
+        if slack_result.status != "optimal" or slack_result.value <= 0:
+            return None
+        return slack_result.point[:n]
+
+    def model(self) -> RationalModel:
+        if self._model is None:
+            raise ValueError("no model, the last check was not satisfiable")
+        return self._model
+
+    def statistics(self) -> dict[str, int | float]:
+        return {"lps": self._lps, "rows": len(self._rows)}
+
+
+class FloatFirstBackend(RationalBackend):
+    def __init__(self, ctx: Context, tolerance: float = 1e-11) -> None:
+        """
+        Same as `RationalBackend`, but the constraints are first solved in
+        floating point, see `rational_lp.maximize_float`. Each value of the
+        float solution is rounded to the simplest rational within `tolerance`
+        of it, relative to its magnitude, and the solution is returned if it
+        satisfies the constraints exactly: only otherwise they are solved again
+        with exact arithmetic.
+        """
+        super().__init__(ctx)
+        self.tolerance = tolerance
+        self._float_solutions = 0
+        self._exact_fallbacks = 0
+
+    def _solve(
+        self,
+        objective: list[Fraction],
+        rows: list[LinearConstraint],
+        n: int,
+        maximize: Callable[
+            [Sequence[Fraction], Sequence[LinearConstraint]], LPResult
+        ] = rational_lp.maximize_float,
+    ) -> tuple[Fraction, ...] | None:
+        point = super()._solve(objective, rows, n, maximize)
+        if point is not None:
+            rounded = tuple(rationalize(x, self.tolerance) for x in point)
+            if all(satisfies(row, rounded) for row in rows):
+                self._float_solutions += 1
+                return rounded
+
+        # Infeasibility in floating point is not conclusive either
+        self._exact_fallbacks += 1
+        return super()._solve(objective, rows, n)
+
+    def statistics(self) -> dict[str, int | float]:
+        return super().statistics() | {
+            "float_solutions": self._float_solutions,
+            "exact_fallbacks": self._exact_fallbacks,
+        }
+
+
+def new_backend(name: BackendName, ctx: Context) -> Backend:
+    """
+    Backend `name` for the linear queries of the synthesis, in the z3 context
+    `ctx`: z3 `Optimize` with `z3`, the exact rational simplex with `rational`
+    and the float simplex validated exactly with `float`
+    """
+    match name:
+        case "z3":
+            return Z3Backend(Optimize(ctx=ctx))
+        case "rational":
+            return RationalBackend(ctx)
+        case "float":
+            return FloatFirstBackend(ctx)
+
+
+def _consts(e: ExprRef) -> list[ExprRef]:
+    """
+    Variables of the term `e`
+    """
+    consts: dict[int, ExprRef] = {}
+    visited: set[int] = set()
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        if e.get_id() in visited:
+            continue
+        visited.add(e.get_id())
+        if is_variable(e):
+            consts[e.get_id()] = e
+        stack.extend(e.children())
+    return list(consts.values())
+
+
+def _coefficients(term: LinearTerm) -> dict[str, Fraction]:
+    """
+    Coefficients of the variables of `term`, by name
+    """
+    a: dict[str, Fraction] = {}
+    for coeff, var in term.coeffs:
+        name = var.decl().name()
+        a[name] = a.get(name, Fraction(0)) + coeff
+    return a
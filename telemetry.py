@@ -0,0 +1,110 @@
+import json
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import IO, Literal
+
+from z3 import Optimize, Solver
+
+Phase = Literal["parsing", "invariants", "pruning", "encoding", "solving", "extraction"]
+
+
+@dataclass
+class PhaseRecord:
+    """
+    Measurements of one phase of a synthesis. `constraints`, `multipliers`
+    and `premises_pruned` count the Farkas constraints, the Farkas multiplier
+    variables and the unsatisfiable premises skipped during the phase.
+    """
+
+    phase: Phase
+    # Where the phase happened, e.g. engine, DPA state and level of the LPSM
+    labels: dict[str, str | int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    constraints: int = 0
+    multipliers: int = 0
+    premises_pruned: int = 0
+    solver_statistics: dict[str, int | float] = field(default_factory=dict)
+
+
+Observer = Callable[[PhaseRecord], None]
+
+# Keys of the encoding counters backing the fields of `PhaseRecord`
+_COUNTERS = {
+    "constraints": "farkas_constraints",
+    "multipliers": "multipliers",
+    "premises_pruned": "premises_pruned",
+}
+
+
+class Telemetry:
+    def __init__(self, observers: Iterable[Observer] = ()) -> None:
+        """
+        Notifies `observers` of the `PhaseRecord` of every phase, see `phase`
+        """
+        self._observers = list(observers)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self._observers) > 0
+
+    def subscribe(self, observer: Observer) -> None:
+        self._observers.append(observer)
+
+    def notify(self, record: PhaseRecord) -> None:
+        for observer in self._observers:
+            observer(record)
+
+    @contextmanager
+    def phase(
+        self, phase: Phase, counters: dict[str, int], **labels: str | int
+    ) -> Iterator[PhaseRecord]:
+        """
+        Time the enclosed block as `phase`, counting the increase of the
+        encoding `counters` over it. The yielded record can be completed by
+        the block, e.g. with the statistics of its solver. Without observers
+        the record is left empty.
+        """
+        record = PhaseRecord(phase, labels)
+        if not self.enabled:
+            yield record
+            return
+        start = {key: counters.get(key, 0) for key in _COUNTERS.values()}
+        start_time = perf_counter()
+        try:
+            yield record
+        finally:
+            record.elapsed = perf_counter() - start_time
+            for attr, key in _COUNTERS.items():
+                setattr(record, attr, counters.get(key, 0) - start[key])
+            self.notify(record)
+
+
+def solver_statistics(solver: Solver | Optimize) -> dict[str, int | float]:
+    statistics = solver.statistics()
+    return {key: statistics.get_key_value(key) for key in statistics.keys()}
+
+
+class JSONLinesSink:
+    def __init__(self, file: str | IO[str]) -> None:
+        """
+        Observer writing every `PhaseRecord` as a JSON line to `file`, either
+        a path, opened in append mode, or an open text stream
+        """
+        self._owned = isinstance(file, str)
+        self._file: IO[str] = open(file, "a") if isinstance(file, str) else file
+
+    def __call__(self, record: PhaseRecord) -> None:
+        self._file.write(json.dumps(asdict(record)) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+
+    def __enter__(self) -> "JSONLinesSink":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
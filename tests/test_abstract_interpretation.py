@@ -0,0 +1,132 @@
+from fractions import Fraction
+from random import Random
+
+import pytest
+
+import rational_lp
+from abstract_interpretation import interval_invariants
+from benchmarks.families import counters, dpa_priorities, non_det_counter, random_walk
+from certificate_checker import check_certificate
+from compiled_module import AffineMap, compile_module, sample_states
+from parity_supermartingale import ParitySupermartingale
+
+BENCHMARKS = [
+    counters(16, 2),
+    dpa_priorities(3),
+    non_det_counter(2, 16),
+    random_walk(2),
+]
+
+
+def _compose(a: tuple[Fraction, ...], update: AffineMap) -> tuple[list, Fraction]:
+    """
+    x -> a . update(x), as coefficients and constant
+    """
+    coeffs = [Fraction(0)] * len(a)
+    for a_k, row in zip(a, update.a):
+        for j, u_kj in row:
+            coeffs[j] += a_k * u_kj
+    return coeffs, sum((a_k * b_k for a_k, b_k in zip(a, update.b)), Fraction(0))
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS)
+def test_contains_the_reachable_states(benchmark):
+    module = compile_module(benchmark.system)
+    invariants = interval_invariants(module, benchmark.q_states)
+    for x in sample_states(module, 500, Random(0)):
+        q = int(x[module.dpa_index])
+        assert invariants[q].contains(x)
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS)
+def test_is_inductive(benchmark):
+    module = compile_module(benchmark.system)
+    q_states = benchmark.q_states
+    invariants = interval_invariants(module, q_states)
+    unit = [Fraction(int(j == module.dpa_index)) for j in range(len(module.vars))]
+
+    for x in module.init:
+        assert invariants[int(x[module.dpa_index])].contains(x)
+    for q in q_states:
+        state = invariants[q].closure().rows() + module.dpa_state(q).closure().rows()
+        for command in module.commands:
+            for conjunct in command.guard:
+                premise = state + conjunct.closure().rows()
+                for action in command.actions:
+                    for _, update in action.distribution:
+                        # Successors in each DPA state
+                        q_coeffs, q_constant = _compose(unit, update)
+                        for successor in q_states:
+                            post = premise + [
+                                (q_coeffs, "==", Fraction(successor) - q_constant)
+                            ]
+                            target = invariants[successor]
+                            for a_i, b_i in zip(target.a, target.b):
+                                coeffs, constant = _compose(a_i, update)
+                                result = rational_lp.maximize(coeffs, post)
+                                assert result.status != "unbounded"
+                                if result.status == "optimal":
+                                    assert result.value + constant <= b_i
+
+
+def test_widens_to_the_guard_thresholds():
+    # The walk decreases below the guards `x_j > 0` by one step: widening to
+    # infinity loses these lower bounds, and narrowing cannot recover them
+    benchmark = random_walk(2)
+    module = compile_module(benchmark.system)
+    invariant = interval_invariants(module, benchmark.q_states)[1]
+    for j in range(len(module.vars)):
+        if j != module.dpa_index:
+            x = [Fraction(0)] * len(module.vars)
+            x[module.dpa_index] = Fraction(1)
+            x[j] = Fraction(-1)
+            assert invariant.contains(tuple(x))
+            x[j] = Fraction(-2)
+            assert not invariant.contains(tuple(x))
+
+
+def test_interval_invariant_synthesis():
+    benchmark = random_walk(2)
+    psm = ParitySupermartingale(benchmark.system)
+    certificate = psm.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, invariants="intervals"
+    )
+    assert (
+        check_certificate(
+            benchmark.system, benchmark.objectives, benchmark.q_states, *certificate
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize("slicing", [False, True])
+def test_restricted_verification(slicing):
+    benchmark = counters(16, 2)
+    psm = ParitySupermartingale(benchmark.system)
+    lex_psm = psm.verification(
+        benchmark.q_states, benchmark.objectives, invariants=True, slicing=slicing
+    )
+    invariant = psm.verification_invariant
+    invariants = interval_invariants(
+        compile_module(benchmark.system), benchmark.q_states
+    )
+    assert invariant is not None
+    assert invariant.keys() == invariants.keys()
+    assert (
+        check_certificate(
+            benchmark.system,
+            benchmark.objectives,
+            benchmark.q_states,
+            lex_psm,
+            invariant,
+            engine="verification",
+        )
+        is None
+    )
+
+
+def test_unrestricted_verification_has_no_invariant():
+    benchmark = counters(16, 2)
+    psm = ParitySupermartingale(benchmark.system)
+    psm.verification(benchmark.q_states, benchmark.objectives)
+    assert psm.verification_invariant is None
@@ -0,0 +1,23 @@
+from benchmarks.run import compare, nondeterministic
+
+RUN = {"status": "ok", "wall_time": 1.0, "farkas_instances": 8, "multipliers": 20}
+
+
+def test_nondeterministic():
+    assert nondeterministic([RUN, RUN | {"wall_time": 2.0}]) == []
+    assert nondeterministic([RUN, RUN | {"multipliers": 21}]) == ["multipliers"]
+    assert nondeterministic([RUN, {"status": "timeout", "wall_time": 600}]) == [
+        "status",
+        "farkas_instances",
+        "multipliers",
+    ]
+
+
+def test_compare():
+    key = {"family": "counters", "params": {"counters": 1}, "engine": "verification"}
+    old = key | RUN | {"peak_rss_kib": 1000}
+    assert compare([old], [old]) == []
+    (regression,) = compare([old | {"farkas_instances": 9}], [old])
+    assert "farkas_instances 8 -> 9" in regression
+    (regression,) = compare([key | {"status": "error"}], [old])
+    assert "status ok -> error" in regression
@@ -0,0 +1,72 @@
+from fractions import Fraction
+
+import pytest
+from z3 import Context, Real
+
+from benchmarks.families import counters, dpa_priorities
+from bilinear import alternating_solve, bilinear_partners, minimize_slack
+from certificate_checker import check_certificate
+from parity_supermartingale import ParitySupermartingale
+from telemetry import PhaseRecord
+
+
+def test_bilinear_partners():
+    ctx = Context()
+    x, y, z, w = (Real(name, ctx) for name in "xyzw")
+    constraints = [x * y + z * w <= 1, 2 * (x * z) >= 0, y + w == 0]
+    assert [var.decl().name() for var in bilinear_partners(constraints, {"x"})] == [
+        "y",
+        "z",
+    ]
+    assert [
+        var.decl().name() for var in bilinear_partners(constraints, {"y", "w"})
+    ] == ["x", "z"]
+
+
+def test_minimize_slack_infeasible():
+    ctx = Context()
+    x, y, t = Real("x", ctx), Real("y", ctx), Real("t", ctx)
+    constraints = [x * y >= 1 - t, t >= 0, y <= 0]
+    assert minimize_slack(constraints, t, {"x": Fraction(-1)}, ctx) is not None
+    assert minimize_slack(constraints + [t <= 0], t, {"x": Fraction(1)}, ctx) is None
+
+
+def test_alternating_solve():
+    ctx = Context()
+    x, y, t = Real("x", ctx), Real("y", ctx), Real("t", ctx)
+    # x y == 6 up to the slack t, with y <= 3: x == 1 forces a second round
+    constraints = [
+        x * y <= 6 + t,
+        x * y >= 6 - t,
+        t >= 0,
+        x >= 0,
+        x <= 4,
+        y >= 0,
+        y <= 3,
+    ]
+    (solution,) = alternating_solve(constraints, t, [x], [{"x": Fraction(1)}], 4, ctx)
+    assert solution["t"] == 0
+    assert solution["x"] * solution["y"] == 6
+
+
+@pytest.mark.parametrize("benchmark", [counters(16, 1), dpa_priorities(2)])
+def test_alternating_strategy(benchmark):
+    records: list[PhaseRecord] = []
+    psm = ParitySupermartingale(benchmark.system, observers=[records.append])
+    lex_psm, invariant = psm.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, strategy="alternating"
+    )
+    # Solved without falling back to the monolithic query
+    assert [record.labels for record in records if record.phase == "solving"] == [
+        {"engine": "invariant_synthesis", "strategy": "alternating"}
+    ]
+    assert (
+        check_certificate(
+            benchmark.system,
+            benchmark.objectives,
+            benchmark.q_states,
+            lex_psm,
+            invariant,
+        )
+        is None
+    )
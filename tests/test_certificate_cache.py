@@ -0,0 +1,129 @@
+import json
+import os
+
+from benchmarks.families import counters
+from certificate_cache import CertificateCache
+from certificate_checker import check_certificate
+from parity_supermartingale import ParitySupermartingale
+
+BENCHMARK = counters(16, 1)
+
+
+def _verification(cache: CertificateCache, check_cached: bool = True):
+    psm = ParitySupermartingale(
+        BENCHMARK.system, certificate_cache=cache, check_cached=check_cached
+    )
+    lex_psm = psm.verification(BENCHMARK.q_states, BENCHMARK.objectives)
+    # Nothing is encoded on a cache hit
+    return lex_psm, psm.encoding_stats["farkas_constraints"] == 0
+
+
+def _entry(directory) -> str:
+    (name,) = [name for name in os.listdir(directory) if name.endswith(".json")]
+    return os.path.join(directory, name)
+
+
+def test_hit(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    lex_psm, hit = _verification(cache)
+    assert not hit
+    cached, hit = _verification(cache)
+    assert hit
+    assert cached == _verification(CertificateCache(str(tmp_path)), False)[0]
+    assert (
+        check_certificate(
+            BENCHMARK.system, BENCHMARK.objectives, BENCHMARK.q_states, cached
+        )
+        is None
+    )
+
+
+def test_corrupted_entry_is_synthesized_again(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    _verification(cache)
+    path = _entry(tmp_path)
+    with open(path) as f:
+        entry = json.load(f)
+    entry["certificate"]["lex_psm"][0]["0"][1][0][0] += 1
+    with open(path, "w") as f:
+        json.dump(entry, f)
+
+    lex_psm, hit = _verification(cache)
+    assert not hit
+    assert (
+        check_certificate(
+            BENCHMARK.system, BENCHMARK.objectives, BENCHMARK.q_states, lex_psm
+        )
+        is None
+    )
+    # The entry is overwritten by the new certificate
+    assert _verification(cache)[1]
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    _verification(cache)
+    path = _entry(tmp_path)
+    with open(path, "w") as f:
+        f.write("{")
+    assert cache.get(os.path.basename(path).removesuffix(".json")) is None
+    assert not _verification(cache)[1]
+
+
+def test_hit_rejects_an_invalid_certificate(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    _verification(cache)
+    key = os.path.basename(_entry(tmp_path)).removesuffix(".json")
+    certificate = cache.get(key)
+    # A well-formed entry with a certificate that is not valid for the system
+    for level in certificate["lex_psm"]:
+        for f in level.values():
+            f[0] = [[0.0] * len(row) for row in f[0]]
+            f[1] = [[0.0] for _ in f[1]]
+    cache.put(key, certificate)
+
+    # Only the digest is checked without `check_cached`
+    assert _verification(cache, check_cached=False)[1]
+    lex_psm, hit = _verification(cache)
+    assert not hit
+    assert (
+        check_certificate(
+            BENCHMARK.system, BENCHMARK.objectives, BENCHMARK.q_states, lex_psm
+        )
+        is None
+    )
+
+
+def test_hit_allocates_no_templates(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    psm = ParitySupermartingale(BENCHMARK.system, certificate_cache=cache)
+    psm.invariant_synthesis_and_verification(BENCHMARK.q_states, BENCHMARK.objectives)
+    psm = ParitySupermartingale(BENCHMARK.system, certificate_cache=cache)
+    variables = len(psm.context.var_map)
+    psm.invariant_synthesis_and_verification(BENCHMARK.q_states, BENCHMARK.objectives)
+    assert len(psm.context.var_map) == variables
+
+
+def test_hit_restores_the_verification_invariant(tmp_path):
+    cache = CertificateCache(str(tmp_path))
+    invariants = []
+    for _ in range(2):
+        psm = ParitySupermartingale(BENCHMARK.system, certificate_cache=cache)
+        lex_psm = psm.verification(
+            BENCHMARK.q_states, BENCHMARK.objectives, invariants=True
+        )
+        invariants.append(psm.verification_invariant)
+    assert psm.encoding_stats["farkas_constraints"] == 0
+    assert invariants[1] is not None
+    assert invariants[1] == invariants[0]
+    assert (
+        check_certificate(
+            BENCHMARK.system,
+            BENCHMARK.objectives,
+            BENCHMARK.q_states,
+            lex_psm,
+            invariants[1],
+            engine="verification",
+        )
+        is None
+    )
@@ -0,0 +1,104 @@
+from fractions import Fraction
+
+import pytest
+
+from benchmarks.families import dpa_priorities
+from certificate_checker import check_certificate
+from compiled_module import compile_module
+from parity_supermartingale import ParitySupermartingale
+from utils import to_fraction
+
+BENCHMARK = dpa_priorities(2)
+
+
+def _value(f, i, x) -> Fraction:
+    """
+    Row `i` of the linear function `f` at `x`, exactly
+    """
+    a, b = f
+    return sum(
+        (to_fraction(a_j) * x_j for a_j, x_j in zip(a[i], x)), to_fraction(b[i][0])
+    )
+
+
+def _check(lex_psm, invariant=None, workers=None):
+    return check_certificate(
+        BENCHMARK.system,
+        BENCHMARK.objectives,
+        BENCHMARK.q_states,
+        lex_psm,
+        invariant,
+        workers,
+    )
+
+
+@pytest.fixture(scope="module")
+def lex_psm():
+    psm = ParitySupermartingale(BENCHMARK.system)
+    return psm.verification(BENCHMARK.q_states, BENCHMARK.objectives)
+
+
+@pytest.fixture(scope="module")
+def certificate():
+    psm = ParitySupermartingale(BENCHMARK.system)
+    return psm.invariant_synthesis_and_verification(
+        BENCHMARK.q_states, BENCHMARK.objectives
+    )
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_accepts_synthesized_certificates(lex_psm, certificate, workers):
+    assert _check(lex_psm, workers=workers) is None
+    assert _check(*certificate, workers=workers) is None
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_rejects_negated_lpsm(lex_psm, workers):
+    tampered = [
+        {q: ([[-a_j for a_j in a[0]]], b) for q, (a, b) in level.items()}
+        for level in lex_psm
+    ]
+    violation = _check(tampered, workers=workers)
+    assert violation is not None
+    assert violation.condition == "drift"
+
+
+def test_rejects_swapped_dpa_states(lex_psm):
+    tampered = [{0: lex_psm[0][1], 1: lex_psm[0][0]}, *lex_psm[1:]]
+    assert _check(tampered) is not None
+
+
+def test_rejects_swapped_levels(certificate):
+    lex_psm, invariant = certificate
+    assert _check(lex_psm[::-1], invariant) is not None
+
+
+def test_rejects_negative_lpsm(certificate):
+    lex_psm, invariant = certificate
+    tampered = [
+        {q: (a, [[b[0][0] - 1]]) for q, (a, b) in level.items()} for level in lex_psm
+    ]
+    violation = _check(tampered, invariant)
+    assert violation is not None
+    assert violation.condition == "non_negativity"
+    # The witness satisfies the invariant but not the non-negativity
+    x = violation.witness
+    assert _value(tampered[violation.level][violation.q_state], 0, x) < 0
+    inv = invariant[violation.q_state]
+    assert all(_value(inv, i, x) <= 0 for i in range(len(inv[0])))
+
+
+def test_rejects_init_outside_its_invariant(certificate):
+    lex_psm, invariant = certificate
+    compiled = compile_module(BENCHMARK.system)
+    (init,) = compiled.init
+    q = int(init[compiled.dpa_index])
+    n = len(compiled.vars)
+    # The initial state is in the (full) invariants of the other DPA states,
+    # but not in the empty one of its own
+    tampered = {p: ([[0.0] * n], [[-1.0]]) for p in invariant}
+    tampered[q] = ([[0.0] * n], [[1.0]])
+    violation = _check(lex_psm, tampered)
+    assert violation is not None
+    assert violation.condition == "init"
+    assert violation.q_state == q
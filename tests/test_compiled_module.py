@@ -0,0 +1,136 @@
+from fractions import Fraction
+from random import Random
+
+import pytest
+from sympy import Matrix, Rational, Symbol, sympify
+
+from benchmarks.families import counters, dpa_priorities, non_det_counter, random_walk
+from compiled_module import AffineMap, compile_module, compile_update, sample_states
+from linear_terms import constant, fix
+
+x, y, z = Symbol("x"), Symbol("y"), Symbol("z")
+VARS = (x, y, z)
+
+
+def test_assignment_matches_the_dense_update():
+    # x' = 2 y + 1, z' = z - x / 2, y unchanged
+    sparse = compile_update({x: 2 * y + 1, z: z - x / 2}, VARS)
+    dense = compile_update(
+        (
+            Matrix([[0, 2, 0], [0, 1, 0], [Fraction(-1, 2), 0, 1]]),
+            Matrix([[1], [0], [0]]),
+        ),
+        VARS,
+    )
+    assert sparse == dense
+    assert sparse == AffineMap(
+        (
+            ((1, Fraction(2)),),
+            ((1, Fraction(1)),),
+            ((0, Fraction(-1, 2)), (2, Fraction(1))),
+        ),
+        (Fraction(1), Fraction(0), Fraction(0)),
+    )
+    assert sparse((Fraction(4), Fraction(3), Fraction(5))) == (7, 3, 3)
+
+
+def test_empty_assignment_is_the_identity():
+    identity = compile_update({}, VARS)
+    assert identity == compile_update((Matrix.eye(3), Matrix.zeros(3, 1)), VARS)
+    assert identity((Fraction(1), Fraction(2), Fraction(3))) == (1, 2, 3)
+
+
+def _sympy_update(update, vars, x) -> tuple:
+    # `update` applied to `x` by sympy
+    values = dict(zip(vars, x))
+    match update:
+        case (a, b):
+            return tuple(a * Matrix(x) + b)
+        case _:
+            return tuple(
+                sympify(update[var]).subs(values) if var in update else x_j
+                for var, x_j in zip(vars, x)
+            )
+
+
+def _states(module, rng: Random, samples: int = 200) -> list[tuple[Fraction, ...]]:
+    """
+    `samples` reachable states of `module`, and as many copies of them with a
+    variable moved by at most 2, to cross the guards
+    """
+    states = sample_states(module, samples, rng)
+    moved = []
+    for x in states:
+        j = rng.randrange(len(x))
+        moved.append(x[:j] + (x[j] + rng.randint(-2, 2),) + x[j + 1 :])
+    return states + moved
+
+
+@pytest.mark.parametrize(
+    "benchmark",
+    [counters(16, 2), random_walk(2), non_det_counter(2), dpa_priorities(3)],
+)
+def test_at_dpa_state_matches_the_dpa_state_conjunction(benchmark):
+    module = compile_module(benchmark.system)
+    q_index = module.dpa_index
+    rng = Random(0)
+    states = _states(module, rng)
+
+    for q in benchmark.q_states:
+        for command in module.commands:
+            for conjunct in command.guard:
+                substituted = module.at_dpa_state(conjunct, q)
+                conjunction = conjunct.intersect(module.dpa_state(q))
+                assert all(a_i[q_index] == 0 for a_i in substituted.a)
+                for x in states:
+                    at_q = x[:q_index] + (Fraction(q),) + x[q_index + 1 :]
+                    # The DPA state variable is ignored by the substituted guard
+                    assert substituted.contains(x) == conjunction.contains(at_q)
+
+                for action in command.actions:
+                    for _, update in action.distribution:
+                        # Consequence f(update(x)) <= 0 of a linear function f,
+                        # as c^T x <= d
+                        f = [Fraction(rng.randint(-3, 3)) for _ in module.vars]
+                        c = [
+                            sum((f[i] * a_ij for i, a_ij in column), Fraction(0))
+                            for column in update.columns
+                        ]
+                        d = -sum(f_i * b_i for f_i, b_i in zip(f, update.b))
+                        c_q, d_q = fix(
+                            list(map(constant, c)), constant(d), q_index, Fraction(q)
+                        )
+                        for x in states:
+                            at_q = x[:q_index] + (Fraction(q),) + x[q_index + 1 :]
+                            assert sum(
+                                c_j.constant * x_j for c_j, x_j in zip(c_q, x)
+                            ) - d_q.constant == sum(
+                                f_i * y_i for f_i, y_i in zip(f, update(at_q))
+                            )
+
+
+@pytest.mark.parametrize(
+    "benchmark",
+    [counters(16, 2), random_walk(2), non_det_counter(2), dpa_priorities(3)],
+)
+def test_compile_module_matches_the_sympy_module(benchmark):
+    system = benchmark.system
+    module = compile_module(system)
+    assert module.vars == tuple(system.vars)
+    assert module.init == tuple(tuple(map(Fraction, x)) for x in system.init)
+
+    for x in _states(module, Random(0), 50):
+        rational_x = tuple(map(Rational, x))
+        values = dict(zip(system.vars, rational_x))
+        for (guard, actions), command in zip(system.body, module.commands, strict=True):
+            assert bool(guard.subs(values)) == any(
+                conjunct.contains(x) for conjunct in command.guard
+            )
+            for action, compiled in zip(actions, command.actions, strict=True):
+                for (p, update), (compiled_p, compiled_update) in zip(
+                    action, compiled.distribution, strict=True
+                ):
+                    assert Fraction(repr(float(p))) == compiled_p
+                    assert _sympy_update(update, system.vars, rational_x) == tuple(
+                        map(Rational, compiled_update(x))
+                    )
@@ -0,0 +1,86 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+import rational_lp
+from compiled_module import CompiledPolyhedron
+from feasibility import FeasibilityCache, reduce_polyhedron
+
+
+def _random_polyhedron(rng: random.Random, n: int, m: int) -> CompiledPolyhedron:
+    a = [tuple(Fraction(rng.randint(-2, 2)) for _ in range(n)) for _ in range(m)]
+    # Scaled, duplicate and opposite rows
+    for _ in range(rng.randint(0, m)):
+        i = rng.randrange(len(a))
+        a.append(tuple(rng.choice([-1, 1, 2]) * a_ij for a_ij in a[i]))
+    b = [Fraction(rng.randint(-2, 6)) for _ in a]
+    return CompiledPolyhedron(tuple(a), tuple(b), tuple(rng.random() < 0.3 for _ in a))
+
+
+def _points(rng: random.Random, n: int) -> list[tuple[Fraction, ...]]:
+    # Points of a grid of half-integers, also on the boundaries of the rows
+    return [
+        tuple(Fraction(rng.randint(-8, 8), 2) for _ in range(n)) for _ in range(300)
+    ]
+
+
+@pytest.mark.parametrize("lp_max_rows", [0, 64])
+@pytest.mark.parametrize("seed", range(60))
+def test_reduce_polyhedron_preserves_the_closure(seed, lp_max_rows):
+    rng = random.Random(seed)
+    n = rng.randint(1, 3)
+    polyhedron = _random_polyhedron(rng, n, rng.randint(1, 6))
+    if not rational_lp.feasible(polyhedron.rows(), n):
+        return
+
+    reduced = reduce_polyhedron(polyhedron, lp_max_rows)
+    assert len(reduced) <= len(polyhedron)
+    assert rational_lp.feasible(reduced.rows(), n)
+    for _ in range(10):
+        objective = [Fraction(rng.randint(-3, 3)) for _ in range(n)]
+        expected = rational_lp.maximize(objective, polyhedron.rows())
+        result = rational_lp.maximize(objective, reduced.rows())
+        assert (result.status, result.value) == (expected.status, expected.value)
+    for x in _points(rng, n):
+        assert polyhedron.closure().contains(x) == reduced.closure().contains(x)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_reduce_polyhedron_keeps_the_strict_rows(seed):
+    # Without dropping the implied rows, the polyhedron itself is the same
+    rng = random.Random(seed)
+    n = rng.randint(1, 3)
+    polyhedron = _random_polyhedron(rng, n, rng.randint(1, 6))
+    reduced = reduce_polyhedron(polyhedron, 0)
+    for x in _points(rng, n):
+        assert polyhedron.contains(x) == reduced.contains(x)
+
+
+def test_reduce_polyhedron_drops_implied_rows():
+    one, zero = Fraction(1), Fraction(0)
+    # x <= 1, y <= 1, x + y <= 3 (implied), -x <= 0, x <= 1 (duplicate)
+    polyhedron = CompiledPolyhedron(
+        ((one, zero), (zero, one), (one, one), (-one, zero), (2 * one, zero)),
+        (one, one, 3 * one, zero, 2 * one),
+        (False,) * 5,
+    )
+    reduced = reduce_polyhedron(polyhedron)
+    assert set(zip(reduced.a, reduced.b)) == {
+        ((one, zero), one),
+        ((zero, one), one),
+        ((-one, zero), zero),
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_feasibility_cache(seed):
+    rng = random.Random(seed)
+    cache = FeasibilityCache(maxsize=8)
+    for _ in range(20):
+        n = rng.randint(1, 3)
+        polyhedron = _random_polyhedron(rng, n, rng.randint(1, 5))
+        feasible = rational_lp.feasible(polyhedron.rows(), n)
+        assert cache.is_feasible(polyhedron) == feasible
+        if feasible:
+            assert cache.reduce(polyhedron) == reduce_polyhedron(polyhedron)
@@ -0,0 +1,89 @@
+from contextlib import nullcontext
+
+import pytest
+
+from benchmarks.families import counters, dpa_priorities, non_det_counter, random_walk
+from certificate_checker import check_certificate
+from compiled_module import compile_module
+from parity_supermartingale import ParitySupermartingale
+from utils import to_fraction
+
+
+@pytest.mark.parametrize("benchmark", [counters(16, 1), dpa_priorities(2)])
+@pytest.mark.parametrize("invariants", ["template", "intervals"])
+def test_workers_generate_the_serial_constraints(benchmark, invariants):
+    serial = ParitySupermartingale(benchmark.system)
+    serial.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, invariants=invariants
+    )
+    parallel = ParitySupermartingale(benchmark.system)
+    lex_psm, invariant = parallel.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, workers=2, invariants=invariants
+    )
+
+    # Identical Farkas instances are only shared within a process
+    stats, parallel_stats = serial.encoding_stats, parallel.encoding_stats
+    assert (
+        stats["farkas_instances"] + stats["farkas_shared"]
+        == parallel_stats["farkas_instances"] + parallel_stats["farkas_shared"]
+    )
+    assert stats["premises_pruned"] == parallel_stats["premises_pruned"]
+    assert (
+        check_certificate(
+            benchmark.system,
+            benchmark.objectives,
+            benchmark.q_states,
+            lex_psm,
+            invariant,
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize(
+    "benchmark",
+    [counters(16, 2), random_walk(1), non_det_counter(2), dpa_priorities(3)],
+)
+@pytest.mark.parametrize("invariants", ["template", "intervals"])
+def test_init_in_the_invariant_of_its_dpa_state(benchmark, invariants):
+    psm = ParitySupermartingale(benchmark.system)
+    _, invariant = psm.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, invariants=invariants
+    )
+    module = compile_module(benchmark.system)
+    for init in module.init:
+        a, b = invariant[int(init[module.dpa_index])]
+        for a_i, (b_i,) in zip(a, b):
+            value = sum(to_fraction(a_ij) * x_j for a_ij, x_j in zip(a_i, init))
+            assert value + to_fraction(b_i) <= 0
+
+
+@pytest.mark.parametrize(
+    "benchmark", [counters(16, 1), non_det_counter(4), dpa_priorities(3)]
+)
+def test_sharing_farkas_instances(benchmark, monkeypatch):
+    def synthesize():
+        psm = ParitySupermartingale(benchmark.system)
+        certificate = psm.invariant_synthesis_and_verification(
+            benchmark.q_states, benchmark.objectives
+        )
+        violation = check_certificate(
+            benchmark.system, benchmark.objectives, benchmark.q_states, *certificate
+        )
+        return psm.encoding_stats, violation
+
+    shared, violation = synthesize()
+    monkeypatch.setattr(
+        ParitySupermartingale, "_shared_farkas", lambda self: nullcontext()
+    )
+    unshared, unshared_violation = synthesize()
+
+    assert violation is None
+    assert unshared_violation is None
+    assert shared["farkas_shared"] > 0
+    assert unshared["farkas_shared"] == 0
+    assert (
+        unshared["farkas_instances"]
+        == shared["farkas_instances"] + shared["farkas_shared"]
+    )
+    assert unshared["farkas_constraints"] > shared["farkas_constraints"]
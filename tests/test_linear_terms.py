@@ -0,0 +1,197 @@
+import random
+from fractions import Fraction
+
+import pytest
+from sympy import Rational, Symbol
+from z3 import Real, Solver, sat
+
+import rational_lp
+from linear_terms import (
+    LinearTerm,
+    combine,
+    constant,
+    eliminate_equalities,
+    farkas_constraints,
+    fix,
+    linear_farkas_constraints,
+    linear_term,
+    to_z3_constraints,
+    variable,
+)
+from utils import SynthesisContext, get_z3_var
+
+
+def _random_instance(rng: random.Random, n: int, m: int):
+    a = [[Fraction(rng.randint(-3, 3)) for _ in range(n)] for _ in range(m)]
+    b = [Fraction(rng.randint(-4, 4)) for _ in range(m)]
+    c = [Fraction(rng.randint(-3, 3)) for _ in range(n)]
+    return a, b, c, Fraction(rng.randint(-4, 4))
+
+
+def _implies(a, b, c, d) -> bool:
+    """
+    Whether `a x <= b => c^T x <= d`, for a satisfiable premise
+    """
+    result = rational_lp.maximize(c, [(a_i, "<=", b_i) for a_i, b_i in zip(a, b)])
+    return result.status == "optimal" and result.value <= d
+
+
+def _farkas(ctx: SynthesisContext, a, b, c, d, linear: bool = False) -> Solver:
+    z = [Real(f"z_{i}", ctx.z3) for i in range(len(b))]
+    solver = Solver(ctx=ctx.z3)
+    solver.add([z_i >= 0 for z_i in z])
+    if linear:
+        constraints = linear_farkas_constraints(a, b, c, d, z)
+        solver.add(to_z3_constraints(constraints, ctx.z3))
+    else:
+        solver.add(farkas_constraints(a, b, c, d, z, ctx.z3))
+    return solver
+
+
+def _var(name: str, ctx: SynthesisContext):
+    ctx.declare([Symbol(name)])
+    return get_z3_var(Symbol(name), ctx)
+
+
+def _terms(values):
+    return [constant(value) for value in values]
+
+
+def test_linear_term():
+    ctx = SynthesisContext()
+    x, y = Symbol("x"), Symbol("y")
+    ctx.declare([x, y])
+    term = linear_term(2 * x - Rational(1, 3) * y + 5, ctx)
+    assert term.constant == 5
+    assert {(c, v.decl().name()) for c, v in term.coeffs} == {
+        (Fraction(2), "x"),
+        (Fraction(-1, 3), "y"),
+    }
+    assert linear_term(x - x + 1, ctx) == constant(Fraction(1))
+    with pytest.raises(ValueError):
+        linear_term(x * y, ctx)
+
+
+def test_combine_and_fix():
+    ctx = SynthesisContext()
+    x, y = _var("x", ctx), _var("y", ctx)
+    term = combine(
+        [
+            (
+                Fraction(2),
+                combine([(Fraction(1), variable(x)), (Fraction(3), variable(y))]),
+            ),
+            (Fraction(-6), variable(y)),
+            (Fraction(1), constant(Fraction(4))),
+        ]
+    )
+    assert term == LinearTerm(((Fraction(2), x),), Fraction(4))
+    # x_1 := 2 in 3 x_0 + term x_1 <= 1
+    c, d = fix([constant(Fraction(3)), term], constant(Fraction(1)), 1, Fraction(2))
+    assert c == [constant(Fraction(3)), LinearTerm()]
+    assert d == LinearTerm(((Fraction(-4), x),), Fraction(-7))
+
+
+@pytest.mark.parametrize("linear", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_farkas_constraints_numeric(seed, linear):
+    rng = random.Random(seed)
+    a, b, c, d = _random_instance(rng, rng.randint(1, 3), rng.randint(1, 4))
+    premise = [(a_i, "<=", b_i) for a_i, b_i in zip(a, b)]
+    if not rational_lp.feasible(premise, len(c)):
+        return
+    result = rational_lp.maximize(c, premise)
+    if result.status == "optimal":
+        # Around the tightest valid consequence
+        d = result.value + rng.randint(-1, 1)
+
+    ctx = SynthesisContext()
+    solver = _farkas(
+        ctx, [_terms(a_i) for a_i in a], _terms(b), _terms(c), constant(d), linear
+    )
+    assert (solver.check() == sat) == _implies(a, b, c, d)
+
+
+@pytest.mark.parametrize("linear", [False, True])
+@pytest.mark.parametrize("seed", range(20))
+def test_farkas_constraints_template(seed, linear):
+    rng = random.Random(seed)
+    a, b, _, _ = _random_instance(rng, rng.randint(1, 3), rng.randint(1, 4))
+    premise = [(a_i, "<=", b_i) for a_i, b_i in zip(a, b)]
+    if not rational_lp.feasible(premise, len(a[0])):
+        return
+
+    # Unknown consequence c^T x <= d, and a fixed row of it
+    ctx = SynthesisContext()
+    c = [_var(f"c_{j}", ctx) for j in range(len(a[0]))]
+    d = _var("d", ctx)
+    solver = _farkas(
+        ctx,
+        [_terms(a_i) for a_i in a],
+        _terms(b),
+        list(map(variable, c)),
+        variable(d),
+        linear,
+    )
+    solver.add(c[0] == 1)
+    if solver.check() != sat:
+        # x_0 is not bounded from above on the premise
+        result = rational_lp.maximize(
+            [Fraction(int(j == 0)) for j in range(len(c))], premise
+        )
+        assert result.status == "unbounded"
+        return
+    model = solver.model()
+    values = [model.eval(c_j, model_completion=True).as_fraction() for c_j in c]
+    assert _implies(a, b, values, model.eval(d, model_completion=True).as_fraction())
+
+
+def _numbers(terms) -> list[Fraction]:
+    assert all(len(term.coeffs) == 0 for term in terms)
+    return [term.constant for term in terms]
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_eliminate_equalities(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 4)
+    a, b, c, d = _random_instance(rng, n, rng.randint(0, 3))
+    # Equalities as pairs of opposite rows, in any order
+    equalities = rng.randint(1, n)
+    for e, f in zip(*_random_instance(rng, n, equalities)[:2]):
+        a.extend([e, [-e_j for e_j in e]])
+        b.extend([f, -f])
+    rows = list(zip(a, b))
+    rng.shuffle(rows)
+    a, b = [a_i for a_i, _ in rows], [b_i for _, b_i in rows]
+    premise = [(a_i, "<=", b_i) for a_i, b_i in rows]
+    if not rational_lp.feasible(premise, n):
+        return
+    result = rational_lp.maximize(c, premise)
+    if result.status == "optimal":
+        d = result.value + rng.randint(-1, 1)
+
+    reduced_a, reduced_b, reduced_c, reduced_d = eliminate_equalities(
+        [_terms(a_i) for a_i in a], _terms(b), _terms(c), constant(d)
+    )
+    assert len(reduced_c) <= n
+    assert all(len(a_i) == len(reduced_c) for a_i in reduced_a)
+    # The premise stays feasible and the instance equivalent
+    reduced_premise = [
+        (_numbers(a_i), "<=", b_i) for a_i, b_i in zip(reduced_a, _numbers(reduced_b))
+    ]
+    assert rational_lp.feasible(reduced_premise, len(reduced_c))
+    (reduced_d,) = _numbers([reduced_d])
+    implies = _implies(a, b, c, d)
+    assert (
+        _implies(
+            [a_i for a_i, _, _ in reduced_premise],
+            [b_i for _, _, b_i in reduced_premise],
+            _numbers(reduced_c),
+            reduced_d,
+        )
+        == implies
+    )
+    ctx = SynthesisContext()
+    solver = _farkas(ctx, reduced_a, reduced_b, reduced_c, constant(reduced_d))
+    assert (solver.check() == sat) == implies
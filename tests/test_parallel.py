@@ -0,0 +1,30 @@
+import multiprocessing
+import time
+
+from parallel import process_pool, terminate
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_terminate_kills_the_running_workers():
+    pool = process_pool(2)
+    futures = [pool.submit(_sleep, 60) for _ in range(4)]
+    # Wait for the workers to pick the first tasks up
+    while not all(future.running() for future in futures[:2]):
+        time.sleep(0.01)
+    time.sleep(0.5)
+    start = time.perf_counter()
+    terminate(pool)
+    assert time.perf_counter() - start < 10
+    assert all(future.done() for future in futures)
+    assert multiprocessing.active_children() == []
+
+
+def test_terminate_an_idle_pool():
+    pool = process_pool(2)
+    assert pool.submit(_sleep, 0).result() == 0
+    terminate(pool)
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,180 @@
+import random
+from fractions import Fraction
+
+import pytest
+from z3 import (
+    Optimize,
+    Real,
+    RealVal,
+    Solver,
+    Sum,
+    is_int_value,
+    is_rational_value,
+    sat,
+    simplify,
+    unsat,
+)
+
+import rational_lp
+from rational_lp import LinearConstraint
+
+
+def _random_lp(
+    rng: random.Random, n: int, m: int, strict: bool
+) -> list[LinearConstraint]:
+    relations = ["<=", "<", "=="] if strict else ["<=", "<=", "=="]
+    return [
+        (
+            [Fraction(rng.randint(-3, 3)) for _ in range(n)],
+            rng.choice(relations),
+            Fraction(rng.randint(-4, 4)),
+        )
+        for _ in range(m)
+    ]
+
+
+def _z3_constraints(constraints: list[LinearConstraint], x, closure: bool = False):
+    result = []
+    for a, rel, b in constraints:
+        lhs = Sum([RealVal(a_j) * x_j for a_j, x_j in zip(a, x)] + [RealVal(0)])
+        match rel:
+            case "<=":
+                result.append(lhs <= RealVal(b))
+            case "<":
+                result.append(lhs <= RealVal(b) if closure else lhs < RealVal(b))
+            case "==":
+                result.append(lhs == RealVal(b))
+    return result
+
+
+def _z3_maximize(objective, constraints):
+    x = [Real(f"x_{j}") for j in range(len(objective))]
+    opt = Optimize()
+    opt.add(_z3_constraints(constraints, x, closure=True))
+    handle = opt.maximize(Sum([RealVal(c) * x_j for c, x_j in zip(objective, x)]))
+    if opt.check() == unsat:
+        return "infeasible", None
+    value = simplify(handle.value())
+    if is_int_value(value):
+        return "optimal", Fraction(value.as_long())
+    if is_rational_value(value):
+        return "optimal", value.as_fraction()
+    return "unbounded", None
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_maximize_agrees_with_z3(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 4)
+    constraints = _random_lp(rng, n, rng.randint(1, 6), strict=True)
+    objective = [Fraction(rng.randint(-3, 3)) for _ in range(n)]
+
+    result = rational_lp.maximize(objective, constraints)
+    status, value = _z3_maximize(objective, constraints)
+    assert result.status == status
+    if status == "optimal":
+        assert result.value == value
+        closure = [(a, "==" if rel == "==" else "<=", b) for a, rel, b in constraints]
+        assert all(rational_lp.satisfies(c, result.point) for c in closure)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_feasible_agrees_with_z3(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 4)
+    constraints = _random_lp(rng, n, rng.randint(1, 6), strict=True)
+
+    solver = Solver()
+    solver.add(_z3_constraints(constraints, [Real(f"x_{j}") for j in range(n)]))
+    assert rational_lp.feasible(constraints, n) == (solver.check() == sat)
+
+
+def test_feasible_strict_rows():
+    one = [Fraction(1)]
+    minus_one = [Fraction(-1)]
+    # x <= 0 and x > 0
+    assert not rational_lp.feasible(
+        [(one, "<=", Fraction(0)), (minus_one, "<", Fraction(0))], 1
+    )
+    # x < 1 and x > 0
+    assert rational_lp.feasible(
+        [(one, "<", Fraction(1)), (minus_one, "<", Fraction(0))], 1
+    )
+    # x == 0 and x < 0
+    assert not rational_lp.feasible(
+        [(one, "==", Fraction(0)), (one, "<", Fraction(0))], 1
+    )
+
+
+def test_maximize_over_closure():
+    # sup x subject to x < 1 is 1, attained on the closure
+    result = rational_lp.maximize([Fraction(1)], [([Fraction(1)], "<", Fraction(1))])
+    assert result.status == "optimal"
+    assert result.value == 1
+    assert result.point == (Fraction(1),)
+
+
+def _fractional_lp(rng: random.Random, n: int, m: int) -> list[LinearConstraint]:
+    # Coefficients with large denominators, as the ones of float certificates
+    return [
+        (
+            [Fraction(rng.randint(-3000, 3000), rng.randint(1, 999)) for _ in range(n)],
+            rng.choice(["<=", "<", "=="]),
+            Fraction(rng.randint(-4000, 4000), rng.randint(1, 999)),
+        )
+        for _ in range(m)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_feasible_float_first_agrees_with_feasible(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 4)
+    for constraints in (
+        _random_lp(rng, n, rng.randint(1, 6), strict=True),
+        _fractional_lp(rng, n, rng.randint(1, 6)),
+    ):
+        assert rational_lp.feasible_float_first(constraints, n) == rational_lp.feasible(
+            constraints, n
+        )
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_supremum_sign_agrees_with_maximize(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 4)
+    for constraints in (
+        _random_lp(rng, n, rng.randint(0, 6), strict=True),
+        _fractional_lp(rng, n, rng.randint(0, 6)),
+    ):
+        objective = [
+            Fraction(rng.randint(-30, 30), rng.randint(1, 9)) for _ in range(n)
+        ]
+        constant = Fraction(rng.randint(-30, 30), rng.randint(1, 9))
+
+        sign, point = rational_lp.supremum_sign(objective, constant, constraints)
+        result = rational_lp.maximize(objective, constraints)
+        match result.status:
+            case "infeasible":
+                assert sign == -1
+            case "unbounded":
+                assert sign == 1
+            case "optimal":
+                supremum = result.value + constant
+                assert sign == (supremum > 0) - (supremum < 0)
+        if point is not None:
+            closure = [
+                (a, "==" if rel == "==" else "<=", b) for a, rel, b in constraints
+            ]
+            assert all(rational_lp.satisfies(c, point) for c in closure)
+            value = sum(c * x for c, x in zip(objective, point)) + constant
+            assert value > 0 if sign == 1 else value >= 0
+
+
+def test_supremum_sign_zero():
+    # sup -x subject to x >= 0 is 0, attained at 0
+    sign, point = rational_lp.supremum_sign(
+        [Fraction(-1)], Fraction(0), [([Fraction(-1)], "<=", Fraction(0))]
+    )
+    assert sign == 0
+    assert point == (Fraction(0),)
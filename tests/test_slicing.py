@@ -0,0 +1,101 @@
+from random import Random
+
+import pytest
+from sympy import And, Eq, LessThan, Symbol
+
+from benchmarks.families import counters
+from certificate_checker import check_certificate
+from compiled_module import compile_module, sample_states
+from parity_supermartingale import ParitySupermartingale
+from reactive_module import ReactiveModule
+from slicing import slice_module
+
+# `counters` with the variables `x`, `y`, `steps` and `last`, only read by
+# their own updates: x' = y, y' = y + 1, steps' = steps + 1, last' = steps
+BENCHMARK = counters(16, 1)
+x, y, steps, last = Symbol("x"), Symbol("y"), Symbol("steps"), Symbol("last")
+
+
+def _extend(update):
+    return dict(update) | {x: y, y: y + 1, steps: steps + 1, last: steps}
+
+
+SYSTEM = ReactiveModule(
+    [(*state[:-1], 0, 0, 0, 0, state[-1]) for state in BENCHMARK.system.init],
+    (*BENCHMARK.system.vars[:-1], x, y, steps, last, BENCHMARK.system.vars[-1]),
+    [
+        (guard, [[(p, _extend(update)) for p, update in action] for action in actions])
+        for guard, actions in BENCHMARK.system.body
+    ],
+)
+
+
+def _kept(objectives) -> set[str]:
+    projection = slice_module(SYSTEM, objectives)
+    assert [var.name for var in projection.system.vars] == [
+        SYSTEM.vars[j].name for j in projection.kept
+    ]
+    return {var.name for var in projection.system.vars}
+
+
+def test_keeps_the_guards_and_the_objectives():
+    assert _kept(BENCHMARK.objectives) == {"ticking", "c_0", "q"}
+    q = Symbol("q")
+    # x depends on y through its update
+    objectives = [Eq(q, 0), And(Eq(q - 1, 0), LessThan(x, 5))]
+    assert _kept(objectives) == {"ticking", "c_0", "q", "x", "y"}
+    assert _kept([Eq(q, 0), LessThan(last, 5)]) == {
+        "ticking",
+        "c_0",
+        "q",
+        "steps",
+        "last",
+    }
+
+
+def test_projects_the_updates():
+    module = compile_module(SYSTEM)
+    projection = slice_module(SYSTEM, BENCHMARK.objectives, module)
+    sliced = compile_module(projection.system)
+
+    def project(state):
+        return tuple(state[j] for j in projection.kept)
+
+    for state in sample_states(module, 100, Random(0)):
+        for command, sliced_command in zip(module.commands, sliced.commands):
+            assert any(conjunct.contains(state) for conjunct in command.guard) == any(
+                conjunct.contains(project(state)) for conjunct in sliced_command.guard
+            )
+            for action, sliced_action in zip(command.actions, sliced_command.actions):
+                for (p, update), (sliced_p, sliced_update) in zip(
+                    action.distribution, sliced_action.distribution
+                ):
+                    assert p == sliced_p
+                    assert project(update(state)) == sliced_update(project(state))
+
+
+@pytest.mark.parametrize("invariants", [None, "template", "intervals"])
+def test_lifted_certificates(invariants):
+    psm = ParitySupermartingale(SYSTEM)
+    if invariants is None:
+        certificate = (
+            psm.verification(BENCHMARK.q_states, BENCHMARK.objectives, slicing=True),
+        )
+    else:
+        certificate = psm.invariant_synthesis_and_verification(
+            BENCHMARK.q_states,
+            BENCHMARK.objectives,
+            invariants=invariants,
+            slicing=True,
+        )
+    # The sliced variables have zero coefficients
+    lex_psm = certificate[0]
+    for level in lex_psm:
+        for (a,), _ in level.values():
+            assert a[2:6] == [0.0] * 4
+    assert (
+        check_certificate(
+            SYSTEM, BENCHMARK.objectives, BENCHMARK.q_states, *certificate
+        )
+        is None
+    )
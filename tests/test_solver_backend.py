@@ -0,0 +1,111 @@
+import random
+from fractions import Fraction
+
+import pytest
+from z3 import Context, Optimize, Real, is_true, sat
+
+from benchmarks.families import counters, dpa_priorities
+from certificate_checker import check_certificate
+from linear_terms import (
+    LinearTerm,
+    TermConstraint,
+    combine,
+    constant,
+    negate,
+    to_z3_constraints,
+    to_z3_term,
+    variable,
+)
+from parity_supermartingale import ParitySupermartingale
+from solver_backend import new_backend
+
+
+def _row(coeffs, x, rhs) -> LinearTerm:
+    """
+    `coeffs x - rhs`, for the constraint `coeffs x ~ rhs`
+    """
+    terms = [(Fraction(c), x_j) for c, x_j in zip(coeffs, x)]
+    return combine(terms + [(Fraction(1), constant(-rhs))])
+
+
+def _random_lp(rng: random.Random, ctx: Context, strict: bool):
+    n = rng.randint(1, 4)
+    x = [variable(Real(f"x_{j}", ctx)) for j in range(n)]
+    constraints = []
+    for _ in range(rng.randint(1, 6)):
+        term = _row([rng.randint(-3, 3) for _ in x], x, rng.randint(-4, 4))
+        match rng.choice(["<=", ">=", "==", "<"] if strict else ["<=", ">=", "=="]):
+            case ">=":
+                constraints.append(TermConstraint(negate(term), "<="))
+            case rel:
+                constraints.append(TermConstraint(term, rel))
+    # Bounded objective
+    for x_j in x:
+        constraints.append(TermConstraint(_row([1], [x_j], 10), "<="))
+        constraints.append(TermConstraint(_row([-1], [x_j], 10), "<="))
+    objective = _row([rng.randint(-3, 3) for _ in x], x, 0)
+    return constraints, objective
+
+
+@pytest.mark.parametrize("name", ["rational", "float"])
+@pytest.mark.parametrize("seed", range(30))
+def test_agrees_with_z3(name, seed):
+    rng = random.Random(seed)
+    ctx = Context()
+    constraints, objective = _random_lp(rng, ctx, strict=seed % 2 == 0)
+
+    opt = Optimize(ctx=ctx)
+    opt.add(to_z3_constraints(constraints, ctx))
+    handle = opt.maximize(to_z3_term(objective, ctx))
+    expected = opt.check() == sat
+
+    backend = new_backend(name, ctx)
+    backend.add(constraints)
+    backend.maximize(objective)
+    assert backend.check() == expected
+    if expected:
+        model = backend.model()
+        assert all(is_true(model.eval(c)) for c in to_z3_constraints(constraints, ctx))
+        if seed % 2 == 1:
+            # Without strict inequalities the optimum is attained
+            value = model.eval(to_z3_term(objective, ctx)).as_fraction()
+            assert value == Fraction(str(handle.value()))
+
+
+@pytest.mark.parametrize("name", ["rational", "float"])
+def test_push_pop(name):
+    ctx = Context()
+    x = Real("x", ctx)
+    backend = new_backend(name, ctx)
+    backend.add(TermConstraint(negate(variable(x)), "<="))
+    backend.maximize(negate(variable(x)))
+    backend.push()
+    backend.add(TermConstraint(variable(x), "<"))
+    assert not backend.check()
+    backend.pop()
+    assert backend.check()
+    assert backend.model().eval(x).as_fraction() == 0
+
+
+@pytest.mark.parametrize("name", ["rational", "float"])
+def test_rejects_z3_constraints(name):
+    ctx = Context()
+    x = Real("x", ctx)
+    backend = new_backend(name, ctx)
+    with pytest.raises(ValueError):
+        backend.add(x * x >= 0)
+
+
+@pytest.mark.parametrize("benchmark", [counters(16, 1), dpa_priorities(3)])
+@pytest.mark.parametrize("name", ["z3", "rational", "float"])
+def test_lp_ranking_verification(benchmark, name):
+    psm = ParitySupermartingale(benchmark.system)
+    lex_psm = psm.verification(
+        benchmark.q_states, benchmark.objectives, ranking="lp", backend=name
+    )
+    assert (
+        check_certificate(
+            benchmark.system, benchmark.objectives, benchmark.q_states, lex_psm
+        )
+        is None
+    )
@@ -0,0 +1,62 @@
+import io
+import json
+
+from benchmarks.families import counters
+from parity_supermartingale import ParitySupermartingale
+from telemetry import JSONLinesSink, PhaseRecord, Telemetry
+
+
+def test_records_every_phase():
+    benchmark = counters(16, 1)
+    records: list[PhaseRecord] = []
+    psm = ParitySupermartingale(benchmark.system, observers=[records.append])
+    psm.verification(benchmark.q_states, benchmark.objectives)
+
+    phases = {(record.phase, record.labels.get("q_state")) for record in records}
+    for q in benchmark.q_states:
+        for phase in ("pruning", "encoding", "solving", "extraction"):
+            assert (phase, q) in phases
+    assert all(record.elapsed >= 0 for record in records)
+    assert all(
+        len(record.solver_statistics) > 0
+        for record in records
+        if record.phase == "solving"
+    )
+    # The records count the whole encoding
+    stats = psm.encoding_stats
+    assert sum(record.constraints for record in records) == stats["farkas_constraints"]
+    assert sum(record.multipliers for record in records) == stats["multipliers"]
+    assert sum(record.premises_pruned for record in records) == stats["premises_pruned"]
+
+
+def test_measures_only_with_observers():
+    telemetry = Telemetry()
+    counters = {"farkas_constraints": 0}
+    with telemetry.phase("encoding", counters) as record:
+        counters["farkas_constraints"] += 3
+    assert record.constraints == 0
+
+    records: list[PhaseRecord] = []
+    telemetry.subscribe(records.append)
+    with telemetry.phase("encoding", counters) as record:
+        counters["farkas_constraints"] += 3
+    assert records == [record]
+    assert record.constraints == 3
+
+
+def test_json_lines_sink():
+    benchmark = counters(16, 1)
+    stream = io.StringIO()
+    records: list[PhaseRecord] = []
+    psm = ParitySupermartingale(
+        benchmark.system, observers=[records.append, JSONLinesSink(stream)]
+    )
+    psm.invariant_synthesis_and_verification(
+        benchmark.q_states, benchmark.objectives, invariants="intervals"
+    )
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["phase"] for line in lines] == [record.phase for record in records]
+    assert [line["constraints"] for line in lines] == [
+        record.constraints for record in records
+    ]
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sympy import Symbol
+from z3 import RealVal, simplify
+
+from benchmarks.families import dpa_priorities
+from parity_supermartingale import ParitySupermartingale
+from utils import SynthesisContext, to_z3_expr
+
+x, y = Symbol("x"), Symbol("y")
+
+
+def test_conversion_hits_and_misses():
+    ctx = SynthesisContext()
+    ctx.declare([x, y])
+    e = 2 * x + 3 * y + 1
+    term = to_z3_expr(e, ctx)
+    stats = ctx.conversion_stats
+    assert stats["hits"] == 0
+    assert stats["misses"] > 0
+    assert stats["size"] == stats["misses"]
+
+    # The whole expression is found in the cache, its sub-expressions are
+    # not visited again
+    assert to_z3_expr(e, ctx).eq(term)
+    assert ctx.conversion_stats == stats | {"hits": 1}
+    # A sub-expression converted with `e` is a hit too
+    to_z3_expr(2 * x, ctx)
+    assert ctx.conversion_stats == stats | {"hits": 2}
+
+
+def test_conversion_cache_evicts_the_least_recently_used():
+    ctx = SynthesisContext(conversion_cache_size=2)
+    a, b, c = x + 1, x + 2, x + 3
+    ctx.cache_conversion(a, RealVal(1, ctx.z3))
+    ctx.cache_conversion(b, RealVal(2, ctx.z3))
+    # `a` becomes the most recently used
+    assert ctx.cached_conversion(a) is not None
+    ctx.cache_conversion(c, RealVal(3, ctx.z3))
+    assert ctx.cached_conversion(b) is None
+    assert ctx.cached_conversion(a) is not None
+    assert ctx.cached_conversion(c) is not None
+    assert ctx.conversion_stats == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_conversion_with_a_small_cache():
+    ctx = SynthesisContext(conversion_cache_size=1)
+    ctx.declare([x, y])
+    reference = SynthesisContext()
+    reference.declare([x, y])
+    e = (x - 2 * y) / 3 + 4 * x * y
+    for _ in range(2):
+        term = to_z3_expr(e, ctx)
+        assert ctx.conversion_stats["size"] <= 1
+    assert (
+        simplify(term).sexpr()
+        == simplify(to_z3_expr(e, reference).translate(ctx.z3)).sexpr()
+    )
+
+
+def test_syntheses_do_not_share_terms():
+    benchmark = dpa_priorities(2)
+
+    def synthesize(ctx: SynthesisContext):
+        psm = ParitySupermartingale(benchmark.system, context=ctx)
+        return psm.invariant_synthesis_and_verification(
+            benchmark.q_states, benchmark.objectives
+        )
+
+    contexts = [SynthesisContext(), SynthesisContext()]
+    with ThreadPoolExecutor(2) as pool:
+        certificates = list(pool.map(synthesize, contexts))
+    assert certificates[0] == certificates[1]
+
+    for ctx, other in (contexts, contexts[::-1]):
+        # Each context numbers its own fresh variables from 1
+        assert ctx.fresh_vars == other.fresh_vars
+        # The variables of the system, the templates and the multipliers
+        terms = list(ctx.var_map.values())
+        assert len(terms) > len(benchmark.system.vars)
+        assert all(term.ctx is ctx.z3 for term in terms)
+        assert all(term.ctx is not other.z3 for term in terms)
+
+    for ctx in contexts:
+        ctx.close()
+        assert ctx.var_map == {}
+        assert ctx.conversion_stats["size"] == 0
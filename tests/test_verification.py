@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks.families import FAMILIES, SWEEPS
+from certificate_checker import check_certificate
+from parity_supermartingale import ParitySupermartingale
+
+# Smallest instance of each benchmark family
+BENCHMARKS = [FAMILIES[family](**SWEEPS[family][0]) for family in FAMILIES]
+
+
+def _verification(benchmark, **options):
+    """
+    LPSM synthesized by `verification` with `options`, and the violation
+    reported by the checker, None if it is valid
+    """
+    psm = ParitySupermartingale(benchmark.system)
+    lex_psm = psm.verification(benchmark.q_states, benchmark.objectives, **options)
+    violation = check_certificate(
+        benchmark.system, benchmark.objectives, benchmark.q_states, lex_psm
+    )
+    return lex_psm, violation
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS, ids=lambda b: b.name)
+def test_incremental_matches_non_incremental(benchmark):
+    lex_psm, violation = _verification(benchmark, incremental=False)
+    incremental_lex_psm, incremental_violation = _verification(
+        benchmark, incremental=True
+    )
+    assert violation is None
+    assert incremental_violation is None
+    assert [level.keys() for level in incremental_lex_psm] == [
+        level.keys() for level in lex_psm
+    ]
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS, ids=lambda b: b.name)
+def test_parallel_matches_serial(benchmark):
+    lex_psm, violation = _verification(benchmark)
+    parallel_lex_psm, parallel_violation = _verification(benchmark, workers=2)
+    assert violation is None
+    assert parallel_violation is None
+    # The models found by z3 depend on the terms created before in its context,
+    # so that the LPSMs themselves may differ
+    assert [level.keys() for level in parallel_lex_psm] == [
+        level.keys() for level in lex_psm
+    ]
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS, ids=lambda b: b.name)
+def test_lazy_matches_eager(benchmark):
+    lex_psm, violation = _verification(benchmark)
+    lazy_lex_psm, lazy_violation = _verification(benchmark, lazy=True)
+    assert violation is None
+    assert lazy_violation is None
+    assert [level.keys() for level in lazy_lex_psm] == [
+        level.keys() for level in lex_psm
+    ]
@@ -1,18 +1,14 @@
+from collections import OrderedDict
 from collections.abc import Iterable
-from functools import reduce
+from fractions import Fraction
 from itertools import chain
-import operator
 from typing import Self, TypeVar
 
 from sympy import (
     And,
     Eq,
-    GreaterThan,
-    LessThan,
     Matrix,
     Or,
-    StrictGreaterThan,
-    StrictLessThan,
     Symbol,
     Number,
     Add,
@@ -23,7 +19,7 @@ from sympy import (
 )
 from sympy.core.relational import Relational
 from sympy.logic.boolalg import Boolean, BooleanFalse
-from z3 import ArithRef, BoolRef, Real, Sqrt
+from z3 import ArithRef, Real, RealVal, Sqrt
 import z3
 
 SPLinearFunction = tuple[Matrix, Matrix]
@@ -35,72 +31,146 @@ StateBasedLinearFunction = dict[int, LinearFunction]
 
 VarMap = dict[str, ArithRef]
 
-_VAR_MAP: VarMap = {}
 
-
-def split_disjunctions(e: BoolRef):
-    return e.children() if e.decl().name() == "or" else [e]
-
-
-def parse_matrix(m: Matrix) -> Mat:
+class SynthesisContext:
+    def __init__(self, namespace: str = "", conversion_cache_size: int = 65536) -> None:
+        """
+        Variables of a single synthesis job: its own z3 context, the z3
+        variable of each sympy symbol and the counter of fresh variables.
+        Everything is released together with the context, see `close`, so that
+        jobs can run in the same process, also in different threads.
+        Fresh variables are prefixed by `namespace`, to keep apart the variables
+        generated by different workers of the same job.
+        The z3 terms of the sympy sub-expressions converted by `to_z3_expr` are
+        memoized in a LRU cache of `conversion_cache_size` entries, see
+        `conversion_stats`.
+        """
+        self.z3 = z3.Context()
+        self.namespace = namespace
+        self.fresh_vars: list[Symbol] = []
+        self._var_map: VarMap = {}
+        self.conversion_cache_size = conversion_cache_size
+        self._conversions: OrderedDict[Expr, ArithRef] = OrderedDict()
+        self._conversion_hits = 0
+        self._conversion_misses = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.fresh_vars.clear()
+        self._var_map.clear()
+        self._conversions.clear()
+
+    @property
+    def var_map(self) -> VarMap:
+        return self._var_map
+
+    @property
+    def conversion_stats(self) -> dict[str, int]:
+        return {
+            "hits": self._conversion_hits,
+            "misses": self._conversion_misses,
+            "size": len(self._conversions),
+            "maxsize": self.conversion_cache_size,
+        }
+
+    def cached_conversion(self, e: Expr) -> ArithRef | None:
+        result = self._conversions.get(e)
+        if result is None:
+            self._conversion_misses += 1
+        else:
+            self._conversion_hits += 1
+            self._conversions.move_to_end(e)
+        return result
+
+    def cache_conversion(self, e: Expr, result: ArithRef) -> None:
+        self._conversions[e] = result
+        if len(self._conversions) > self.conversion_cache_size:
+            self._conversions.popitem(last=False)
+
+    def declare(self, sympy_vars: Iterable[Symbol]) -> VarMap:
+        for var in sympy_vars:
+            if var.name not in self._var_map:
+                self._var_map[var.name] = Real(var.name, self.z3)
+        return self._var_map
+
+    def fresh_var(self, prefix: str) -> Symbol:
+        var = Symbol(f"{prefix}_({self.namespace}{len(self.fresh_vars) + 1})")
+        self.fresh_vars.append(var)
+        self.declare([var])
+        return var
+
+    def z3_var(self, var: Symbol) -> ArithRef | None:
+        return self._var_map.get(var.name)
+
+
+def parse_matrix(m: Matrix, ctx: SynthesisContext) -> Mat:
     return [
-        [to_z3_expr(m[row, column]) for column in range(m.shape[1])]
+        [to_z3_expr(m[row, column], ctx) for column in range(m.shape[1])]
         for row in range(m.shape[0])
     ]
 
 
-def update_var_map(sympy_vars: Iterable[Symbol] = []) -> VarMap:
-    for var in sympy_vars:
-        if var.name not in _VAR_MAP:
-            _VAR_MAP[var.name] = Real(var.name)
-    return _VAR_MAP
-
-
-def get_z3_var_map() -> VarMap:
-    return _VAR_MAP
-
-
-def get_z3_var(var: Symbol) -> ArithRef:
-    return get_z3_var_map().get(var.name)
+def get_z3_var(var: Symbol, ctx: SynthesisContext) -> ArithRef:
+    return ctx.z3_var(var)
 
 
-def to_z3_expr(exp: Expr) -> ArithRef | float:
-    "convert a sympy expression to a z3 expression. This returns (z3_vars, z3_expression)"
+def to_z3_expr(exp: Expr, ctx: SynthesisContext) -> ArithRef:
+    "convert a sympy expression to a z3 expression in the z3 context of `ctx`"
 
-    result_exp = _sympy_to_z3_rec(exp)
+    return _sympy_to_z3_rec(exp, ctx)
 
-    return result_exp
 
-
-def _sympy_to_z3_rec(e: Expr):
-    "recursive call for sympy_to_z3()"
+def _sympy_to_z3_rec(e: Expr, ctx: SynthesisContext) -> ArithRef:
+    "recursive call for sympy_to_z3(), memoized in `ctx` but for the symbols"
 
     if not isinstance(e, Expr):
         raise RuntimeError("Expected sympy Expr: " + repr(e))
 
     if isinstance(e, Symbol):
-        z3_var = get_z3_var(e)
+        z3_var = ctx.z3_var(e)
 
         if z3_var is None:
             raise RuntimeError(f"No var was corresponds to symbol '{e}'")
         return z3_var
 
-    elif isinstance(e, Number):
-        return float(e)
+    result = ctx.cached_conversion(e)
+    if result is None:
+        result = _sympy_to_z3_node(e, ctx)
+        ctx.cache_conversion(e, result)
+    return result
+
+
+def _sympy_to_z3_node(e: Expr, ctx: SynthesisContext) -> ArithRef:
+    """
+    z3 term of the sympy expression `e`, flattening sums and products:
+    numbers are read as floats, as z3 does
+    """
+    if isinstance(e, Number):
+        return RealVal(float(e), ctx.z3)
 
     elif isinstance(e, Mul):
-        return reduce(operator.mul, [_sympy_to_z3_rec(child) for child in e.args], 1.0)
+        coeff, factors = e.as_coeff_mul()
+        terms = [_sympy_to_z3_rec(factor, ctx) for factor in factors]
+        product = terms[0] if len(terms) == 1 else z3.Product(terms)
+        if coeff == 1:
+            return product
+        return RealVal(float(coeff), ctx.z3) * product
 
     elif isinstance(e, Add):
-        return sum([_sympy_to_z3_rec(child) for child in e.args], 0.0)
+        return z3.Sum([_sympy_to_z3_rec(child, ctx) for child in e.args])
 
     elif isinstance(e, Pow):
-        exponent = _sympy_to_z3_rec(e.args[1])
-
-        if exponent == 0.5:
-            return Sqrt(_sympy_to_z3_rec(e.args[0]))
-
-        return _sympy_to_z3_rec(e.args[0]) ** exponent
+        base, exponent = e.args
+        if not isinstance(exponent, Number):
+            return _sympy_to_z3_rec(base, ctx) ** _sympy_to_z3_rec(exponent, ctx)
+        if float(exponent) == 0.5:
+            return Sqrt(_sympy_to_z3_rec(base, ctx), ctx.z3)
+        return _sympy_to_z3_rec(base, ctx) ** float(exponent)
 
     raise RuntimeError(
         f"Type '{type(e)}' is not yet implemented for convertion to z3."
@@ -128,26 +198,16 @@ def parse_conjunct(conjunct: Boolean) -> list[Relational]:
     return [conjunct]
 
 
-def _parse_constr(conjunct: Relational) -> BoolRef:
-    match conjunct.rel_op:
-        case "<":
-            return to_z3_expr(conjunct.lhs) < 0
-        case "<=":
-            return to_z3_expr(conjunct.lhs) <= 0
-        case ">":
-            return to_z3_expr(conjunct.lhs) > 0
-        case ">=":
-            return to_z3_expr(conjunct.lhs) >= 0
-        case "==":
-            return to_z3_expr(conjunct.lhs) == 0
-        case _:
-            raise RuntimeError("Invalid ordering")
-
-
-def to_z3_dnf(dnf: Boolean) -> list[BoolRef]:
-    conjs = parse_DNF(dnf)
-    constraints = list(map(parse_conjunct, conjs))
-    return z3.Or(list(map(lambda x: z3.And(list(map(_parse_constr, x))), constraints)))
+def to_fraction(e: Expr | float | int | Fraction) -> Fraction:
+    """
+    Exact rational value of a numeric sympy expression. Floats are read from
+    their shortest decimal representation, as z3 does when given a float.
+    """
+    if isinstance(e, (int, Fraction)):
+        return Fraction(e)
+    if isinstance(e, Number) and e.is_Rational:
+        return Fraction(int(e.p), int(e.q))
+    return Fraction(repr(float(e)))
 
 
 def z3_real_to_float(z3_real: ArithRef) -> float:
@@ -183,9 +243,13 @@ def parse_constraint(constraint: Relational) -> list[Expr]:
             raise RuntimeError("Invalid constraint kind")
 
 
-def parse_q_assignment(r: Relational):
-    assert isinstance(r, Eq)
-    return list(map(lambda expr: to_z3_expr(expr) <= 0, parse_constraint(r)))
+def parse_strictness(constraint: Relational) -> list[bool]:
+    """
+    Strictness of the rows returned by `parse_constraint` for `constraint`
+    """
+    if isinstance(constraint, BooleanFalse):
+        return [False]
+    return [constraint.rel_op in ("<", ">")] * (2 if constraint.rel_op == "==" else 1)
 
 
 def get_symbol_assignment(s: Symbol, q: int) -> Relational: